@@ -0,0 +1,128 @@
+"""Move favorites with embedded recipe_data into the content-addressed recipe store.
+
+Usage:
+    python migrate_recipe_store.py           # dry run: report savings only
+    python migrate_recipe_store.py --apply   # rewrite legacy favorites as references
+"""
+import asyncio
+import sys
+from typing import Any, Dict, List
+
+import bson
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import server
+from server import bump_library_version, recipe_content_hash, store_recipes
+
+BATCH_SIZE = 500
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+async def apply_batch(batch: List[Dict[str, Any]]) -> int:
+    """Store a batch of payloads and replace the embedded copies with references.
+
+    Returns the number of legacy rows dropped as duplicates of an existing reference.
+    Rows whose recipe id is already taken by a different recipe stay embedded.
+    """
+    await store_recipes([saved["recipe_data"] for saved in batch])
+    operations = [
+        UpdateOne(
+            {"_id": saved["_id"]},
+            {
+                "$set": {"recipe_id": saved["recipe_data"].get("id"), "recipe_hash": saved["recipe_hash"]},
+                "$unset": {"recipe_data": ""}
+            }
+        )
+        for saved in batch
+    ]
+    try:
+        await server.db.saved_recipes.bulk_write(operations, ordered=False)
+        return 0
+    except BulkWriteError as e:
+        # A user who saved the same recipe twice under different ids keeps one copy
+        duplicates = [
+            batch[error["index"]]
+            for error in e.details.get("writeErrors", [])
+            if error.get("code") == 11000 and "recipe_hash" in error.get("keyPattern", {})
+        ]
+        if duplicates:
+            await server.db.saved_recipes.delete_many({"_id": {"$in": [saved["_id"] for saved in duplicates]}})
+            # Their favorites listings just lost a row
+            for user_id in {saved["user_id"] for saved in duplicates}:
+                await bump_library_version(user_id)
+        return len(duplicates)
+
+
+async def apply_migration() -> int:
+    """Rewrite every legacy favorite as a reference, returning duplicates dropped"""
+    duplicates_dropped = 0
+    batch: List[Dict[str, Any]] = []
+    async for saved in server.db.saved_recipes.find({"recipe_data": {"$exists": True}}):
+        batch.append({**saved, "recipe_hash": recipe_content_hash(saved["recipe_data"])})
+        if len(batch) >= BATCH_SIZE:
+            duplicates_dropped += await apply_batch(batch)
+            batch = []
+    if batch:
+        duplicates_dropped += await apply_batch(batch)
+    return duplicates_dropped
+
+
+async def migrate(apply: bool):
+    legacy_rows = 0
+    bytes_before = 0
+    reference_bytes = 0
+    payload_sizes: Dict[str, int] = {}
+
+    async for saved in server.db.saved_recipes.find({"recipe_data": {"$exists": True}}):
+        legacy_rows += 1
+        recipe_hash = recipe_content_hash(saved["recipe_data"])
+        bytes_before += len(bson.encode(saved))
+
+        reference = {key: value for key, value in saved.items() if key != "recipe_data"}
+        reference.update(recipe_id=saved["recipe_data"].get("id"), recipe_hash=recipe_hash)
+        reference_bytes += len(bson.encode(reference))
+        payload_sizes.setdefault(recipe_hash, len(bson.encode({"recipe_data": saved["recipe_data"]})))
+
+    # Payloads already in the store cost nothing extra
+    hashes = list(payload_sizes)
+    already_stored = set()
+    for start in range(0, len(hashes), BATCH_SIZE):
+        async for recipe in server.db.recipes.find({"hash": {"$in": hashes[start:start + BATCH_SIZE]}}, {"_id": 0, "hash": 1}):
+            already_stored.add(recipe["hash"])
+    new_payload_bytes = sum(size for recipe_hash, size in payload_sizes.items() if recipe_hash not in already_stored)
+
+    bytes_after = reference_bytes + new_payload_bytes
+    saved_bytes = bytes_before - bytes_after
+
+    print("📊 Recipe store migration" + ("" if apply else " (dry run)"))
+    print(f"   Legacy favorites with embedded payloads: {legacy_rows}")
+    print(f"   Distinct recipes among them: {len(payload_sizes)} ({len(already_stored)} already stored)")
+    print(f"   Storage before: {format_bytes(bytes_before)}")
+    print(f"   Storage after:  {format_bytes(bytes_after)} "
+          f"({format_bytes(reference_bytes)} references + {format_bytes(new_payload_bytes)} new payloads)")
+    if bytes_before:
+        print(f"   Savings: {format_bytes(saved_bytes)} ({saved_bytes / bytes_before:.1%})")
+    if legacy_rows:
+        # Listing pages scan saved_recipes, so its average document size drives the working set
+        print(f"   Average favorite document: {format_bytes(bytes_before / legacy_rows)} -> "
+              f"{format_bytes(reference_bytes / legacy_rows)}")
+
+    if apply:
+        duplicates_dropped = await apply_migration()
+        print(f"✅ Migrated {legacy_rows} favorites ({duplicates_dropped} duplicates merged)")
+
+
+if __name__ == "__main__":
+    server.init_db()
+    try:
+        asyncio.run(migrate(apply="--apply" in sys.argv[1:]))
+    finally:
+        server.close_db()
@@ -1,36 +1,100 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 import json
 import asyncio
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, ValidationError
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterable, Callable
 import uuid
 from datetime import datetime, timedelta
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import hashlib
+import gzip
 import secrets
+import base64
+import zlib
+import time
+from collections import OrderedDict
+import weakref
+import hmac
+import math
+import sys
+import sqlite3
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import jwt
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from contextlib import asynccontextmanager
+from abc import ABC, abstractmethod
+
+try:
+    import orjson
+except ImportError:  # optional: FastJSONResponse falls back to the json module
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: responses fall back to zstd or gzip
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: responses fall back to gzip
+    zstandard = None
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+def env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean setting; 1, true, yes and on all enable it"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+class MongoCommandCounter(monitoring.CommandListener):
+    """Count commands sent to MongoDB, i.e. network round trips"""
+
+    def __init__(self):
+        self.total = 0
+
+    def started(self, event):
+        self.total += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+mongo_command_counter = MongoCommandCounter()
+
+# MongoDB connection, opened by the app's lifespan rather than at import time
+client: Optional[AsyncIOMotorClient] = None
+db = None
 
-# Create the main app without a prefix
-app = FastAPI(title="Recipe Finder API", description="Find recipes based on ingredients with AI-powered generation")
+def init_db():
+    """Create the Motor client; it connects lazily on the first operation"""
+    global client, db
+    if client is None:
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], event_listeners=[mongo_command_counter])
+        db = client[os.environ['DB_NAME']]
+
+def close_db():
+    global client, db
+    if client is not None:
+        client.close()
+    client = db = None
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -41,6 +105,155 @@ JWT_SECRET = os.environ.get('JWT_SECRET', secrets.token_urlsafe(32))
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_DELTA = timedelta(days=30)
 
+# Password hashing configuration: scrypt cost is adjustable, old hashes upgrade on login
+PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', '8'))
+PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', '1'))
+# Caps how many hashes run at once so login bursts cannot starve other requests
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Opt-in fast path: validate generated recipes once and skip response_model re-validation
+FAST_JSON_RESPONSES = env_flag('FAST_JSON_RESPONSES')
+
+# Retention and compaction configuration
+PASSWORD_RESET_EXPIRATION_DELTA = timedelta(hours=1)
+STATUS_CHECK_RETENTION_DELTA = timedelta(days=int(os.environ.get('STATUS_CHECK_RETENTION_DAYS', '7')))
+COMPACTION_INTERVAL_SECONDS = int(os.environ.get('COMPACTION_INTERVAL_SECONDS', '3600'))
+
+# Library listing configuration
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+RECIPE_FIELDS = [
+    "id", "title", "image", "readyInMinutes", "servings", "nutrition", "hasOnionGarlic", "ingredients", "instructions"
+]
+RECIPE_SUMMARY_FIELDS = ["id", "title", "image", "readyInMinutes", "servings", "nutrition", "hasOnionGarlic"]
+# Sparse fieldsets selectable with ?fields=; None means every field
+RECIPE_FIELD_PRESETS: Dict[str, Optional[tuple]] = {
+    "card": tuple(RECIPE_SUMMARY_FIELDS),
+    "full": None
+}
+# Keys each collection always returns alongside the selected recipe fields
+STORED_RECIPE_KEYS = ("hash",)
+# Legacy favorites embed recipe_data instead of referencing the recipe store
+FAVORITE_KEYS = ("id", "saved_at", "recipe_id", "recipe_hash")
+CUSTOM_RECIPE_KEYS = ("id", "created_at", "share_token")
+
+# Share link cache configuration
+SHARE_CACHE_SIZE = int(os.environ.get('SHARE_CACHE_SIZE', '10000'))
+# Bounds how long another worker's cached copy of a deleted share can live
+SHARE_CACHE_TTL_SECONDS = int(os.environ.get('SHARE_CACHE_TTL_SECONDS', '300'))
+
+# Response compression configuration: smaller bodies are not worth the CPU
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+# Search result cache configuration
+SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', '1000'))
+SEARCH_CACHE_TTL_SECONDS = int(os.environ.get('SEARCH_CACHE_TTL_SECONDS', '3600'))
+
+# Semantic search cache: a miss is served from a cached search in the same cuisine whose ingredients
+# are all among the requested ones and make up at least this share of them; 1 disables it
+SEARCH_SIMILARITY_THRESHOLD = float(os.environ.get('SEARCH_SIMILARITY_THRESHOLD', '0.6'))
+
+# "More like this" recommendations over LLM-generated recipes and the user's own custom recipes
+SIMILAR_RECIPES_MIN_SIMILARITY = float(os.environ.get('SIMILAR_RECIPES_MIN_SIMILARITY', '0.3'))
+SIMILAR_RECIPES_MAX_LIMIT = 50
+# More, shorter bands than the search cache index: recommendations need recall down to lower similarity
+SIMILAR_RECIPES_NUM_PERM = 96
+SIMILAR_RECIPES_BANDS = 24
+# Most recently generated recipes each worker indexes; older ones are evicted (about 750 bytes each)
+SIMILAR_RECIPES_INDEX_SIZE = int(os.environ.get('SIMILAR_RECIPES_INDEX_SIZE', '100000'))
+# Custom recipes are scored exactly against at most this many of the user's newest
+SIMILAR_RECIPES_CUSTOM_SCAN = int(os.environ.get('SIMILAR_RECIPES_CUSTOM_SCAN', '500'))
+# How often each worker indexes recipes generated by other workers
+SIMILAR_RECIPES_SYNC_SECONDS = int(os.environ.get('SIMILAR_RECIPES_SYNC_SECONDS', '60'))
+SIMILAR_RECIPES_SYNC_BATCH_SIZE = 1000
+SIMILAR_RECIPES_SYNC_OVERLAP_SECONDS = 10
+# Generated recipes leave the recipe store after this long unless a favorite references them
+GENERATED_RECIPE_RETENTION_DELTA = timedelta(days=int(os.environ.get('GENERATED_RECIPE_RETENTION_DAYS', '30')))
+
+# Multi-cuisine batch search configuration
+SEARCH_BATCH_MAX_CUISINES = int(os.environ.get('SEARCH_BATCH_MAX_CUISINES', '4'))
+# Covers the 45 s generation timeout; stragglers keep running and fill the cache
+SEARCH_BATCH_DEADLINE_SECONDS = float(os.environ.get('SEARCH_BATCH_DEADLINE_SECONDS', '50'))
+
+# Search pre-warming: popular searches are regenerated off-peak before their cache entries expire
+SEARCH_LOG_RETENTION_DELTA = timedelta(days=int(os.environ.get('SEARCH_LOG_RETENTION_DAYS', '7')))
+SEARCH_PREWARM_TOP_N = int(os.environ.get('SEARCH_PREWARM_TOP_N', '200'))
+SEARCH_PREWARM_INTERVAL_SECONDS = int(os.environ.get('SEARCH_PREWARM_INTERVAL_SECONDS', '900'))
+# UTC hours, end exclusive: "0-6" runs from 00:00 to 05:59 and "3" for the 03:00 hour only
+SEARCH_PREWARM_HOURS = os.environ.get('SEARCH_PREWARM_HOURS', '0-6')
+# Estimated LLM tokens one pre-warming run may spend
+SEARCH_PREWARM_TOKEN_BUDGET = int(os.environ.get('SEARCH_PREWARM_TOKEN_BUDGET', '200000'))
+# Pre-warmed entries outlive the off-peak window so they carry through the next peak
+SEARCH_PREWARM_TTL_SECONDS = int(os.environ.get('SEARCH_PREWARM_TTL_SECONDS', str(24 * 3600)))
+# One worker per host pre-warms; a crashed warmer's lease lapses after this long
+SEARCH_PREWARM_LEASE_SECONDS = int(os.environ.get('SEARCH_PREWARM_LEASE_SECONDS', str(SEARCH_PREWARM_INTERVAL_SECONDS)))
+
+# Nutrition analysis memo configuration
+NUTRITION_CACHE_SIZE = int(os.environ.get('NUTRITION_CACHE_SIZE', '10000'))
+NUTRITION_CACHE_TTL_SECONDS = int(os.environ.get('NUTRITION_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+# Cache snapshots for warm restarts; leave CACHE_SNAPSHOT_PATH unset to disable them
+CACHE_SNAPSHOT_PATH = os.environ.get('CACHE_SNAPSHOT_PATH')
+# Bump when the shape of any snapshotted cache value changes
+CACHE_SNAPSHOT_VERSION = 1
+CACHE_SNAPSHOT_LOAD_BUDGET_SECONDS = float(os.environ.get('CACHE_SNAPSHOT_LOAD_BUDGET_SECONDS', '2.0'))
+
+# Host-wide cache tier shared by every worker process; leave SHARED_CACHE_PATH unset to disable it
+SHARED_CACHE_BACKEND = os.environ.get('SHARED_CACHE_BACKEND', 'sqlite')
+SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH')
+# Shared tier calls run on the event loop: waiting longer than this for another worker's lock counts as a miss
+SHARED_CACHE_BUSY_TIMEOUT_MS = int(os.environ.get('SHARED_CACHE_BUSY_TIMEOUT_MS', '20'))
+
+# Operator access to /api/metrics; the endpoint does not exist while METRICS_TOKEN is unset
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Write-behind buffer configuration
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', '500'))
+WRITE_BEHIND_FLUSH_INTERVAL_SECONDS = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL_SECONDS', '1.0'))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '10000'))
+
+# Batched user lookups: a short memo absorbs repeated lookups of the same user
+USER_LOADER_MEMO_SECONDS = float(os.environ.get('USER_LOADER_MEMO_SECONDS', '1.0'))
+USER_LOADER_MEMO_SIZE = 10000
+
+# User profile cache configuration
+USER_PROFILE_CACHE_SIZE = int(os.environ.get('USER_PROFILE_CACHE_SIZE', '10000'))
+USER_PROFILE_CACHE_TTL_SECONDS = int(os.environ.get('USER_PROFILE_CACHE_TTL_SECONDS', '300'))
+
+# Verified token cache configuration
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '50000'))
+# How often each worker picks up revocations made by other workers, i.e. how long a revoked
+# token can still be accepted elsewhere; each sync is one indexed query that is usually empty
+TOKEN_REVOCATION_SYNC_SECONDS = int(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', '5'))
+# Revocations are stamped before they are written, so each sync re-reads this far back
+TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS = 10
+
+# Admission control for LLM-backed endpoints: bursts up to *_BURST, refilled at *_PER_MINUTE.
+# Off by default: anonymous callers are keyed by client IP, so behind a proxy or ingress it must be
+# enabled together with TRUST_PROXY_HEADERS, or every anonymous user shares the proxy's bucket
+RATE_LIMITING = env_flag('RATE_LIMITING')
+SEARCH_RATE_LIMIT_BURST = int(os.environ.get('SEARCH_RATE_LIMIT_BURST', '5'))
+SEARCH_RATE_LIMIT_PER_MINUTE = float(os.environ.get('SEARCH_RATE_LIMIT_PER_MINUTE', '10'))
+CUSTOM_RECIPE_RATE_LIMIT_BURST = int(os.environ.get('CUSTOM_RECIPE_RATE_LIMIT_BURST', '3'))
+CUSTOM_RECIPE_RATE_LIMIT_PER_MINUTE = float(os.environ.get('CUSTOM_RECIPE_RATE_LIMIT_PER_MINUTE', '5'))
+# "memory" keeps buckets per worker, "mongo" shares them across workers
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+# Only trust X-Forwarded-For when running behind a proxy that sets it
+TRUST_PROXY_HEADERS = env_flag('TRUST_PROXY_HEADERS')
+
+# Account deletion configuration
+# Libraries larger than this are purged by a background worker
+ACCOUNT_PURGE_THRESHOLD = int(os.environ.get('ACCOUNT_PURGE_THRESHOLD', '5000'))
+ACCOUNT_PURGE_CHUNK_SIZE = 1000
+ACCOUNT_PURGE_RETENTION_DELTA = timedelta(days=7)
+
+# Library export/import configuration
+LIBRARY_EXPORT_BATCH_SIZE = 200
+LIBRARY_IMPORT_BATCH_SIZE = 500
+LIBRARY_IMPORT_MAX_LINE_BYTES = 1024 * 1024
+
 # Security
 security = HTTPBearer()
 
@@ -90,6 +303,15 @@ class PasswordResetToken(BaseModel):
     used: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class AccountPurge(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    status: str = "running"
+    total: int
+    deleted: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
 class UserResponse(BaseModel):
     id: str
     email: str
@@ -117,6 +339,7 @@ class CustomRecipe(BaseModel):
     servings: int
     nutrition: 'RecipeNutrition'
     readyInMinutes: int
+    recipe_hash: Optional[str] = None  # Content hash, so re-imports are recognized as duplicates
     created_at: datetime = Field(default_factory=datetime.utcnow)
     share_token: str = Field(default_factory=lambda: secrets.token_urlsafe(16))
 
@@ -124,27 +347,34 @@ class CustomRecipe(BaseModel):
 class SavedRecipe(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
-    recipe_data: Dict[str, Any]  # Store the full recipe JSON
+    recipe_id: Any  # The id the client knows the recipe by
+    recipe_hash: str  # Reference into the content-addressed recipes collection
     saved_at: datetime = Field(default_factory=datetime.utcnow)
     share_token: str = Field(default_factory=lambda: secrets.token_urlsafe(16))
 
 class SaveRecipeRequest(BaseModel):
     recipe_data: Dict[str, Any]
 
-# Define Models
-class StatusCheck(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    client_name: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+class BulkSaveRecipesRequest(BaseModel):
+    recipes: List[Dict[str, Any]] = Field(..., min_length=1, max_length=100)
 
-class StatusCheckCreate(BaseModel):
+class BulkRemoveRecipesRequest(BaseModel):
+    recipe_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+class StatusRollup(BaseModel):
     client_name: str
+    bucket_start: datetime
+    count: int
 
 class RecipeSearchRequest(BaseModel):
     ingredients: str
     cuisine: Optional[str] = 'any'
     number: Optional[int] = 100
 
+class BatchSearchRequest(BaseModel):
+    ingredients: str
+    cuisines: List[str]
+
 class NutrientInfo(BaseModel):
     name: str
     amount: float
@@ -173,23 +403,1549 @@ class RecipeSearchResponse(BaseModel):
     medium: Dict[str, List[Recipe]]
     high: Dict[str, List[Recipe]]
 
+# Compiled once; validates a whole batch of generated recipes in one call
+RECIPE_LIST_ADAPTER = TypeAdapter(List[Recipe])
+
+def fast_json_dumps(content: Any) -> bytes:
+    """Serialize with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=json_default, separators=(",", ":")).encode()
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson when it is installed"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return fast_json_dumps(content)
+
+def api_response(payload: Any, headers: Optional[Dict[str, str]] = None) -> Any:
+    """Return payload directly on the fast path, bypassing FastAPI's response_model pass"""
+    if not FAST_JSON_RESPONSES:
+        if headers is None:
+            return payload
+        # What FastAPI would do for a route without a response_model, plus the headers
+        return JSONResponse(jsonable_encoder(payload), headers=headers)
+    if isinstance(payload, BaseModel):
+        payload = payload.dict()
+    return FastJSONResponse(payload, headers=headers)
+
+# Response compression
+# encoding -> (compress(body, level), on-the-fly level, precompressed level), in server preference order
+CONTENT_ENCODERS: Dict[str, tuple] = {}
+if brotli is not None:
+    CONTENT_ENCODERS["br"] = (lambda body, level: brotli.compress(body, quality=level), 4, 11)
+if zstandard is not None:
+    CONTENT_ENCODERS["zstd"] = (lambda body, level: zstandard.ZstdCompressor(level=level).compress(body), 3, 12)
+CONTENT_ENCODERS["gzip"] = (lambda body, level: gzip.compress(body, compresslevel=level, mtime=0), 6, 9)
+
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/")
+
+@lru_cache(maxsize=256)
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+    # Highest client weight wins; ties go to the server's preference order
+    best, best_weight = None, 0.0
+    for encoding in CONTENT_ENCODERS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+def compress_body(body: bytes, encoding: str, precompressed: bool = False) -> bytes:
+    """Compress a response body; cached bodies are compressed once, so they get the slow, small setting"""
+    compress, level, precompressed_level = CONTENT_ENCODERS[encoding]
+    return compress(body, precompressed_level if precompressed else level)
+
+def weak_etag(etag: str) -> str:
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+class CompressionMiddleware:
+    """Compress complete JSON and text responses above a size threshold
+
+    Responses that already carry a Content-Encoding (precompressed cache hits)
+    and streamed bodies such as the library export pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body shows whether compression applies
+                start_message = message
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_MEDIA_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            body = compress_body(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                # The encoded bytes differ from the identity representation
+                headers["ETag"] = weak_etag(headers["etag"])
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+# In-process caches
+class LRUCache:
+    """Bounded least-recently-used cache with an optional per-entry time to live"""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, on_evict: Optional[Callable[[Any], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Called with the key of each entry dropped for size or expiry, not for pop or clear
+        self.on_evict = on_evict
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, stored_at, value)
+        self.hits = 0
+        self.misses = 0
+        # Age of entries when served, i.e. how stale cache hits are
+        self._served_age_total = 0.0
+        self.max_served_age = 0.0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None or (entry[0] is not None and entry[0] <= now):
+            if entry is not None:
+                del self._entries[key]
+                if self.on_evict is not None:
+                    self.on_evict(key)
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        age = now - entry[1]
+        self._served_age_total += age
+        self.max_served_age = max(self.max_served_age, age)
+        return entry[2]
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        expires_at = now + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, now, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[2]
+
+    def pop_where(self, predicate) -> int:
+        """Remove every entry whose value matches predicate"""
+        keys = [key for key, (_, _, value) in self._entries.items() if predicate(value)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+
+    def remaining_ttl(self, key: Any) -> Optional[float]:
+        """Seconds until key expires, without counting a lookup; None when absent"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] is None:
+            return math.inf
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def live_entries(self) -> List[tuple[Any, Any, Optional[float]]]:
+        """(key, value, remaining ttl) for unexpired entries, most recently used first"""
+        now = time.monotonic()
+        return [
+            (key, value, None if expires_at is None else expires_at - now)
+            for key, (expires_at, _, value) in reversed(self._entries.items())
+            if expires_at is None or expires_at > now
+        ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_served_age_seconds": round(self._served_age_total / self.hits, 3) if self.hits else 0.0,
+            "max_served_age_seconds": round(self.max_served_age, 3)
+        }
+
+class CacheBackend(ABC):
+    """A cache tier shared by every worker on the host, holding serialized values"""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[tuple[bytes, float]]:
+        """Return (value, expires_at as unix time), or None on a miss"""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, keys: List[str]):
+        ...
+
+    @abstractmethod
+    def delete_tag(self, namespace: str, tag: str):
+        """Delete every entry stored with the given tag"""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        ...
+
+    @abstractmethod
+    def expires_at(self, namespace: str, key: str) -> Optional[float]:
+        """Unix time the entry expires, without counting a lookup; None when absent"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    def close(self):
+        pass
+
+class SQLiteCacheBackend(CacheBackend):
+    """Shared tier in one SQLite file in WAL mode
+
+    Readers in every worker run concurrently with the single writer and are
+    served from the memory-mapped file, so a lookup stays well under a
+    millisecond and runs inline on the event loop. A call that would wait
+    longer than busy_timeout_ms for another worker's lock is given up: reads
+    count as misses and writes are skipped, never stalling the worker.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = SHARED_CACHE_BUSY_TIMEOUT_MS):
+        # Opened per process after the server forks its workers; setup may wait for the schema lock
+        self.connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(f"PRAGMA mmap_size={256 * 1024 * 1024}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, tag TEXT, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cache_entries_tag ON cache_entries (namespace, tag)")
+        self.connection.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.busy = 0
+
+    @staticmethod
+    def is_busy(error: sqlite3.OperationalError) -> bool:
+        # "database is locked" (SQLITE_BUSY) or "database table is locked" (SQLITE_LOCKED)
+        return "locked" in str(error)
+
+    def execute(self, sql: str, parameters: Iterable = ()) -> Optional[sqlite3.Cursor]:
+        """Run one statement, returning None if another worker held the lock past the busy timeout"""
+        try:
+            return self.connection.execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            if not self.is_busy(e):
+                raise
+            self.busy += 1
+            return None
+
+    def get(self, namespace: str, key: str) -> Optional[tuple[bytes, float]]:
+        cursor = self.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        )
+        row = cursor.fetchone() if cursor is not None else None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0], row[1]
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float, tag: Optional[str] = None):
+        self.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, tag, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, value, tag, time.time() + ttl)
+        )
+
+    def delete(self, namespace: str, keys: List[str]):
+        # Raises when busy, so callers log it; the entry's TTL bounds how long it outlives the delete
+        self.connection.executemany(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", [(namespace, key) for key in keys]
+        )
+
+    def delete_tag(self, namespace: str, tag: str):
+        self.connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND tag = ?", (namespace, tag))
+
+    def purge_expired(self) -> int:
+        cursor = self.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount if cursor is not None else 0
+
+    def expires_at(self, namespace: str, key: str) -> Optional[float]:
+        cursor = self.execute(
+            "SELECT expires_at FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        )
+        row = cursor.fetchone() if cursor is not None else None
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "entries": self.connection.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0],
+            "file_bytes": os.path.getsize(self.path),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            # Calls given up on because another worker held the write lock
+            "busy": self.busy
+        }
+
+    def close(self):
+        self.connection.close()
+
+# SHARED_CACHE_BACKEND name -> backend class
+CACHE_BACKENDS = {"sqlite": SQLiteCacheBackend}
+
+shared_cache: Optional[CacheBackend] = None
+
+def open_shared_cache():
+    global shared_cache
+    if SHARED_CACHE_PATH and shared_cache is None:
+        shared_cache = CACHE_BACKENDS[SHARED_CACHE_BACKEND](SHARED_CACHE_PATH)
+
+def close_shared_cache():
+    global shared_cache
+    if shared_cache is not None:
+        shared_cache.close()
+    shared_cache = None
+
+class TieredCache:
+    """A per-worker LRU in front of the shared tier, for {"payload", "variants", ...} entries
+
+    Only the payload and its metadata are shared; serialized and compressed
+    variants are rebuilt by each worker on first use.
+    """
+
+    def __init__(self, namespace: str, local: LRUCache):
+        self.namespace = namespace
+        self.local = local
+        self.shared_hits = 0
+
+    @staticmethod
+    def shared_key(key: Any) -> str:
+        return json.dumps(key, separators=(",", ":"))
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        entry = self.local.get(key)
+        if entry is not None or shared_cache is None:
+            return entry
+        try:
+            stored = shared_cache.get(self.namespace, self.shared_key(key))
+        except Exception as e:
+            logging.error(f"Shared cache read failed: {str(e)}")
+            return None
+        if stored is None:
+            return None
+        value, expires_at = stored
+        self.shared_hits += 1
+        entry = {**json.loads(value), "variants": {}}
+        # Keep the shared expiry so a copy never outlives the entry it came from
+        self.local.set(key, entry, ttl=max(expires_at - time.time(), 0))
+        return entry
+
+    def set(self, key: Any, entry: Dict[str, Any], tag: Optional[str] = None, ttl: Optional[float] = None):
+        self.local.set(key, entry, ttl=ttl)
+        if shared_cache is None:
+            return
+        shared = {name: value for name, value in entry.items() if name != "variants"}
+        try:
+            shared_cache.set(
+                self.namespace, self.shared_key(key), json.dumps(shared, default=json_default).encode(),
+                self.local.ttl if ttl is None else ttl, tag
+            )
+        except Exception as e:
+            logging.error(f"Shared cache write failed: {str(e)}")
+
+    def remaining_ttl(self, key: Any) -> Optional[float]:
+        """Seconds until key expires in whichever tier keeps it longest; None when absent"""
+        remaining = self.local.remaining_ttl(key)
+        if shared_cache is None:
+            return remaining
+        try:
+            expires_at = shared_cache.expires_at(self.namespace, self.shared_key(key))
+        except Exception as e:
+            logging.error(f"Shared cache read failed: {str(e)}")
+            return remaining
+        if expires_at is None:
+            return remaining
+        return max(remaining or 0, expires_at - time.time())
+
+    def pop(self, key: Any):
+        self.local.pop(key)
+        if shared_cache is not None:
+            try:
+                shared_cache.delete(self.namespace, [self.shared_key(key)])
+            except Exception as e:
+                logging.error(f"Shared cache delete failed: {str(e)}")
+
+    def pop_tag(self, tag: str, predicate):
+        """Drop every entry stored with tag; predicate finds the local copies"""
+        self.local.pop_where(predicate)
+        if shared_cache is not None:
+            try:
+                shared_cache.delete_tag(self.namespace, tag)
+            except Exception as e:
+                logging.error(f"Shared cache delete failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.local.stats(), "shared_hits": self.shared_hits}
+
+# (recipe_type, share_token) -> {"payload", "user_id", "variants": {fieldset: {"etag", "body"}}}
+share_cache = TieredCache("share", LRUCache(SHARE_CACHE_SIZE, ttl=SHARE_CACHE_TTL_SECONDS))
+
+# (canonical ingredients, cuisine) -> {"payload", "variants": {fieldset: {"etag", "body"}}}
+# Evicted keys leave the similarity index too, so it only ever points at cached searches
+search_cache = TieredCache("search", LRUCache(
+    SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL_SECONDS, on_evict=lambda cache_key: unindex_search_key(cache_key)
+))
+
+# (canonical ingredients, servings) -> {"nutrition", "readyInMinutes"}
+nutrition_cache = LRUCache(NUTRITION_CACHE_SIZE, ttl=NUTRITION_CACHE_TTL_SECONDS)
+
+def invalidate_shared_recipes(recipe_type: str, share_tokens: List[str]):
+    """Drop cached share responses for recipes that no longer exist"""
+    for share_token in share_tokens:
+        share_cache.pop((recipe_type, share_token))
+
+# Cache snapshots
+SNAPSHOT_MAGIC = b"recipe-finder-cache-snapshot"
+
+# name -> (cache, value to snapshot, value from snapshot); share entries are cheap to rebuild and not included
+SNAPSHOT_CACHES = {
+    "search": (search_cache.local, lambda entry: entry["payload"], lambda payload: {"payload": payload, "variants": {}}),
+    "nutrition": (nutrition_cache, lambda value: value, lambda value: value)
+}
+
+def as_tuple(value: Any) -> Any:
+    """JSON turns tuple cache keys into lists; turn them back"""
+    return tuple(as_tuple(item) for item in value) if isinstance(value, list) else value
+
+def save_cache_snapshot(path: str) -> int:
+    """Write the snapshotted caches to path, returning the number of entries"""
+    caches = {
+        name: [[key, dump(value), ttl] for key, value, ttl in cache.live_entries()]
+        for name, (cache, dump, _) in SNAPSHOT_CACHES.items()
+    }
+    body = zlib.compress(json.dumps({"saved_at": time.time(), "caches": caches}, default=json_default).encode())
+    header = {"version": CACHE_SNAPSHOT_VERSION, "sha256": hashlib.sha256(body).hexdigest(), "length": len(body)}
+
+    # Written beside the target and renamed so a crash never leaves a torn snapshot
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + b" " + json.dumps(header).encode() + b"\n" + body)
+    os.replace(temporary_path, path)
+    return sum(len(entries) for entries in caches.values())
+
+def load_cache_snapshot(path: str, budget_seconds: float = CACHE_SNAPSHOT_LOAD_BUDGET_SECONDS) -> int:
+    """Restore caches from a snapshot, returning the number of entries loaded
+
+    Snapshots that are missing, corrupt or from another version are skipped,
+    expired entries are dropped, and loading stops once the time budget is spent.
+    """
+    started = time.monotonic()
+    try:
+        with open(path, "rb") as f:
+            first_line = f.readline()
+            body = f.read()
+    except FileNotFoundError:
+        return 0
+
+    magic, _, header_json = first_line.partition(b" ")
+    try:
+        header = json.loads(header_json)
+    except ValueError:
+        header = None
+    if magic != SNAPSHOT_MAGIC or not isinstance(header, dict) or header.get("version") != CACHE_SNAPSHOT_VERSION:
+        logging.warning(f"Skipping cache snapshot {path}: unrecognized format or version")
+        return 0
+    if header.get("length") != len(body) or header.get("sha256") != hashlib.sha256(body).hexdigest():
+        logging.warning(f"Skipping cache snapshot {path}: checksum mismatch")
+        return 0
+
+    snapshot = json.loads(zlib.decompress(body))
+    elapsed_since_save = max(time.time() - snapshot["saved_at"], 0)
+    loaded = 0
+    budget_spent = False
+    for name, entries in snapshot["caches"].items():
+        if name not in SNAPSHOT_CACHES or budget_spent:
+            continue
+        cache, _, load = SNAPSHOT_CACHES[name]
+        restored = []
+        # Most recently used first, so a spent budget drops the coldest entries
+        for key, value, ttl in entries:
+            if time.monotonic() - started > budget_seconds:
+                logging.warning(f"Cache snapshot load budget spent after {loaded + len(restored)} entries")
+                budget_spent = True
+                break
+            if ttl is not None:
+                ttl -= elapsed_since_save
+                if ttl <= 0:
+                    continue
+            restored.append((as_tuple(key), load(value), ttl))
+        for key, value, ttl in reversed(restored):
+            cache.set(key, value, ttl=ttl)
+        loaded += len(restored)
+    return loaded
+
+# Similarity index
+class MinHashLSH:
+    """MinHash signatures banded into LSH buckets, for finding keys whose feature sets are similar
+
+    Buckets live in per-band sorted arrays searched with binary search; recent
+    inserts wait in small per-band dicts until they are merged in, and removed
+    keys are tombstones swept out by the next merge. NumPy is imported on first
+    use to keep it off the startup path.
+    """
+
+    def __init__(self, num_perm: int = 80, bands: int = 16, max_entries: Optional[int] = None, seed: int = 1):
+        import numpy as np
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing ((a * x + b) mod 2^64) >> 32 of 32-bit feature hashes, one (a, b) per permutation
+        self._a = rng.integers(1, 1 << 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 1 << 63, self.rows + 1, dtype=np.uint64) | np.uint64(1)
+
+        self._keys: List[Any] = []  # entry id -> key, None once removed
+        self._ids: Dict[Any, int] = {}  # key -> entry id
+        self._size = 0  # entry ids handed out, including tombstones
+        self._oldest = 0
+        # Signatures keep the low 16 bits of each MinHash; chance agreements add ~1e-5 to estimates
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint16)
+        self._partitions = np.zeros(0, dtype=np.uint32)
+        self._live = np.zeros(0, dtype=bool)
+        self._sorted_buckets = [np.zeros(0, dtype=np.uint32) for _ in range(bands)]
+        self._sorted_ids = [np.zeros(0, dtype=np.int32) for _ in range(bands)]
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._pending_count = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._ids
+
+    def _minhashes(self, feature_sets: List[Iterable[str]]):
+        """(n, num_perm) MinHash values of non-empty feature sets"""
+        import numpy as np
+        chunks = []
+        # Chunked so the (features, num_perm) intermediate stays a few MB
+        for start in range(0, len(feature_sets), 1024):
+            chunk = [list(features) for features in feature_sets[start:start + 1024]]
+            sizes = [len(features) for features in chunk]
+            hashes = np.fromiter(
+                (zlib.crc32(feature.encode()) for features in chunk for feature in features),
+                dtype=np.uint64, count=sum(sizes)
+            )
+            values = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+            offsets = np.cumsum([0] + sizes[:-1])
+            chunks.append(np.minimum.reduceat(values, offsets, axis=0).astype(np.uint32))
+        return np.concatenate(chunks)
+
+    def _bucket_hashes(self, minhashes, partition_hash: int):
+        """(n, bands) bucket hashes mixing each band's rows with the partition"""
+        import numpy as np
+        rows = minhashes.reshape(len(minhashes), self.bands, self.rows).astype(np.uint64)
+        mixed = (rows * self._band_mix[:-1]).sum(axis=2, dtype=np.uint64)
+        mixed += np.full(1, partition_hash, dtype=np.uint64) * self._band_mix[-1:]
+        return (mixed >> np.uint64(32)).astype(np.uint32)
+
+    def _reserve(self, size: int):
+        import numpy as np
+        capacity = len(self._live)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 1024)
+        signatures = np.zeros((capacity, self.num_perm), dtype=np.uint16)
+        signatures[:self._size] = self._signatures[:self._size]
+        partitions = np.zeros(capacity, dtype=np.uint32)
+        partitions[:self._size] = self._partitions[:self._size]
+        live = np.zeros(capacity, dtype=bool)
+        live[:self._size] = self._live[:self._size]
+        self._signatures, self._partitions, self._live = signatures, partitions, live
+
+    def add(self, key: Any, features: Iterable[str], partition: str = ""):
+        self.add_many([key], [features], partition)
+
+    def add_many(self, keys: Iterable[Any], feature_sets: Iterable[Iterable[str]], partition: str = ""):
+        """Index keys by their feature sets, replacing keys already indexed; empty sets are skipped"""
+        import numpy as np
+        entries = {key: features for key, features in zip(keys, feature_sets) if features}
+        if not entries:
+            return
+        for key in entries:
+            self.remove(key)
+        keys = list(entries)
+        minhashes = self._minhashes(list(entries.values()))
+        partition_hash = zlib.crc32(partition.encode())
+
+        first_id = self._size
+        ids = np.arange(first_id, first_id + len(keys), dtype=np.int32)
+        self._reserve(first_id + len(keys))
+        self._signatures[ids] = minhashes.astype(np.uint16)
+        self._partitions[ids] = partition_hash
+        self._live[ids] = True
+        self._keys.extend(keys)
+        self._ids.update(zip(keys, range(first_id, first_id + len(keys))))
+        self._size += len(keys)
+
+        buckets = self._bucket_hashes(minhashes, partition_hash)
+        if len(keys) >= self._merge_threshold():
+            self._merge(buckets, ids)
+        else:
+            for band, pending in enumerate(self._pending):
+                for bucket, entry_id in zip(buckets[:, band].tolist(), ids.tolist()):
+                    pending.setdefault(bucket, []).append(entry_id)
+            self._pending_count += len(keys)
+            if self._pending_count >= self._merge_threshold():
+                self._merge()
+
+        while self.max_entries is not None and len(self._ids) > self.max_entries:
+            self.remove(self._keys[self._oldest])
+            self._oldest += 1
+
+    def remove(self, key: Any) -> bool:
+        entry_id = self._ids.pop(key, None)
+        if entry_id is None:
+            return False
+        self._live[entry_id] = False
+        self._keys[entry_id] = None
+        return True
+
+    def remove_where(self, predicate) -> int:
+        """Remove every key matching predicate"""
+        keys = [key for key in self._ids if predicate(key)]
+        for key in keys:
+            self.remove(key)
+        return len(keys)
+
+    def _merge_threshold(self) -> int:
+        # Merging costs a sort of every band, so it waits until pending inserts are a fair share of the index
+        return max(1024, len(self._ids) // 4)
+
+    def _merge(self, buckets=None, ids=None):
+        """Fold pending and given inserts into the sorted bands, dropping tombstones"""
+        import numpy as np
+        for band, pending in enumerate(self._pending):
+            pending_ids = [entry_id for entries in pending.values() for entry_id in entries]
+            pending_buckets = [bucket for bucket, entries in pending.items() for _ in entries]
+            band_buckets = [self._sorted_buckets[band], np.array(pending_buckets, dtype=np.uint32)]
+            band_ids = [self._sorted_ids[band], np.array(pending_ids, dtype=np.int32)]
+            if buckets is not None:
+                band_buckets.append(buckets[:, band])
+                band_ids.append(ids)
+            band_buckets, band_ids = np.concatenate(band_buckets), np.concatenate(band_ids)
+            live = self._live[band_ids]
+            band_buckets, band_ids = band_buckets[live], band_ids[live]
+            order = np.argsort(band_buckets, kind="stable")
+            self._sorted_buckets[band], self._sorted_ids[band] = band_buckets[order], band_ids[order]
+            pending.clear()
+        self._pending_count = 0
+        if self._size > 2 * len(self._ids):
+            self._compact()
+
+    def _compact(self):
+        """Renumber live entries once tombstones outnumber them"""
+        import numpy as np
+        live_ids = np.flatnonzero(self._live[:self._size])
+        remap = np.full(self._size, -1, dtype=np.int32)
+        remap[live_ids] = np.arange(len(live_ids), dtype=np.int32)
+        self._signatures = self._signatures[live_ids]
+        self._partitions = self._partitions[live_ids]
+        self._live = np.ones(len(live_ids), dtype=bool)
+        self._keys = [self._keys[entry_id] for entry_id in live_ids.tolist()]
+        self._ids = {key: entry_id for entry_id, key in enumerate(self._keys)}
+        self._sorted_ids = [remap[band_ids] for band_ids in self._sorted_ids]
+        self._size = len(live_ids)
+        self._oldest = 0
+
+    def query(
+        self,
+        features: Iterable[str],
+        partition: str = "",
+        threshold: float = 0.0,
+        limit: int = 10,
+        accept: Optional[Callable[[Any], bool]] = None,
+        bucket_limit: int = 256
+    ) -> List[tuple[Any, float]]:
+        """Up to limit (key, estimated Jaccard similarity) pairs at or above threshold, most similar first
+
+        At most bucket_limit candidates are taken from each bucket: a bucket that
+        large is mostly near-identical sets, and verifying all of them would
+        dominate the lookup.
+        """
+        import numpy as np
+        features = list(features)
+        if not features or not self._ids:
+            return []
+        minhashes = self._minhashes([features])
+        partition_hash = zlib.crc32(partition.encode())
+        candidates = []
+        buckets = self._bucket_hashes(minhashes, partition_hash)[0]
+        for band, sorted_buckets in enumerate(self._sorted_buckets):
+            # A uint32 needle: any other type makes searchsorted cast the whole band first
+            start = sorted_buckets.searchsorted(buckets[band])
+            end = sorted_buckets.searchsorted(buckets[band], "right")
+            if end > start:
+                candidates.append(self._sorted_ids[band][start:min(end, start + bucket_limit)])
+            pending = self._pending[band].get(int(buckets[band]))
+            if pending:
+                candidates.append(np.array(pending, dtype=np.int32))
+        if not candidates:
+            return []
+
+        # Verified before deduplicating: far fewer ids survive the threshold than enter it
+        ids = np.concatenate(candidates)
+        ids = ids[self._live[ids] & (self._partitions[ids] == partition_hash)]
+        agreement = np.count_nonzero(self._signatures[ids] == minhashes[0].astype(np.uint16), axis=1)
+        matches = agreement >= math.ceil(threshold * self.num_perm)
+        ids, first = np.unique(ids[matches], return_index=True)
+        similarity = agreement[matches][first] / self.num_perm
+
+        results = []
+        for position in np.argsort(-similarity, kind="stable").tolist():
+            key = self._keys[ids[position]]
+            if accept is None or accept(key):
+                results.append((key, float(similarity[position])))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and index memory, excluding the key objects themselves"""
+        memory = (
+            self._signatures.nbytes + self._partitions.nbytes + self._live.nbytes
+            + sum(band.nbytes for band in self._sorted_buckets) + sum(band.nbytes for band in self._sorted_ids)
+            + sum(sys.getsizeof(pending) for pending in self._pending) + self._pending_count * self.bands * 40
+            + sys.getsizeof(self._keys) + sys.getsizeof(self._ids)
+        )
+        return {
+            "entries": len(self._ids),
+            "memory_bytes": memory,
+            "bytes_per_entry": round(memory / len(self._ids)) if self._ids else 0
+        }
+
+class WriteBehindBuffer:
+    """Accumulate documents per collection and write them in insert_many batches"""
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        # Batch writes still running, including those whose flusher was cancelled
+        self._writes: set = set()
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def backlog(self) -> int:
+        return sum(len(documents) for documents in self._pending.values())
+
+    async def add(self, collection_name: str, document: Dict[str, Any]):
+        # Writing inline once the buffer is full bounds memory under sustained load
+        if self.backlog >= self.max_pending:
+            await self.flush()
+        documents = self._pending.setdefault(collection_name, [])
+        documents.append(document)
+        if len(documents) >= self.batch_size:
+            spawn_background_task(self.flush(collection_name))
+
+    async def flush(self, collection_name: Optional[str] = None):
+        names = [collection_name] if collection_name else list(self._pending)
+        for name in names:
+            documents = self._pending.pop(name, [])
+            if not documents:
+                continue
+            write = asyncio.ensure_future(self._write(name, documents))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+            # Shielded so a shutdown cancelling the flusher cannot drop a batch mid-write
+            await asyncio.shield(write)
+
+    async def drain(self):
+        """Flush everything buffered and wait for writes still in flight, before the client closes"""
+        await self.flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    async def _write(self, name: str, documents: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            await db[name].insert_many(documents, ordered=False)
+            self.written += len(documents)
+        except BulkWriteError as e:
+            self.written += e.details.get("nInserted", 0)
+            self.failed += len(documents) - e.details.get("nInserted", 0)
+            logging.error(f"Write-behind flush to {name} partially failed: {str(e)}")
+        except Exception as e:
+            self.failed += len(documents)
+            logging.error(f"Write-behind flush to {name} failed: {str(e)}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def run(self):
+        """Flush every collection on a fixed interval forever"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backlog": self.backlog,
+            "backlog_by_collection": {name: len(documents) for name, documents in self._pending.items() if documents},
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0
+        }
+
+class BatchLoader:
+    """Merge concurrent point lookups on one field into a single $in query
+
+    Lookups issued during the same event loop tick are collected and sent
+    together once the tick's other ready callbacks have run.
+    """
+
+    def __init__(self, collection_name: str, key_field: str, memo_ttl: Optional[float] = None, memo_size: int = 10000):
+        self.collection_name = collection_name
+        self.key_field = key_field
+        self._memo = LRUCache(memo_size, ttl=memo_ttl) if memo_ttl else None
+        # event loop -> key -> futures awaiting that key
+        self._pending = weakref.WeakKeyDictionary()
+        self.batches = 0
+        self.keys_loaded = 0
+
+    async def load(self, key: Any, use_memo: bool = True) -> Optional[Dict[str, Any]]:
+        if use_memo and self._memo is not None:
+            document = self._memo.get(key)
+            if document is not None:
+                return dict(document)
+
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(loop)
+        if pending is None:
+            pending = self._pending[loop] = {}
+            loop.call_soon(lambda: spawn_background_task(self._dispatch(loop)))
+        future = loop.create_future()
+        pending.setdefault(key, []).append(future)
+        document = await future
+        return dict(document) if document is not None else None
+
+    async def _dispatch(self, loop):
+        pending = self._pending.pop(loop, {})
+        if not pending:
+            return
+        self.batches += 1
+        self.keys_loaded += len(pending)
+        try:
+            documents = await db[self.collection_name].find(
+                {self.key_field: {"$in": list(pending)}}, {"_id": 0}
+            ).to_list(None)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        by_key = {document[self.key_field]: document for document in documents}
+        for key, futures in pending.items():
+            document = by_key.get(key)
+            if document is not None and self._memo is not None:
+                self._memo.set(key, document)
+            for future in futures:
+                if not future.done():
+                    future.set_result(document)
+
+    def invalidate(self, key: Any):
+        if self._memo is not None:
+            self._memo.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "keys_loaded": self.keys_loaded,
+            "avg_batch_size": self.keys_loaded / self.batches if self.batches else 0.0,
+            "memo": self._memo.stats() if self._memo is not None else None
+        }
+
+user_loader = BatchLoader("users", "id", memo_ttl=USER_LOADER_MEMO_SECONDS or None, memo_size=USER_LOADER_MEMO_SIZE)
+
+# user_id -> {"id", "email", "name", "created_at"}
+user_profile_cache = LRUCache(USER_PROFILE_CACHE_SIZE, ttl=USER_PROFILE_CACHE_TTL_SECONDS)
+
+def cache_user_profile(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the public profile fields of a user document"""
+    profile = {field: user[field] for field in ("id", "email", "name", "created_at")}
+    user_profile_cache.set(profile["id"], profile)
+    return profile
+
+async def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    """Get a user's public profile, from cache when possible"""
+    profile = user_profile_cache.get(user_id)
+    if profile is None:
+        user = await user_loader.load(user_id)
+        if not user:
+            return None
+        profile = cache_user_profile(user)
+    return profile
+
+async def get_user_display_name(user_id: str) -> str:
+    """Get the name to attribute a user's content to"""
+    profile = await get_user_profile(user_id)
+    return profile["name"] if profile else "Unknown User"
+
+def invalidate_user(user_id: str):
+    """Forget everything cached about a user"""
+    user_profile_cache.pop(user_id)
+    user_loader.invalidate(user_id)
+
+# token -> (user_id, exp, iat) for tokens whose signature has already been verified
+token_cache = LRUCache(TOKEN_CACHE_SIZE)
+# user_id -> unix time; tokens issued at or before it are rejected
+token_revocations: Dict[str, float] = {}
+token_revocations_synced_at = 0.0
+
+def record_token_revocation(user_id: str, revoked_at: float):
+    """Remember a revocation; verified tokens in token_cache are checked against it on every request"""
+    # Re-inserted so the dict stays ordered roughly oldest first and pruning only looks at its head
+    token_revocations[user_id] = max(token_revocations.pop(user_id, 0), revoked_at)
+    # Every token a revocation this old applies to has expired on its own
+    cutoff = time.time() - JWT_EXPIRATION_DELTA.total_seconds()
+    while token_revocations:
+        oldest = next(iter(token_revocations))
+        if token_revocations[oldest] > cutoff:
+            break
+        del token_revocations[oldest]
+
+async def revoke_user_tokens(user_id: str):
+    """Invalidate every token issued to a user so far
+
+    This worker rejects them at once; other workers reject them after their
+    next sync, within TOKEN_REVOCATION_SYNC_SECONDS.
+    """
+    # Unix time, like the iat claim: naive datetimes would be read as local time
+    revoked_at = time.time()
+    record_token_revocation(user_id, revoked_at)
+    # Persisted so other workers pick it up on their next sync
+    await db.token_revocations.update_one(
+        {"user_id": user_id},
+        {"$set": {"revoked_at": revoked_at, "expires_at": datetime.utcnow() + JWT_EXPIRATION_DELTA}},
+        upsert=True
+    )
+
+async def sync_token_revocations():
+    """Load revocations recorded since the last sync"""
+    global token_revocations_synced_at
+    since = token_revocations_synced_at
+    token_revocations_synced_at = time.time() - TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS
+    async for revocation in db.token_revocations.find({"revoked_at": {"$gt": since}}, {"_id": 0}):
+        record_token_revocation(revocation["user_id"], revocation["revoked_at"])
+
+async def run_token_revocation_sync():
+    """Sync token revocations forever at a fixed interval"""
+    while True:
+        try:
+            await sync_token_revocations()
+        except Exception as e:
+            logging.error(f"Token revocation sync failed: {str(e)}")
+        await asyncio.sleep(TOKEN_REVOCATION_SYNC_SECONDS)
+
+class TokenBucketLimiter:
+    """Token-bucket rate limiter keyed by caller identity"""
+
+    def __init__(self, scope: str, capacity: int, per_minute: float, shared: bool = False, max_keys: int = 100000):
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = per_minute / 60.0  # tokens per second
+        self.shared = shared
+        self._buckets = LRUCache(max_keys)  # key -> (tokens, updated_at)
+        self.allowed = 0
+        self.rejected = 0
+
+    def _acquire_local(self, key: str, cost: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        if tokens >= cost:
+            self._buckets.set(key, (tokens - cost, now))
+            return 0.0
+        self._buckets.set(key, (tokens, now))
+        return (cost - tokens) / self.rate
+
+    async def _acquire_shared(self, key: str, cost: float) -> float:
+        now = datetime.utcnow()
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$min": [
+            self.capacity,
+            {"$add": [{"$ifNull": ["$tokens", self.capacity]}, {"$multiply": [elapsed_seconds, self.rate]}]}
+        ]}
+        # One atomic pipeline update refills, checks and spends
+        bucket = await db.rate_limits.find_one_and_update(
+            {"key": f"{self.scope}:{key}"},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return 0.0 if bucket["allowed"] else (cost - bucket["tokens"]) / self.rate
+
+    async def acquire(self, key: str, cost: float = 1) -> float:
+        """Spend tokens for key, returning 0 if allowed or the seconds to wait"""
+        if self.shared:
+            try:
+                retry_after = await self._acquire_shared(key, cost)
+            except Exception as e:
+                # Fail open: an unavailable limiter store must not take the API down
+                logging.error(f"Shared rate limiter unavailable: {str(e)}")
+                retry_after = 0.0
+        else:
+            retry_after = self._acquire_local(key, cost)
+        if retry_after > 0:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        return {"allowed": self.allowed, "rejected": self.rejected, "tracked_keys": len(self._buckets)}
+
+search_rate_limiter = TokenBucketLimiter(
+    "search", SEARCH_RATE_LIMIT_BURST, SEARCH_RATE_LIMIT_PER_MINUTE,
+    shared=RATE_LIMIT_BACKEND == "mongo", max_keys=RATE_LIMIT_MAX_KEYS
+)
+custom_recipe_rate_limiter = TokenBucketLimiter(
+    "custom_recipe", CUSTOM_RECIPE_RATE_LIMIT_BURST, CUSTOM_RECIPE_RATE_LIMIT_PER_MINUTE,
+    shared=RATE_LIMIT_BACKEND == "mongo", max_keys=RATE_LIMIT_MAX_KEYS
+)
+
+write_buffer = WriteBehindBuffer(WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_INTERVAL_SECONDS, WRITE_BEHIND_MAX_PENDING)
+
 # Helper functions
+password_hash_executor: Optional[ThreadPoolExecutor] = None
+
+def get_password_hash_executor() -> ThreadPoolExecutor:
+    global password_hash_executor
+    if password_hash_executor is None:
+        password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return password_hash_executor
+
+def scrypt_digest(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=32, maxmem=256 * n * r + 1024 * 1024)
+
 def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password using salted scrypt, encoded as scrypt$n$r$p$salt$digest"""
+    salt = secrets.token_bytes(16)
+    digest = scrypt_digest(password, salt, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    return "$".join([
+        "scrypt", str(PASSWORD_SCRYPT_N), str(PASSWORD_SCRYPT_R), str(PASSWORD_SCRYPT_P),
+        base64.b64encode(salt).decode(), base64.b64encode(digest).decode()
+    ])
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return hash_password(plain_password) == hashed_password
+    """Verify password against a scrypt or legacy unsalted SHA-256 hash"""
+    if not hashed_password.startswith("scrypt$"):
+        legacy = hashlib.sha256(plain_password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed_password)
+    try:
+        _, n, r, p, salt, digest = hashed_password.split("$")
+        expected = base64.b64decode(digest)
+        actual = scrypt_digest(plain_password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash predates the current algorithm or cost settings"""
+    current = f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$"
+    return not hashed_password.startswith(current)
+
+async def hash_password_async(password: str) -> str:
+    """Hash password on the bounded hashing pool, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(get_password_hash_executor(), hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify password on the bounded hashing pool, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(
+        get_password_hash_executor(), verify_password, plain_password, hashed_password
+    )
 
 def create_access_token(user_id: str) -> str:
     """Create JWT access token"""
+    now = datetime.utcnow()
     payload = {
         "user_id": user_id,
-        "exp": datetime.utcnow() + JWT_EXPIRATION_DELTA
+        # Sub-second, so a token minted in the same second as a revocation is ordered correctly
+        "iat": time.time(),
+        "exp": now + JWT_EXPIRATION_DELTA
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def encode_cursor(sort_value: datetime, doc_id: str) -> str:
+    """Encode a keyset position as an opaque pagination cursor"""
+    raw = json.dumps({"t": sort_value.isoformat(), "id": doc_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a pagination cursor back into its keyset position"""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(raw["t"]), str(raw["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def paginate_user_documents(
+    collection,
+    user_id: str,
+    sort_field: str,
+    limit: int,
+    cursor: Optional[str],
+    projection: Dict[str, int]
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of a user's documents, newest first, using keyset pagination"""
+    query: Dict[str, Any] = {"user_id": user_id}
+    if cursor:
+        sort_value, doc_id = decode_cursor(cursor)
+        query["$or"] = [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "id": {"$lt": doc_id}}
+        ]
+
+    # Fetch one extra document to learn whether another page exists
+    documents = await collection.find(query, projection).sort(
+        [(sort_field, -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1][sort_field], documents[-1]["id"])
+    return documents, next_cursor
+
+def recipe_fieldset(
+    fields: Optional[str] = Query(None, description="card, full, or a comma-separated list of recipe fields"),
+    view: Optional[str] = Query(None, pattern="^(full|summary)$")
+) -> Optional[tuple]:
+    """Resolve the requested sparse fieldset; view=summary is the older spelling of fields=card"""
+    if fields is None:
+        return RECIPE_FIELD_PRESETS["card" if view == "summary" else "full"]
+    if fields in RECIPE_FIELD_PRESETS:
+        return RECIPE_FIELD_PRESETS[fields]
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(RECIPE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown recipe fields: {', '.join(sorted(unknown))}")
+    # Canonical order keeps one cache variant per distinct selection
+    return tuple(field for field in RECIPE_FIELDS if field in requested or field == "id")
+
+def fieldset_projection(fieldset: Optional[tuple], keys: tuple, prefix: str = "") -> Dict[str, int]:
+    """Mongo projection returning only the selected recipe fields plus the given keys"""
+    if fieldset is None:
+        return {"_id": 0}
+    return {"_id": 0, **{key: 1 for key in keys}, **{f"{prefix}{field}": 1 for field in fieldset}}
+
+def select_recipe_fields(recipe: Dict[str, Any], fieldset: Optional[tuple]) -> Dict[str, Any]:
+    """Serializer-side counterpart of fieldset_projection for payloads not read from Mongo"""
+    if fieldset is None:
+        return recipe
+    return {field: recipe[field] for field in fieldset if field in recipe}
+
+def recipe_content_hash(recipe_data: Dict[str, Any]) -> str:
+    """Compute a stable content hash over every field of a recipe payload except its id"""
+    def normalize(text: Any) -> str:
+        return " ".join(str(text).lower().split())
+
+    def canonical_value(value: Any) -> Any:
+        # 350 and 350.0 are the same number once a payload has been through a JSON client
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        if isinstance(value, dict):
+            return {key: canonical_value(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [canonical_value(item) for item in value]
+        return value
+
+    canonical = {key: canonical_value(value) for key, value in recipe_data.items() if key != "id"}
+    canonical.update(
+        title=normalize(recipe_data.get("title", "")),
+        # Ingredient order carries no meaning, instruction order does
+        ingredients=sorted(normalize(item) for item in recipe_data.get("ingredients") or []),
+        instructions=[normalize(step) for step in recipe_data.get("instructions") or []]
+    )
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=json_default)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+def custom_recipe_hash(custom_recipe: Dict[str, Any]) -> str:
+    """Content hash of what the user wrote, leaving out nutrition analysis and storage keys"""
+    return recipe_content_hash({
+        field: custom_recipe[field] for field in ("title", "ingredients", "instructions") if field in custom_recipe
+    })
+
+def recipe_content_id(recipe_hash: str) -> int:
+    """Recipe id derived from a content hash; 52 bits stay exact as a JavaScript number"""
+    return int(recipe_hash[:13], 16)
+
+def build_saved_recipe(user_id: str, recipe_data: Dict[str, Any], **fields) -> SavedRecipe:
+    """Create a favorite that references its recipe by content hash
+
+    The id clients address the favorite by is derived from the content too,
+    so two different recipes never share one and saving again is a duplicate.
+    """
+    recipe_hash = recipe_content_hash(recipe_data)
+    return SavedRecipe(
+        user_id=user_id,
+        recipe_id=recipe_content_id(recipe_hash),
+        recipe_hash=recipe_hash,
+        **fields
+    )
+
+async def store_recipes(recipes: List[Dict[str, Any]], generated: bool = False):
+    """Store recipe payloads once each in the content-addressed recipes collection
+
+    Payloads from clients (favorites, imports) never expire and are never
+    recommended to other users. Generated payloads are marked and expire
+    unless a favorite refers to them. A hash already stored keeps its row, so
+    a generation never rewrites a payload some user's library resolves to.
+    """
+    now = datetime.utcnow()
+    hashed = [(recipe_content_hash(recipe_data), recipe_data) for recipe_data in recipes]
+    if generated:
+        operations = [
+            UpdateOne(
+                {"hash": recipe_hash},
+                {"$setOnInsert": {
+                    "recipe_data": recipe_data, "generated": True, "generated_at": now,
+                    "created_at": now, "expires_at": now + GENERATED_RECIPE_RETENTION_DELTA
+                }},
+                upsert=True
+            )
+            for recipe_hash, recipe_data in hashed
+        ]
+    else:
+        operations = [
+            UpdateOne(
+                {"hash": recipe_hash},
+                # A favorite now refers to it, so it must outlive the generated retention
+                {"$setOnInsert": {"recipe_data": recipe_data, "created_at": now}, "$unset": {"expires_at": ""}},
+                upsert=True
+            )
+            for recipe_hash, recipe_data in hashed
+        ]
+    if not operations:
+        return
+    try:
+        result = await db.recipes.bulk_write(operations, ordered=False)
+        inserted = set(result.upserted_ids)
+    except BulkWriteError as e:
+        # Concurrent upserts of the same hash race on the unique index; either copy wins
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        inserted = {upsert["index"] for upsert in e.details.get("upserted", [])}
+    if generated:
+        # Only rows this call created: the rest are client copies, or generated and indexed already
+        index_similar_recipes(stored_recipe_entry(*hashed[index]) for index in sorted(inserted))
+
+async def resolve_saved_recipes(
+    saved_recipes: List[Dict[str, Any]],
+    fieldset: Optional[tuple] = None
+) -> List[Dict[str, Any]]:
+    """Resolve favorites to recipe payloads with one batched recipes query"""
+    hashes = list({
+        saved_recipe["recipe_hash"] for saved_recipe in saved_recipes
+        if "recipe_data" not in saved_recipe and saved_recipe.get("recipe_hash")
+    })
+    stored: Dict[str, Dict[str, Any]] = {}
+    if hashes:
+        projection = fieldset_projection(fieldset, STORED_RECIPE_KEYS, "recipe_data.")
+        async for recipe in db.recipes.find({"hash": {"$in": hashes}}, projection):
+            stored[recipe["hash"]] = recipe["recipe_data"]
+
+    resolved = []
+    for saved_recipe in saved_recipes:
+        if "recipe_data" in saved_recipe:
+            resolved.append(saved_recipe["recipe_data"])
+        elif saved_recipe.get("recipe_hash") in stored:
+            # Identical recipes share one payload, but each user keeps the id they saved it under
+            resolved.append({**stored[saved_recipe["recipe_hash"]], "id": saved_recipe["recipe_id"]})
+    return resolved
+
+def favorite_id_query(user_id: str, recipe_ids: List[int]) -> Dict[str, Any]:
+    """Match a user's favorites by client recipe id, including legacy embedded rows"""
+    return {
+        "user_id": user_id,
+        "$or": [
+            {"recipe_id": {"$in": recipe_ids}},
+            {"recipe_data.id": {"$in": recipe_ids}}
+        ]
+    }
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, as for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header or request.method not in ("GET", "HEAD"):
+        return False
+    etag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") in (etag, "*") for candidate in header.split(","))
+
+def cached_json_response(request: Request, entry: Dict[str, Any], cache_control: str) -> Response:
+    """Serve a cached JSON body, or 304 when the client already has it
+
+    Compressed variants are produced once and kept on the cache entry, so
+    repeat hits send stored bytes without compressing anything.
+    """
+    headers = {"ETag": entry["etag"], "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    body = entry["body"]
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is not None and len(body) >= COMPRESSION_MIN_BYTES:
+        headers["ETag"] = weak_etag(entry["etag"])
+        if etag_matches(request, entry["etag"]):
+            return Response(status_code=304, headers=headers)
+        encoded = entry.setdefault("encoded", {})
+        if encoding not in encoded:
+            encoded[encoding] = compress_body(body, encoding, precompressed=True)
+        headers["Content-Encoding"] = encoding
+        return Response(content=encoded[encoding], media_type="application/json", headers=headers)
+    if etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cached_variant(cached: Dict[str, Any], fieldset: Optional[tuple], select) -> Dict[str, Any]:
+    """Serialized entry for one fieldset of a cached payload, built on first request"""
+    variants = cached["variants"]
+    if fieldset not in variants:
+        payload = cached["payload"] if fieldset is None else select(cached["payload"], fieldset)
+        variants[fieldset] = build_cache_entry(payload)
+    return variants[fieldset]
+
+def select_search_fields(payload: Dict[str, Any], fieldset: Optional[tuple]) -> Dict[str, Any]:
+    return {
+        category: {group: [select_recipe_fields(recipe, fieldset) for recipe in recipes] for group, recipes in groups.items()}
+        for category, groups in payload.items()
+    }
+
+def select_shared_fields(payload: Dict[str, Any], fieldset: Optional[tuple]) -> Dict[str, Any]:
+    return {**payload, "recipe": select_recipe_fields(payload["recipe"], fieldset)}
+
+def build_cache_entry(payload: Dict[str, Any], **fields) -> Dict[str, Any]:
+    """Serialize a payload once and fingerprint it with a strong ETag"""
+    body = fast_json_dumps(payload) if FAST_JSON_RESPONSES else json.dumps(payload, default=json_default).encode()
+    return {"etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"', "body": body, **fields}
+
+async def bump_library_version(user_id: str):
+    """Mark a user's library as changed so cached listings revalidate"""
+    await db.library_versions.update_one(
+        {"user_id": user_id},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def library_etag(request: Request, user_id: str) -> str:
+    """ETag for a library listing: the user's library version plus the query parameters"""
+    record = await db.library_versions.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+    version = record["version"] if record else 0
+    params = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f'"{hashlib.sha256(f"{user_id}:{version}:{params}".encode()).hexdigest()[:32]}"'
+
+def json_default(value: Any) -> Any:
+    """Serialize values the json module does not handle natively"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def stream_library_export(user_id: str) -> AsyncIterator[bytes]:
+    """Stream a user's recipe library as gzip-compressed NDJSON"""
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+
+    def encode(record_type: str, document: Dict[str, Any]) -> bytes:
+        line = json.dumps({"type": record_type, "data": document}, default=json_default) + "\n"
+        return compressor.compress(line.encode())
+
+    # Favorites are exported with their payloads, resolved one batch at a time
+    cursor = db.saved_recipes.find({"user_id": user_id}, {"_id": 0}).batch_size(LIBRARY_EXPORT_BATCH_SIZE)
+    batch: List[Dict[str, Any]] = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) < LIBRARY_EXPORT_BATCH_SIZE:
+            continue
+        chunk = b"".join(encode("favorite", {"recipe_data": recipe_data}) for recipe_data in await resolve_saved_recipes(batch))
+        if chunk:
+            yield chunk
+        batch = []
+    yield b"".join(encode("favorite", {"recipe_data": recipe_data}) for recipe_data in await resolve_saved_recipes(batch))
+
+    cursor = db.custom_recipes.find({"user_id": user_id}, {"_id": 0}).batch_size(LIBRARY_EXPORT_BATCH_SIZE)
+    async for document in cursor:
+        chunk = encode("custom", document)
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+async def iter_ndjson_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield lines from a plain or gzip-compressed NDJSON byte stream"""
+    decompressor = None
+    buffer = b""
+    async for chunk in stream:
+        if decompressor is None:
+            if not chunk:
+                continue
+            # 47 lets zlib detect the gzip or zlib header automatically
+            decompressor = zlib.decompressobj(wbits=47) if chunk[:2] == b"\x1f\x8b" else False
+        while chunk:
+            if decompressor:
+                # Inflate at most one line's worth at a time, so a small chunk cannot balloon in memory
+                try:
+                    data = decompressor.decompress(chunk, LIBRARY_IMPORT_MAX_LINE_BYTES)
+                except zlib.error:
+                    raise HTTPException(status_code=400, detail="Invalid compressed import file")
+                chunk = decompressor.unconsumed_tail
+            else:
+                data, chunk = chunk, b""
+            buffer += data
+
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > LIBRARY_IMPORT_MAX_LINE_BYTES:
+                raise HTTPException(status_code=413, detail="Import line too large")
+            for line in lines:
+                yield line
+
+    if decompressor:
+        buffer += decompressor.flush()
+    for line in buffer.split(b"\n"):
+        yield line
+
+def parse_library_record(line: bytes, user_id: str) -> Optional[tuple[str, Dict[str, Any]]]:
+    """Turn one exported NDJSON line into a document owned by the importing user"""
+    record = json.loads(line)
+    data = record["data"]
+    if record["type"] == "favorite":
+        recipe_data = data["recipe_data"]
+        if not isinstance(recipe_data, dict):
+            return None
+        saved_recipe = build_saved_recipe(user_id, recipe_data)
+        # The payload rides along until the batch is written to the recipe store
+        return "favorite", {**saved_recipe.dict(), "recipe_data": recipe_data}
+    if record["type"] == "custom":
+        # Fresh ids and share tokens keep imported rows from clashing with existing ones
+        data = {key: value for key, value in data.items() if key not in ("id", "user_id", "share_token", "recipe_hash")}
+        custom_recipe = CustomRecipe(user_id=user_id, recipe_hash=custom_recipe_hash(data), **data)
+        return "custom", custom_recipe.dict()
+    return None
+
+async def backfill_custom_recipe_hashes(user_id: str):
+    """Hash a user's custom recipes created before content hashes were stored"""
+    operations = [
+        UpdateOne({"id": custom_recipe["id"]}, {"$set": {"recipe_hash": custom_recipe_hash(custom_recipe)}})
+        async for custom_recipe in db.custom_recipes.find(
+            {"user_id": user_id, "recipe_hash": {"$exists": False}},
+            {"_id": 0, "id": 1, "title": 1, "ingredients": 1, "instructions": 1}
+        )
+    ]
+    if operations:
+        await db.custom_recipes.bulk_write(operations, ordered=False)
+
+async def drop_existing_custom_recipes(user_id: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Filter out imported custom recipes the user already has, or that repeat earlier in the batch"""
+    seen = set()
+    async for custom_recipe in db.custom_recipes.find(
+        {"user_id": user_id, "recipe_hash": {"$in": list({document["recipe_hash"] for document in documents})}},
+        {"_id": 0, "recipe_hash": 1}
+    ):
+        seen.add(custom_recipe["recipe_hash"])
+    fresh = []
+    for document in documents:
+        if document["recipe_hash"] not in seen:
+            seen.add(document["recipe_hash"])
+            fresh.append(document)
+    return fresh
+
+async def insert_library_batch(collection, documents: List[Dict[str, Any]]) -> tuple[int, int]:
+    """Insert a batch of imported documents, returning (inserted, duplicates)"""
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as e:
+        duplicates = sum(1 for error in e.details.get("writeErrors", []) if error.get("code") == 11000)
+        return e.details.get("nInserted", 0), duplicates
+
 def create_reset_token() -> str:
     """Create secure password reset token"""
     return secrets.token_urlsafe(32)
@@ -231,14 +1987,63 @@ async def send_password_reset_email(email: str, reset_token: str, user_name: str
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
     """Get current authenticated user"""
-    try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    token = credentials.credentials
+    cached = token_cache.get(token)
+    if cached is None or cached[1] <= time.time():
+        # Not verified yet, or expired since: run the full signature check
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        except jwt.PyJWTError:
+            token_cache.pop(token)
+            raise HTTPException(status_code=401, detail="Invalid authentication")
         user_id: str = payload.get("user_id")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication")
-        return user_id
-    except jwt.PyJWTError:
+        # Tokens issued before revocations existed carry no iat
+        cached = (user_id, payload["exp"], payload.get("iat", 0))
+        token_cache.set(token, cached)
+
+    user_id, _, issued_at = cached
+    if issued_at <= token_revocations.get(user_id, -1):
         raise HTTPException(status_code=401, detail="Invalid authentication")
+    return user_id
+
+async def rate_limit_identity(request: Request) -> str:
+    """Identify the caller by user id when authenticated, otherwise by client IP"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return "user:" + await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+        except HTTPException:
+            pass
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if TRUST_PROXY_HEADERS and forwarded_for:
+        return "ip:" + forwarded_for.split(",")[0].strip()
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+async def enforce_rate_limit(limiter: TokenBucketLimiter, request: Request, cost: float = 1):
+    """Reject callers who exhausted their bucket with 429"""
+    if not RATE_LIMITING:
+        return
+    if cost > limiter.capacity:
+        # Even a full bucket could never pay for it, so waiting would not help
+        raise HTTPException(
+            status_code=422,
+            detail=f"This request needs {cost:g} {limiter.scope} requests at once; at most {limiter.capacity} are allowed"
+        )
+    retry_after = await limiter.acquire(await rate_limit_identity(request), cost)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def rate_limited(limiter: TokenBucketLimiter, cost: float = 1):
+    """Build a dependency that enforces a fixed-cost rate limit"""
+    async def check_rate_limit(request: Request):
+        await enforce_rate_limit(limiter, request, cost)
+    return check_rate_limit
 
 def has_onion_garlic(ingredients: List[str]) -> bool:
     """Check if recipe contains onion/garlic ingredients"""
@@ -299,10 +2104,48 @@ def categorize_recipes(recipes: List[Recipe]) -> RecipeSearchResponse:
         }
     )
 
+def canonical_ingredients(ingredients: List[str]) -> tuple:
+    """The same ingredients in any order, case or spacing canonicalize to one key"""
+    return tuple(sorted({" ".join(ingredient.lower().split()) for ingredient in ingredients}))
+
+def search_cache_key(ingredients: List[str], cuisine: str) -> tuple:
+    return canonical_ingredients(ingredients), (cuisine or "any").strip().lower()
+
+# Seasonings nearly every recipe has; they say nothing about what a dish is
+PANTRY_STAPLES = frozenset({
+    "salt", "pepper", "black pepper", "salt and pepper", "oil", "olive oil", "vegetable oil", "water", "sugar"
+})
+
+def ingredient_features(ingredients: Iterable[str]) -> set:
+    """Words of each ingredient without plural endings, so "green peas" and "peas" share "pea" """
+    features = set()
+    for ingredient in ingredients:
+        ingredient = " ".join(ingredient.lower().split())
+        if ingredient in PANTRY_STAPLES:
+            continue
+        for word in ingredient.split():
+            if word.endswith("oes"):
+                word = word[:-2]
+            elif word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            features.add(word)
+    return features
+
+def load_llm_chat() -> tuple:
+    """Import the LLM client on first use; it pulls in litellm and a large provider SDK tree"""
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+    return LlmChat, UserMessage
+
 async def analyze_custom_recipe_nutrition(ingredients: List[str], servings: int) -> tuple[RecipeNutrition, int]:
     """Analyze nutrition and cooking time for custom recipe using LLM"""
+    cache_key = (canonical_ingredients(ingredients), servings)
+    cached = nutrition_cache.get(cache_key)
+    if cached is not None:
+        return RecipeNutrition(**cached["nutrition"]), cached["readyInMinutes"]
+
     try:
         # Initialize LLM chat
+        LlmChat, UserMessage = load_llm_chat()
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
             session_id=f"nutrition_analysis_{uuid.uuid4()}",
@@ -364,6 +2207,8 @@ Return only the JSON response, no other text."""
             )
             
             ready_in_minutes = analysis.get('readyInMinutes', 30)
+            # Fallback estimates above are not cached, so a later call can retry the LLM
+            nutrition_cache.set(cache_key, {"nutrition": nutrition.dict(), "readyInMinutes": ready_in_minutes})
             
             return nutrition, ready_in_minutes
             
@@ -381,6 +2226,7 @@ async def generate_recipes_with_llm(ingredients: str, cuisine: str = 'any') -> L
     """Generate diverse recipes using LLM based on user ingredients"""
     try:
         # Initialize LLM chat
+        LlmChat, UserMessage = load_llm_chat()
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
             session_id=f"recipe_gen_{uuid.uuid4()}",
@@ -461,55 +2307,37 @@ Return only the JSON response, no other text."""
         # Parse the JSON response
         try:
             recipe_data = json.loads(response)
-            recipes = []
+            raw_recipes = []
             
             for i, recipe_json in enumerate(recipe_data.get('recipes', [])):
-                # Ensure unique IDs
-                recipe_id = recipe_json.get('id', 1000 + i)
-                
-                # Extract recipe data with defaults
-                title = recipe_json.get('title', f'Recipe {i+1}')
-                ready_in_minutes = recipe_json.get('readyInMinutes', 30)
-                servings = recipe_json.get('servings', 2)
                 ingredients_list = recipe_json.get('ingredients', [])
-                instructions = recipe_json.get('instructions', ['No instructions available'])
-                
-                # Extract nutritional information
-                calories = recipe_json.get('calories', 300.0)
-                protein = recipe_json.get('protein', 15.0)
-                carbs = recipe_json.get('carbs', 30.0)
-                fat = recipe_json.get('fat', 10.0)
-                fiber = recipe_json.get('fiber', 5.0)
-                
-                nutrition = RecipeNutrition(
-                    calories=calories,
-                    protein=protein,
-                    carbs=carbs,
-                    fat=fat,
-                    fiber=fiber
-                )
-                
-                # Check for onion/garlic
-                has_onion_garlic_flag = has_onion_garlic(ingredients_list)
                 
-                # Get image URL or use placeholder
-                image_url = recipe_json.get('image', 'placeholder')
-                
-                # Create recipe object
-                recipe = Recipe(
-                    id=recipe_id,
-                    title=title,
-                    image=image_url,
-                    readyInMinutes=ready_in_minutes,
-                    servings=servings,
-                    nutrition=nutrition,
-                    hasOnionGarlic=has_onion_garlic_flag,
-                    ingredients=ingredients_list,
-                    instructions=instructions
-                )
-                
-                recipes.append(recipe)
+                # Extract recipe data with defaults; validated as a batch below
+                raw_recipes.append({
+                    # Replaced below by an id derived from the content
+                    "id": recipe_json.get('id', 1000 + i),
+                    "title": recipe_json.get('title', f'Recipe {i+1}'),
+                    # Get image URL or use placeholder
+                    "image": recipe_json.get('image', 'placeholder'),
+                    "readyInMinutes": recipe_json.get('readyInMinutes', 30),
+                    "servings": recipe_json.get('servings', 2),
+                    "nutrition": {
+                        "calories": recipe_json.get('calories', 300.0),
+                        "protein": recipe_json.get('protein', 15.0),
+                        "carbs": recipe_json.get('carbs', 30.0),
+                        "fat": recipe_json.get('fat', 10.0),
+                        "fiber": recipe_json.get('fiber', 5.0)
+                    },
+                    # Check for onion/garlic
+                    "hasOnionGarlic": has_onion_garlic(ingredients_list),
+                    "ingredients": ingredients_list,
+                    "instructions": recipe_json.get('instructions', ['No instructions available'])
+                })
             
+            recipes = RECIPE_LIST_ADAPTER.validate_python(raw_recipes)
+            # The LLM numbers every response from 1001, so its ids would clash across searches
+            for recipe in recipes:
+                recipe.id = recipe_content_id(recipe_content_hash(recipe.dict()))
             return recipes
             
         except json.JSONDecodeError as e:
@@ -522,6 +2350,424 @@ Return only the JSON response, no other text."""
         logging.error(f"Error generating recipes with LLM: {str(e)}")
         return []
 
+# Account deletion
+transactions_supported: Optional[bool] = None
+
+async def supports_transactions() -> bool:
+    """Check once whether the deployment is a replica set or sharded cluster"""
+    global transactions_supported
+    if transactions_supported is None:
+        hello = await client.admin.command("hello")
+        transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return transactions_supported
+
+async def delete_user_data(user_id: str):
+    """Delete a user and everything they own in one cascade"""
+    if await supports_transactions():
+        # Operations on one session must not overlap, so the transaction runs them in turn
+        async with await client.start_session() as session:
+            async with session.start_transaction():
+                await db.users.delete_one({"id": user_id}, session=session)
+                await db.saved_recipes.delete_many({"user_id": user_id}, session=session)
+                await db.custom_recipes.delete_many({"user_id": user_id}, session=session)
+                await db.password_resets.delete_many({"user_id": user_id}, session=session)
+                await db.library_versions.delete_one({"user_id": user_id}, session=session)
+    else:
+        await asyncio.gather(
+            db.saved_recipes.delete_many({"user_id": user_id}),
+            db.custom_recipes.delete_many({"user_id": user_id}),
+            db.password_resets.delete_many({"user_id": user_id}),
+            db.library_versions.delete_one({"user_id": user_id})
+        )
+        # Last, so a failed cascade leaves an account the user can still sign in to and retry
+        await db.users.delete_one({"id": user_id})
+
+async def forget_deleted_user(user_id: str):
+    """Log a deleted user out everywhere and drop what is cached about them"""
+    share_cache.pop_tag(user_id, lambda entry: entry["user_id"] == user_id)
+    invalidate_user(user_id)
+    await revoke_user_tokens(user_id)
+
+async def purge_user_library(purge: Dict[str, Any]):
+    """Delete a large library in chunks, recording progress on the purge job"""
+    user_id = purge["user_id"]
+    try:
+        for collection in (db.saved_recipes, db.custom_recipes):
+            while True:
+                chunk = await collection.find({"user_id": user_id}, {"_id": 1}).limit(
+                    ACCOUNT_PURGE_CHUNK_SIZE
+                ).to_list(ACCOUNT_PURGE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                result = await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in chunk]}})
+                await db.account_purges.update_one({"id": purge["id"]}, {"$inc": {"deleted": result.deleted_count}})
+
+        await db.account_purges.update_one(
+            {"id": purge["id"]},
+            {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
+        )
+    except asyncio.CancelledError:
+        # Left as running so the next startup resumes it
+        raise
+    except Exception as e:
+        logging.error(f"Account purge {purge['id']} failed: {str(e)}")
+        await db.account_purges.update_one({"id": purge["id"]}, {"$set": {"status": "failed"}})
+
+async def resume_account_purges():
+    """Restart purges interrupted by a shutdown"""
+    async for purge in db.account_purges.find({"status": "running"}, {"_id": 0}):
+        spawn_background_task(purge_user_library(purge))
+
+# Search cache filling and pre-warming
+searches_in_flight = 0
+
+def parse_ingredient_list(ingredients: str) -> List[str]:
+    """Split a comma-separated ingredient string, requiring at least two ingredients"""
+    # Validate ingredients
+    if not ingredients or not ingredients.strip():
+        raise HTTPException(status_code=422, detail="Please provide at least one ingredient")
+    
+    # Check if we have at least 2 ingredients
+    ingredient_list = [ing.strip() for ing in ingredients.split(',') if ing.strip()]
+    if len(ingredient_list) < 2:
+        raise HTTPException(status_code=422, detail="Please provide at least 2 ingredients separated by commas")
+    return ingredient_list
+
+async def log_search(cache_key: tuple, cache_hit: bool):
+    """Record a search key for pre-warming"""
+    await write_buffer.add("search_log", {
+        "ingredients": list(cache_key[0]),
+        "cuisine": cache_key[1],
+        "cache_hit": cache_hit,
+        "searched_at": datetime.utcnow()
+    })
+
+# Semantic tier over the search cache, built on first use
+search_index: Optional[MinHashLSH] = None
+semantic_search_stats = {"hits": 0, "misses": 0}
+
+def get_search_index() -> MinHashLSH:
+    global search_index
+    if search_index is None:
+        # Keys leave with their cache entries; the cap only guards against keys the cache never held
+        search_index = MinHashLSH(max_entries=search_cache.local.maxsize)
+    return search_index
+
+def unindex_search_key(cache_key: tuple):
+    if search_index is not None:
+        search_index.remove(cache_key)
+
+def index_search_keys(cache_keys: Iterable[tuple]):
+    """Make cached searches findable by ingredient similarity"""
+    if SEARCH_SIMILARITY_THRESHOLD >= 1:
+        return
+    index = get_search_index()
+    by_cuisine: Dict[str, List[tuple]] = {}
+    for cache_key in cache_keys:
+        by_cuisine.setdefault(cache_key[1], []).append(cache_key)
+    for cuisine, keys in by_cuisine.items():
+        index.add_many(keys, [ingredient_features(ingredients) for ingredients, _ in keys], partition=cuisine)
+
+def cache_search_entry(cache_key: tuple, cached: Dict[str, Any], ttl: Optional[float] = None):
+    search_cache.set(cache_key, cached, ttl=ttl)
+    index_search_keys([cache_key])
+    # Generated recipes join the recipe store, and with it the similar recipe index
+    spawn_background_task(store_recipes([
+        recipe for groups in cached["payload"].values() for recipes in groups.values() for recipe in recipes
+    ], generated=True))
+
+def find_search_entry(cache_key: tuple) -> Optional[Dict[str, Any]]:
+    """The cached search for cache_key, or else for the most similar ingredients in the same cuisine"""
+    cached = search_cache.get(cache_key)
+    if SEARCH_SIMILARITY_THRESHOLD >= 1:
+        return cached
+    index = get_search_index()
+    if cached is not None:
+        # Entries another worker put in the shared tier join this worker's index when first served
+        if cache_key not in index:
+            index_search_keys([cache_key])
+        return cached
+
+    ingredients, cuisine = cache_key
+    features = ingredient_features(ingredients)
+
+    def contained(similar_key: tuple) -> bool:
+        # Recipes for a subset only use ingredients the user has; a superset's would need more
+        similar_features = ingredient_features(similar_key[0])
+        return similar_features <= features and len(similar_features) >= SEARCH_SIMILARITY_THRESHOLD * len(features)
+
+    for similar_key, _ in index.query(
+        features, partition=cuisine, threshold=SEARCH_SIMILARITY_THRESHOLD, limit=3, accept=contained
+    ):
+        cached = search_cache.get(similar_key)
+        if cached is not None:
+            semantic_search_stats["hits"] += 1
+            # A local expiry unindexes the key even when the shared tier still serves it
+            if similar_key not in index:
+                index_search_keys([similar_key])
+            return cached
+        # Cleared, or gone from the shared tier it was served from
+        index.remove(similar_key)
+    semantic_search_stats["misses"] += 1
+    return None
+
+async def generate_search_entry(ingredients: str, cuisine: str, cache_key: tuple) -> Optional[Dict[str, Any]]:
+    """Generate, categorize and cache one search; None when the LLM produced nothing"""
+    global searches_in_flight
+    searches_in_flight += 1
+    try:
+        recipes = await generate_recipes_with_llm(ingredients, cuisine)
+    finally:
+        searches_in_flight -= 1
+    if not recipes:
+        return None
+
+    logging.info(f"Generated {len(recipes)} recipes successfully")
+    cached = {"payload": categorize_recipes(recipes).dict(), "variants": {}}
+    cache_search_entry(cache_key, cached)
+    return cached
+
+prewarm_stats = {"runs": 0, "regenerated": 0, "tokens_spent": 0, "hits": 0, "last_run_at": None}
+
+async def acquire_lease(name: str, seconds: float) -> bool:
+    """Take or renew a named lease held by this worker process until it lapses"""
+    holder = f"{socket.gethostname()}:{os.getpid()}"
+    now = datetime.utcnow()
+    try:
+        # Matches only a lapsed lease or our own; otherwise the upsert collides on _id
+        await db.leases.update_one(
+            {"_id": name, "$or": [{"expires_at": {"$lte": now}}, {"holder": holder}]},
+            {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+def in_prewarm_window(now: datetime) -> bool:
+    start, _, end = SEARCH_PREWARM_HOURS.partition("-")
+    start = int(start)
+    end = int(end) if end else start + 1
+    if start <= end:
+        return start <= now.hour < end
+    # Windows such as "22-4" wrap past midnight
+    return now.hour >= start or now.hour < end
+
+async def popular_search_keys(limit: int) -> List[tuple]:
+    """The most frequent search keys in the retained search log"""
+    rows = await db.search_log.aggregate([
+        {"$group": {"_id": {"ingredients": "$ingredients", "cuisine": "$cuisine"}, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]).to_list(limit)
+    return [(tuple(row["_id"]["ingredients"]), row["_id"]["cuisine"]) for row in rows]
+
+def prewarm_lease_name() -> str:
+    # Workers on one host share the SQLite tier, so each host elects its own warmer
+    return f"search-prewarm:{socket.gethostname()}"
+
+async def prewarm_search_cache() -> int:
+    """Regenerate popular searches that are missing or would expire before the next run"""
+    prewarm_stats["runs"] += 1
+    prewarm_stats["last_run_at"] = datetime.utcnow()
+    tokens_spent = regenerated = 0
+
+    for cache_key in await popular_search_keys(SEARCH_PREWARM_TOP_N):
+        # The shared tier counts too: another worker may already have warmed it
+        remaining = search_cache.remaining_ttl(cache_key)
+        if remaining is not None and remaining > 2 * SEARCH_PREWARM_INTERVAL_SECONDS:
+            continue
+        if tokens_spent >= SEARCH_PREWARM_TOKEN_BUDGET:
+            logging.info(f"Search pre-warming stopped at its token budget after {regenerated} searches")
+            break
+        # Low priority: wait for user searches to finish before taking an LLM slot
+        while searches_in_flight:
+            await asyncio.sleep(1)
+
+        # Renewed per search, so a long run keeps the lease and a lost one stops the run
+        if not await acquire_lease(prewarm_lease_name(), SEARCH_PREWARM_LEASE_SECONDS):
+            logging.info("Search pre-warming lease lost to another worker")
+            break
+        ingredients, cuisine = cache_key
+        recipes = await generate_recipes_with_llm(", ".join(ingredients), cuisine)
+        if not recipes:
+            continue
+        cached = {"payload": categorize_recipes(recipes).dict(), "variants": {}, "prewarmed": True}
+        cache_search_entry(cache_key, cached, ttl=SEARCH_PREWARM_TTL_SECONDS)
+        # Roughly four characters per token for the generated output
+        tokens_spent += len(json.dumps(cached["payload"])) // 4
+        regenerated += 1
+
+    prewarm_stats["regenerated"] += regenerated
+    prewarm_stats["tokens_spent"] += tokens_spent
+    return regenerated
+
+async def run_search_prewarming():
+    """Pre-warm the search cache at a fixed interval inside the off-peak window"""
+    while True:
+        await asyncio.sleep(SEARCH_PREWARM_INTERVAL_SECONDS)
+        if not in_prewarm_window(datetime.utcnow()):
+            continue
+        try:
+            # Every worker runs this loop; only the lease holder spends the budget
+            if not await acquire_lease(prewarm_lease_name(), SEARCH_PREWARM_LEASE_SECONDS):
+                continue
+            regenerated = await prewarm_search_cache()
+            if regenerated:
+                logging.info(f"Pre-warmed {regenerated} popular searches")
+        except Exception as e:
+            logging.error(f"Search pre-warming failed: {str(e)}")
+
+# Similar recipe index: the most recently generated recipes, by ingredient set
+similar_recipe_index: Optional[MinHashLSH] = None
+similar_recipes_synced_at = datetime(1970, 1, 1)
+
+def similar_recipe_partition(onion_garlic: bool) -> str:
+    """The dietary filter picks partitions, so filtered queries never see excluded recipes"""
+    return "recipe" if onion_garlic else "recipe:no-onion-garlic"
+
+def stored_recipe_entry(recipe_hash: str, recipe_data: Dict[str, Any]) -> tuple:
+    ingredients = recipe_data.get("ingredients") or []
+    onion_garlic = recipe_data.get("hasOnionGarlic", has_onion_garlic(ingredients))
+    return ("recipe", recipe_hash), ingredients, similar_recipe_partition(onion_garlic)
+
+def index_similar_recipes(entries: Iterable[tuple]):
+    """Index (key, ingredients, partition) entries; a no-op until the first sync creates the index"""
+    if similar_recipe_index is None:
+        return
+    by_partition: Dict[str, tuple[List[tuple], List[set]]] = {}
+    for key, ingredients, partition in entries:
+        keys, feature_sets = by_partition.setdefault(partition, ([], []))
+        keys.append(key)
+        feature_sets.append(ingredient_features(ingredients))
+    for partition, (keys, feature_sets) in by_partition.items():
+        similar_recipe_index.add_many(keys, feature_sets, partition)
+
+async def sync_similar_recipes():
+    """Index recipes generated since the last sync; the first sync loads only the newest ones"""
+    global similar_recipe_index, similar_recipes_synced_at
+    since = similar_recipes_synced_at
+    # Overlapping syncs catch rows stamped before the last sync but written after it
+    similar_recipes_synced_at = datetime.utcnow() - timedelta(seconds=SIMILAR_RECIPES_SYNC_OVERLAP_SECONDS)
+    if similar_recipe_index is None:
+        similar_recipe_index = MinHashLSH(
+            num_perm=SIMILAR_RECIPES_NUM_PERM, bands=SIMILAR_RECIPES_BANDS, max_entries=SIMILAR_RECIPES_INDEX_SIZE
+        )
+        # Start at the newest SIMILAR_RECIPES_INDEX_SIZE, rather than every worker scanning all history
+        oldest_kept = await db.recipes.find(
+            {"generated": True}, {"_id": 0, "generated_at": 1}
+        ).sort("generated_at", -1).skip(SIMILAR_RECIPES_INDEX_SIZE - 1).limit(1).to_list(1)
+        if oldest_kept:
+            since = oldest_kept[0]["generated_at"] - timedelta(microseconds=1)
+
+    batch = []
+    # Oldest first, so eviction under the size cap drops the oldest
+    stored = db.recipes.find(
+        {"generated": True, "generated_at": {"$gt": since}},
+        {"_id": 0, "hash": 1, "recipe_data.ingredients": 1, "recipe_data.hasOnionGarlic": 1}
+    ).sort("generated_at", 1).batch_size(SIMILAR_RECIPES_SYNC_BATCH_SIZE)
+    async for recipe in stored:
+        if ("recipe", recipe["hash"]) in similar_recipe_index:
+            continue
+        batch.append(stored_recipe_entry(recipe["hash"], recipe["recipe_data"]))
+        if len(batch) >= SIMILAR_RECIPES_SYNC_BATCH_SIZE:
+            index_similar_recipes(batch)
+            batch = []
+            # Let requests run between batches while a worker builds its index
+            await asyncio.sleep(0)
+    index_similar_recipes(batch)
+
+async def run_similar_recipe_sync():
+    """Sync the similar recipe index forever at a fixed interval"""
+    while True:
+        try:
+            await sync_similar_recipes()
+        except Exception as e:
+            logging.error(f"Similar recipe sync failed: {str(e)}")
+        await asyncio.sleep(SIMILAR_RECIPES_SYNC_SECONDS)
+
+async def similar_custom_recipes(
+    user_id: str,
+    features: set,
+    exclude_key: tuple,
+    limit: int,
+    without_onion_garlic: bool
+) -> List[tuple[tuple, float]]:
+    """(key, exact Jaccard similarity) for the user's own custom recipes most similar to features
+
+    Custom recipes are only ever compared within one user's library, so they
+    are scored directly from Mongo instead of being held in every worker's index.
+    """
+    scored = []
+    async for custom_recipe in db.custom_recipes.find(
+        {"user_id": user_id}, {"_id": 0, "id": 1, "ingredients": 1}
+    ).sort([("created_at", -1), ("id", -1)]).limit(SIMILAR_RECIPES_CUSTOM_SCAN):
+        key = ("custom", user_id, custom_recipe["id"])
+        ingredients = custom_recipe.get("ingredients") or []
+        if key == exclude_key or (without_onion_garlic and has_onion_garlic(ingredients)):
+            continue
+        other = ingredient_features(ingredients)
+        if not features or not other:
+            continue
+        similarity = len(features & other) / len(features | other)
+        if similarity >= SIMILAR_RECIPES_MIN_SIMILARITY:
+            scored.append((key, similarity))
+    return sorted(scored, key=lambda match: match[1], reverse=True)[:limit]
+
+async def find_similar_recipes(
+    user_id: str,
+    ingredients: List[str],
+    exclude_key: tuple,
+    limit: int,
+    without_onion_garlic: bool,
+    fieldset: Optional[tuple]
+) -> List[Dict[str, Any]]:
+    """The recipes whose ingredients are most similar, with their estimated Jaccard similarity"""
+    partitions = [similar_recipe_partition(False)]
+    if not without_onion_garlic:
+        partitions.append(similar_recipe_partition(True))
+    features = ingredient_features(ingredients)
+    matches = await similar_custom_recipes(user_id, features, exclude_key, limit, without_onion_garlic)
+    if similar_recipe_index is not None:
+        matches += [
+            match
+            for partition in partitions
+            for match in similar_recipe_index.query(
+                features, partition, threshold=SIMILAR_RECIPES_MIN_SIMILARITY, limit=limit,
+                accept=lambda key: key != exclude_key
+            )
+        ]
+    matches = sorted(matches, key=lambda match: match[1], reverse=True)[:limit]
+
+    payloads: Dict[tuple, Dict[str, Any]] = {}
+    hashes = [key[1] for key, _ in matches if key[0] == "recipe"]
+    if hashes:
+        async for recipe in db.recipes.find(
+            {"hash": {"$in": hashes}, "generated": True},
+            fieldset_projection(fieldset, STORED_RECIPE_KEYS, "recipe_data.")
+        ):
+            payloads[("recipe", recipe["hash"])] = recipe["recipe_data"]
+    custom_ids = [key[2] for key, _ in matches if key[0] == "custom"]
+    if custom_ids:
+        async for custom_recipe in db.custom_recipes.find(
+            {"id": {"$in": custom_ids}, "user_id": user_id}, fieldset_projection(fieldset, CUSTOM_RECIPE_KEYS)
+        ):
+            payloads[("custom", user_id, custom_recipe["id"])] = custom_recipe
+
+    similar = []
+    for key, similarity in matches:
+        if key not in payloads:
+            # Expired from the recipe store, or deleted since it was scored
+            if key[0] == "recipe":
+                similar_recipe_index.remove(key)
+            continue
+        similar.append({
+            "recipe": payloads[key],
+            "recipe_type": "generated" if key[0] == "recipe" else "custom",
+            "similarity": round(similarity, 3)
+        })
+    return similar
+
 # API Routes
 @api_router.get("/")
 async def root():
@@ -531,31 +2777,96 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    await write_buffer.add("status_checks", status_obj.dict())
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+@api_router.get("/status", response_model=List[StatusRollup])
+async def get_status_checks(
+    bucket_minutes: int = Query(60, ge=1, le=1440),
+    hours: int = Query(24, ge=1, le=24 * 31)
+):
+    """Get status check counts per client, bucketed by time"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    bucket_ms = bucket_minutes * 60 * 1000
+    pipeline = [
+        {"$match": {"timestamp": {"$gte": since}}},
+        {"$group": {
+            "_id": {
+                "client_name": "$client_name",
+                # Round the timestamp down to the start of its bucket
+                "bucket_start": {"$subtract": [
+                    "$timestamp",
+                    {"$mod": [{"$subtract": ["$timestamp", datetime(1970, 1, 1)]}, bucket_ms]}
+                ]}
+            },
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id.bucket_start": 1, "_id.client_name": 1}}
+    ]
+    rollups = await db.status_checks.aggregate(pipeline).to_list(None)
+    return [
+        StatusRollup(
+            client_name=rollup["_id"]["client_name"],
+            bucket_start=rollup["_id"]["bucket_start"],
+            count=rollup["count"]
+        )
+        for rollup in rollups
+    ]
+
+async def require_metrics_token(request: Request):
+    """Admit only callers presenting METRICS_TOKEN as a bearer token"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+@api_router.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """Get in-process cache and buffer metrics for this worker"""
+    return {
+        "mongo_commands": mongo_command_counter.total,
+        "write_behind": write_buffer.metrics(),
+        "share_cache": share_cache.stats(),
+        "search_cache": search_cache.stats(),
+        "nutrition_cache": nutrition_cache.stats(),
+        "search_prewarm": {
+            **prewarm_stats,
+            # Share of all search lookups answered by an entry the pre-warmer made
+            "hit_share": prewarm_stats["hits"] / max(search_cache.local.hits + search_cache.local.misses, 1)
+        },
+        "search_semantic": {
+            **semantic_search_stats,
+            "threshold": SEARCH_SIMILARITY_THRESHOLD,
+            "index": search_index.stats() if search_index is not None else None
+        },
+        "similar_recipes": similar_recipe_index.stats() if similar_recipe_index is not None else None,
+        "shared_cache": shared_cache.stats() if shared_cache is not None else None,
+        "user_loader": user_loader.stats(),
+        "user_profile_cache": user_profile_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "rate_limits": {
+            "search": search_rate_limiter.stats(),
+            "custom_recipe": custom_recipe_rate_limiter.stats()
+        }
+    }
 
 # Authentication endpoints
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Create new user
     user = User(
         email=user_data.email,
         name=user_data.name,
-        password_hash=hash_password(user_data.password)
+        password_hash=await hash_password_async(user_data.password)
     )
     
-    await db.users.insert_one(user.dict())
+    # The unique email index rejects existing users
+    try:
+        await db.users.insert_one(user.dict())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    cache_user_profile(user.dict())
     
     # Create access token
     access_token = create_access_token(user.id)
@@ -573,9 +2884,18 @@ async def register(user_data: UserCreate):
 async def login(user_data: UserLogin):
     """Login user"""
     user = await db.users.find_one({"email": user_data.email})
-    if not user or not verify_password(user_data.password, user["password_hash"]):
+    if not user or not await verify_password_async(user_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    # Upgrade legacy or cheaper hashes now that the plain password is known
+    if password_needs_rehash(user["password_hash"]):
+        await db.users.update_one(
+            {"id": user["id"], "password_hash": user["password_hash"]},
+            {"$set": {"password_hash": await hash_password_async(user_data.password)}}
+        )
+        user_loader.invalidate(user["id"])
+    cache_user_profile(user)
+    
     # Create access token
     access_token = create_access_token(user["id"])
     
@@ -591,29 +2911,34 @@ async def login(user_data: UserLogin):
 @api_router.get("/auth/me", response_model=UserResponse)
 async def get_current_user_info(current_user_id: str = Depends(get_current_user)):
     """Get current user information"""
-    user = await db.users.find_one({"id": current_user_id})
-    if not user:
+    profile = await get_user_profile(current_user_id)
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return UserResponse(
-        id=user["id"],
-        email=user["email"],
-        name=user["name"],
-        created_at=user["created_at"]
-    )
+    return UserResponse(**profile)
 
 @api_router.post("/auth/forgot-password")
 async def forgot_password(request: ForgotPasswordRequest):
     """Send password reset email"""
-    user = await db.users.find_one({"email": request.email})
+    # Create reset token
+    reset_token = create_reset_token()
+    expires_at = datetime.utcnow() + PASSWORD_RESET_EXPIRATION_DELTA
+    
+    # Record the reset token on the user and fetch them in the same round trip
+    user = await db.users.find_one_and_update(
+        {"email": request.email},
+        {
+            "$set": {
+                "reset_token": reset_token,
+                "reset_token_expires": expires_at
+            }
+        },
+        projection={"_id": 0, "id": 1, "email": 1, "name": 1}
+    )
     if not user:
         # Don't reveal if email exists or not for security
         return {"message": "If your email is in our system, you will receive a password reset link shortly."}
     
-    # Create reset token
-    reset_token = create_reset_token()
-    expires_at = datetime.utcnow() + timedelta(hours=1)  # Token expires in 1 hour
-    
     # Store reset token
     password_reset = PasswordResetToken(
         user_id=user["id"],
@@ -623,17 +2948,6 @@ async def forgot_password(request: ForgotPasswordRequest):
     
     await db.password_resets.insert_one(password_reset.dict())
     
-    # Update user with reset token info
-    await db.users.update_one(
-        {"id": user["id"]},
-        {
-            "$set": {
-                "reset_token": reset_token,
-                "reset_token_expires": expires_at
-            }
-        }
-    )
-    
     # Send email (mock implementation)
     email_sent = await send_password_reset_email(user["email"], reset_token, user["name"])
     
@@ -645,25 +2959,24 @@ async def forgot_password(request: ForgotPasswordRequest):
 @api_router.post("/auth/reset-password")
 async def reset_password(request: ResetPasswordRequest):
     """Reset password using reset token"""
-    # Find valid reset token
-    reset_record = await db.password_resets.find_one({
-        "token": request.reset_token,
-        "used": False,
-        "expires_at": {"$gt": datetime.utcnow()}
-    })
+    # Claim the token atomically so it can only ever be redeemed once
+    reset_record = await db.password_resets.find_one_and_update(
+        {
+            "token": request.reset_token,
+            "used": False,
+            "expires_at": {"$gt": datetime.utcnow()}
+        },
+        {"$set": {"used": True}},
+        projection={"_id": 0, "user_id": 1}
+    )
     
     if not reset_record:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     
-    # Find user
-    user = await db.users.find_one({"id": reset_record["user_id"]})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Update password
-    new_password_hash = hash_password(request.new_password)
-    await db.users.update_one(
-        {"id": user["id"]},
+    new_password_hash = await hash_password_async(request.new_password)
+    result = await db.users.update_one(
+        {"id": reset_record["user_id"]},
         {
             "$set": {
                 "password_hash": new_password_hash,
@@ -672,85 +2985,278 @@ async def reset_password(request: ResetPasswordRequest):
             }
         }
     )
-    
-    # Mark reset token as used
-    await db.password_resets.update_one(
-        {"id": reset_record["id"]},
-        {"$set": {"used": True}}
-    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    invalidate_user(reset_record["user_id"])
+    await revoke_user_tokens(reset_record["user_id"])
     
     return {"message": "Password reset successfully. You can now login with your new password."}
 
 @api_router.delete("/auth/delete-account")
-async def delete_account(request: DeleteAccountRequest, current_user_id: str = Depends(get_current_user)):
+async def delete_account(request: DeleteAccountRequest, response: Response, current_user_id: str = Depends(get_current_user)):
     """Delete user account and all associated data"""
-    # Verify user exists
-    user = await db.users.find_one({"id": current_user_id})
+    # Verify user exists, bypassing the memo so the password check sees the current hash
+    user = await user_loader.load(current_user_id, use_memo=False)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify password
-    if not verify_password(request.password, user["password_hash"]):
+    if not await verify_password_async(request.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid password")
     
     try:
-        # Delete all user data
-        await db.users.delete_one({"id": current_user_id})
-        await db.saved_recipes.delete_many({"user_id": current_user_id})
-        await db.custom_recipes.delete_many({"user_id": current_user_id})
-        await db.password_resets.delete_many({"user_id": current_user_id})
+        saved_count, custom_count = await asyncio.gather(
+            db.saved_recipes.count_documents({"user_id": current_user_id}),
+            db.custom_recipes.count_documents({"user_id": current_user_id})
+        )
         
-        return {"message": "Account and all associated data deleted successfully"}
+        # Sessions end only once the account is gone, so a failed delete leaves the user signed in
+        if saved_count + custom_count <= ACCOUNT_PURGE_THRESHOLD:
+            await delete_user_data(current_user_id)
+            await forget_deleted_user(current_user_id)
+            return {"message": "Account and all associated data deleted successfully"}
+        
+        # Remove the account right away and purge the library in the background
+        purge = AccountPurge(user_id=current_user_id, total=saved_count + custom_count)
+        await db.account_purges.insert_one(purge.dict())
+        await asyncio.gather(
+            db.password_resets.delete_many({"user_id": current_user_id}),
+            db.library_versions.delete_one({"user_id": current_user_id})
+        )
+        try:
+            await db.users.delete_one({"id": current_user_id})
+        except Exception:
+            # The next startup would otherwise resume the purge against a live account
+            await db.account_purges.delete_one({"id": purge.id})
+            raise
+        await forget_deleted_user(current_user_id)
+        spawn_background_task(purge_user_library(purge.dict()))
+        
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            "message": "Account deleted. Your recipes are being removed in the background.",
+            "purge_id": purge.id
+        }
         
     except Exception as e:
         logging.error(f"Error deleting account: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete account. Please try again later.")
 
+@api_router.get("/auth/delete-account/purge/{purge_id}")
+async def get_account_purge(purge_id: str):
+    """Get the progress of a background account purge"""
+    purge = await db.account_purges.find_one({"id": purge_id}, {"_id": 0, "user_id": 0})
+    if not purge:
+        raise HTTPException(status_code=404, detail="Purge not found")
+    
+    return purge
+
 # Recipe management endpoints
 @api_router.post("/recipes/save-favorite")
 async def save_favorite_recipe(request: SaveRecipeRequest, current_user_id: str = Depends(get_current_user)):
     """Save a recipe as favorite"""
-    # Check if already saved
-    existing = await db.saved_recipes.find_one({
-        "user_id": current_user_id,
-        "recipe_data.id": request.recipe_data.get("id")
-    }, {"_id": 0})
+    saved_recipe = build_saved_recipe(current_user_id, request.recipe_data)
+    await store_recipes([request.recipe_data])
     
-    if existing:
+    # The unique (user_id, recipe_hash) and (user_id, recipe_id) indexes reject duplicates
+    try:
+        await db.saved_recipes.insert_one(saved_recipe.dict())
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Recipe already saved")
+    await bump_library_version(current_user_id)
+    return {"message": "Recipe saved successfully", "id": saved_recipe.id, "recipe_id": saved_recipe.recipe_id}
+
+@api_router.post("/recipes/favorites/bulk-save")
+async def bulk_save_favorite_recipes(request: BulkSaveRecipesRequest, current_user_id: str = Depends(get_current_user)):
+    """Save several recipes as favorites in one round trip"""
+    saved_recipes = [build_saved_recipe(current_user_id, recipe_data) for recipe_data in request.recipes]
+    results = [
+        {"recipe_id": saved_recipe.recipe_id, "status": "saved", "id": saved_recipe.id}
+        for saved_recipe in saved_recipes
+    ]
     
-    saved_recipe = SavedRecipe(
-        user_id=current_user_id,
-        recipe_data=request.recipe_data
-    )
+    await store_recipes(request.recipes)
+    try:
+        await db.saved_recipes.bulk_write(
+            [InsertOne(saved_recipe.dict()) for saved_recipe in saved_recipes],
+            ordered=False
+        )
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            result = results[error["index"]]
+            result["status"] = "duplicate" if error.get("code") == 11000 else "failed"
+            result.pop("id")
+    if any(result["status"] == "saved" for result in results):
+        await bump_library_version(current_user_id)
     
-    await db.saved_recipes.insert_one(saved_recipe.dict())
-    return {"message": "Recipe saved successfully", "id": saved_recipe.id}
+    return {"results": results}
+
+@api_router.post("/recipes/favorites/bulk-remove")
+async def bulk_remove_favorite_recipes(request: BulkRemoveRecipesRequest, current_user_id: str = Depends(get_current_user)):
+    """Remove several recipes from favorites"""
+    query = favorite_id_query(current_user_id, request.recipe_ids)
+    existing = await db.saved_recipes.find(
+        query, {"_id": 0, "recipe_id": 1, "recipe_data.id": 1, "share_token": 1}
+    ).to_list(None)
+    existing_ids = {
+        saved_recipe["recipe_data"]["id"] if "recipe_data" in saved_recipe else saved_recipe["recipe_id"]
+        for saved_recipe in existing
+    }
+    
+    if existing_ids:
+        await db.saved_recipes.delete_many(query)
+        invalidate_shared_recipes("favorite", [saved_recipe["share_token"] for saved_recipe in existing])
+        await bump_library_version(current_user_id)
+    
+    return {
+        "results": [
+            {"recipe_id": recipe_id, "status": "removed" if recipe_id in existing_ids else "not_found"}
+            for recipe_id in request.recipe_ids
+        ]
+    }
 
 @api_router.delete("/recipes/remove-favorite/{recipe_id}")
 async def remove_favorite_recipe(recipe_id: int, current_user_id: str = Depends(get_current_user)):
     """Remove a recipe from favorites"""
-    result = await db.saved_recipes.delete_one({
-        "user_id": current_user_id,
-        "recipe_data.id": recipe_id
-    })
+    removed = await db.saved_recipes.find_one_and_delete(
+        favorite_id_query(current_user_id, [recipe_id]),
+        projection={"_id": 0, "share_token": 1}
+    )
     
-    if result.deleted_count == 0:
+    if not removed:
         raise HTTPException(status_code=404, detail="Recipe not found in favorites")
+    invalidate_shared_recipes("favorite", [removed["share_token"]])
+    await bump_library_version(current_user_id)
     
     return {"message": "Recipe removed from favorites"}
 
 @api_router.get("/recipes/favorites")
-async def get_favorite_recipes(current_user_id: str = Depends(get_current_user)):
-    """Get user's favorite recipes"""
-    saved_recipes = await db.saved_recipes.find(
-        {"user_id": current_user_id}, 
-        {"_id": 0}  # Exclude MongoDB ObjectId
-    ).to_list(1000)
-    return {"recipes": [recipe["recipe_data"] for recipe in saved_recipes]}
+async def get_favorite_recipes(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset),
+    current_user_id: str = Depends(get_current_user)
+):
+    """Get a page of user's favorite recipes"""
+    # Read the version before the page so a concurrent write can only make the ETag older than the body
+    headers = {"ETag": await library_etag(request, current_user_id), "Cache-Control": "private, no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    projection = fieldset_projection(fieldset, FAVORITE_KEYS, "recipe_data.")
+    saved_recipes, next_cursor = await paginate_user_documents(
+        db.saved_recipes, current_user_id, "saved_at", limit, cursor, projection
+    )
+    return api_response({
+        "recipes": await resolve_saved_recipes(saved_recipes, fieldset),
+        "next_cursor": next_cursor
+    }, headers)
+
+@api_router.get("/recipes/favorites/{recipe_id}")
+async def get_favorite_recipe(
+    recipe_id: int,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset),
+    current_user_id: str = Depends(get_current_user)
+):
+    """Get the full details of one favorite recipe"""
+    saved_recipe = await db.saved_recipes.find_one(
+        favorite_id_query(current_user_id, [recipe_id]),
+        fieldset_projection(fieldset, FAVORITE_KEYS, "recipe_data.")
+    )
+    resolved = await resolve_saved_recipes([saved_recipe], fieldset) if saved_recipe else []
+    if not resolved:
+        raise HTTPException(status_code=404, detail="Recipe not found in favorites")
+
+    return {"recipe": resolved[0]}
+
+@api_router.get("/recipes/favorites/{recipe_id}/similar")
+async def get_recipes_similar_to_favorite(
+    recipe_id: int,
+    limit: int = Query(10, ge=1, le=SIMILAR_RECIPES_MAX_LIMIT),
+    without_onion_garlic: bool = False,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset),
+    current_user_id: str = Depends(get_current_user)
+):
+    """Get recipes with ingredients similar to a favorite's, without another LLM call"""
+    saved_recipe = await db.saved_recipes.find_one(
+        favorite_id_query(current_user_id, [recipe_id]),
+        fieldset_projection(("ingredients", "title", "instructions"), FAVORITE_KEYS, "recipe_data.")
+    )
+    resolved = await resolve_saved_recipes([saved_recipe], ("ingredients", "title", "instructions")) if saved_recipe else []
+    if not resolved:
+        raise HTTPException(status_code=404, detail="Recipe not found in favorites")
+
+    recipe_hash = saved_recipe.get("recipe_hash") or recipe_content_hash(resolved[0])
+    return {"recipes": await find_similar_recipes(
+        current_user_id, resolved[0]["ingredients"], ("recipe", recipe_hash), limit, without_onion_garlic, fieldset
+    )}
+
+# Recipe library backup endpoints
+@api_router.get("/recipes/library/export")
+async def export_recipe_library(current_user_id: str = Depends(get_current_user)):
+    """Export user's favorites and custom recipes as gzip-compressed NDJSON"""
+    return StreamingResponse(
+        stream_library_export(current_user_id),
+        media_type="application/gzip",
+        headers={"Content-Disposition": 'attachment; filename="recipe-library.ndjson.gz"'}
+    )
+
+@api_router.post("/recipes/library/import")
+async def import_recipe_library(request: Request, current_user_id: str = Depends(get_current_user)):
+    """Import favorites and custom recipes from an exported NDJSON file"""
+    collections = {"favorite": db.saved_recipes, "custom": db.custom_recipes}
+    batches: Dict[str, List[Dict[str, Any]]] = {"favorite": [], "custom": []}
+    imported = duplicates = invalid = 0
+
+    async def flush(record_type: str):
+        nonlocal imported, duplicates
+        batch = batches[record_type]
+        batches[record_type] = []
+        if record_type == "custom" and batch:
+            # Custom recipes get fresh ids on import, so duplicates are recognized by content
+            fresh = await drop_existing_custom_recipes(current_user_id, batch)
+            duplicates += len(batch) - len(fresh)
+            batch = fresh
+        if batch:
+            if record_type == "favorite":
+                await store_recipes([document.pop("recipe_data") for document in batch])
+            inserted, duplicated = await insert_library_batch(collections[record_type], batch)
+            imported += inserted
+            duplicates += duplicated
+
+    await backfill_custom_recipe_hashes(current_user_id)
+
+    async for line in iter_ndjson_lines(request.stream()):
+        if not line.strip():
+            continue
+        try:
+            parsed = parse_library_record(line, current_user_id)
+        except (ValueError, KeyError, TypeError, ValidationError):
+            parsed = None
+        if parsed is None:
+            invalid += 1
+            continue
+
+        record_type, document = parsed
+        batches[record_type].append(document)
+        if len(batches[record_type]) >= LIBRARY_IMPORT_BATCH_SIZE:
+            await flush(record_type)
+
+    for record_type in batches:
+        await flush(record_type)
+    if imported:
+        await bump_library_version(current_user_id)
+
+    return {
+        "message": "Recipe library imported",
+        "imported": imported,
+        "duplicates": duplicates,
+        "invalid": invalid
+    }
 
 # Custom recipe endpoints
-@api_router.post("/recipes/custom")
+@api_router.post("/recipes/custom", dependencies=[Depends(rate_limited(custom_recipe_rate_limiter))])
 async def create_custom_recipe(recipe_data: CustomRecipeCreate, current_user_id: str = Depends(get_current_user)):
     """Create a custom recipe with AI nutrition analysis"""
     try:
@@ -767,10 +3273,12 @@ async def create_custom_recipe(recipe_data: CustomRecipeCreate, current_user_id:
             instructions=recipe_data.instructions,
             servings=recipe_data.servings,
             nutrition=nutrition,
-            readyInMinutes=ready_in_minutes
+            readyInMinutes=ready_in_minutes,
+            recipe_hash=custom_recipe_hash(recipe_data.dict())
         )
         
         await db.custom_recipes.insert_one(custom_recipe.dict())
+        await bump_library_version(current_user_id)
         
         # Return without MongoDB ObjectId
         recipe_dict = custom_recipe.dict()
@@ -784,93 +3292,182 @@ async def create_custom_recipe(recipe_data: CustomRecipeCreate, current_user_id:
         raise HTTPException(status_code=500, detail="Failed to create custom recipe")
 
 @api_router.get("/recipes/custom")
-async def get_custom_recipes(current_user_id: str = Depends(get_current_user)):
-    """Get user's custom recipes"""
-    custom_recipes = await db.custom_recipes.find(
-        {"user_id": current_user_id}, 
-        {"_id": 0}  # Exclude MongoDB ObjectId
-    ).to_list(1000)
-    return {"recipes": custom_recipes}
+async def get_custom_recipes(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset),
+    current_user_id: str = Depends(get_current_user)
+):
+    """Get a page of user's custom recipes"""
+    headers = {"ETag": await library_etag(request, current_user_id), "Cache-Control": "private, no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    projection = fieldset_projection(fieldset, CUSTOM_RECIPE_KEYS)
+    custom_recipes, next_cursor = await paginate_user_documents(
+        db.custom_recipes, current_user_id, "created_at", limit, cursor, projection
+    )
+    return api_response({"recipes": custom_recipes, "next_cursor": next_cursor}, headers)
+
+@api_router.get("/recipes/custom/{recipe_id}")
+async def get_custom_recipe(
+    recipe_id: str,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset),
+    current_user_id: str = Depends(get_current_user)
+):
+    """Get the full details of one custom recipe"""
+    custom_recipe = await db.custom_recipes.find_one(
+        {"id": recipe_id, "user_id": current_user_id},
+        fieldset_projection(fieldset, CUSTOM_RECIPE_KEYS)
+    )
+    if not custom_recipe:
+        raise HTTPException(status_code=404, detail="Custom recipe not found")
+
+    return {"recipe": custom_recipe}
+
+@api_router.get("/recipes/custom/{recipe_id}/similar")
+async def get_recipes_similar_to_custom(
+    recipe_id: str,
+    limit: int = Query(10, ge=1, le=SIMILAR_RECIPES_MAX_LIMIT),
+    without_onion_garlic: bool = False,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset),
+    current_user_id: str = Depends(get_current_user)
+):
+    """Get recipes with ingredients similar to a custom recipe's"""
+    custom_recipe = await db.custom_recipes.find_one(
+        {"id": recipe_id, "user_id": current_user_id}, {"_id": 0, "ingredients": 1}
+    )
+    if not custom_recipe:
+        raise HTTPException(status_code=404, detail="Custom recipe not found")
+
+    return {"recipes": await find_similar_recipes(
+        current_user_id, custom_recipe["ingredients"], ("custom", current_user_id, recipe_id),
+        limit, without_onion_garlic, fieldset
+    )}
 
 @api_router.delete("/recipes/custom/{recipe_id}")
 async def delete_custom_recipe(recipe_id: str, current_user_id: str = Depends(get_current_user)):
     """Delete a custom recipe"""
-    result = await db.custom_recipes.delete_one({
-        "id": recipe_id,
-        "user_id": current_user_id
-    })
+    removed = await db.custom_recipes.find_one_and_delete(
+        {"id": recipe_id, "user_id": current_user_id},
+        projection={"_id": 0, "share_token": 1}
+    )
     
-    if result.deleted_count == 0:
+    if not removed:
         raise HTTPException(status_code=404, detail="Custom recipe not found")
+    invalidate_shared_recipes("custom", [removed["share_token"]])
+    await bump_library_version(current_user_id)
     
     return {"message": "Custom recipe deleted successfully"}
 
 # Recipe sharing endpoints
 @api_router.get("/recipes/share/custom/{share_token}")
-async def get_shared_custom_recipe(share_token: str):
+async def get_shared_custom_recipe(
+    share_token: str,
+    request: Request,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset)
+):
     """Get a shared custom recipe by token"""
-    recipe = await db.custom_recipes.find_one({"share_token": share_token})
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Shared recipe not found")
-    
-    # Get user name for attribution
-    user = await db.users.find_one({"id": recipe["user_id"]})
-    user_name = user["name"] if user else "Unknown User"
-    
-    return {
-        "recipe": recipe,
-        "shared_by": user_name,
-        "recipe_type": "custom"
-    }
+    entry = share_cache.get(("custom", share_token))
+    if entry is None:
+        recipe = await db.custom_recipes.find_one({"share_token": share_token}, {"_id": 0})
+        if not recipe:
+            raise HTTPException(status_code=404, detail="Shared recipe not found")
+
+        # The owner's name usually comes from the profile cache rather than another query
+        entry = {
+            "payload": {
+                "recipe": recipe,
+                "shared_by": await get_user_display_name(recipe["user_id"]),
+                "recipe_type": "custom"
+            },
+            "user_id": recipe["user_id"],
+            "variants": {}
+        }
+        share_cache.set(("custom", share_token), entry, tag=entry["user_id"])
+
+    return cached_json_response(
+        request, cached_variant(entry, fieldset, select_shared_fields), f"public, max-age={SHARE_CACHE_TTL_SECONDS}"
+    )
 
 @api_router.get("/recipes/share/favorite/{share_token}")
-async def get_shared_favorite_recipe(share_token: str):
+async def get_shared_favorite_recipe(
+    share_token: str,
+    request: Request,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset)
+):
     """Get a shared favorite recipe by token"""
-    saved_recipe = await db.saved_recipes.find_one({"share_token": share_token})
-    if not saved_recipe:
-        raise HTTPException(status_code=404, detail="Shared recipe not found")
-    
-    # Get user name for attribution
-    user = await db.users.find_one({"id": saved_recipe["user_id"]})
-    user_name = user["name"] if user else "Unknown User"
-    
-    return {
-        "recipe": saved_recipe["recipe_data"],
-        "shared_by": user_name,
-        "recipe_type": "favorite"
-    }
+    entry = share_cache.get(("favorite", share_token))
+    if entry is None:
+        # One aggregation fetches the favorite with its stored payload
+        saved_recipes = await db.saved_recipes.aggregate([
+            {"$match": {"share_token": share_token}},
+            {"$limit": 1},
+            {"$lookup": {"from": "recipes", "localField": "recipe_hash", "foreignField": "hash", "as": "stored"}},
+            {"$addFields": {"stored_recipe": {"$arrayElemAt": ["$stored.recipe_data", 0]}}},
+            {"$project": {"_id": 0, "stored": 0}}
+        ]).to_list(1)
+        saved_recipe = saved_recipes[0] if saved_recipes else None
+        if saved_recipe and "recipe_data" not in saved_recipe and saved_recipe.get("stored_recipe"):
+            saved_recipe["recipe_data"] = {**saved_recipe["stored_recipe"], "id": saved_recipe["recipe_id"]}
+        if not saved_recipe or "recipe_data" not in saved_recipe:
+            raise HTTPException(status_code=404, detail="Shared recipe not found")
+
+        entry = {
+            "payload": {
+                "recipe": saved_recipe["recipe_data"],
+                "shared_by": await get_user_display_name(saved_recipe["user_id"]),
+                "recipe_type": "favorite"
+            },
+            "user_id": saved_recipe["user_id"],
+            "variants": {}
+        }
+        share_cache.set(("favorite", share_token), entry, tag=entry["user_id"])
 
-@api_router.post("/recipes/search", response_model=RecipeSearchResponse)
-async def search_recipes(request: RecipeSearchRequest):
+    return cached_json_response(
+        request, cached_variant(entry, fieldset, select_shared_fields), f"public, max-age={SHARE_CACHE_TTL_SECONDS}"
+    )
+
+@api_router.post(
+    "/recipes/search",
+    response_model=RecipeSearchResponse,
+    dependencies=[Depends(rate_limited(search_rate_limiter))]
+)
+async def search_recipes(
+    request: RecipeSearchRequest,
+    http_request: Request,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset)
+):
     """Search for recipes based on ingredients using AI generation"""
     try:
-        # Validate ingredients
-        if not request.ingredients or not request.ingredients.strip():
-            raise HTTPException(status_code=422, detail="Please provide at least one ingredient")
-        
-        # Check if we have at least 2 ingredients
-        ingredient_list = [ing.strip() for ing in request.ingredients.split(',') if ing.strip()]
-        if len(ingredient_list) < 2:
-            raise HTTPException(status_code=422, detail="Please provide at least 2 ingredients separated by commas")
+        ingredient_list = parse_ingredient_list(request.ingredients)
+        cache_key = search_cache_key(ingredient_list, request.cuisine)
+        cached = find_search_entry(cache_key)
+        await log_search(cache_key, cached is not None)
+        if cached is not None:
+            if cached.get("prewarmed"):
+                prewarm_stats["hits"] += 1
+            return cached_json_response(
+                http_request, cached_variant(cached, fieldset, select_search_fields), "private, no-cache"
+            )
         
         # Generate recipes using LLM
         logging.info(f"Generating recipes for ingredients: {request.ingredients}")
-        recipes = await generate_recipes_with_llm(request.ingredients, request.cuisine)
+        cached = await generate_search_entry(request.ingredients, request.cuisine, cache_key)
         
-        if not recipes:
+        if cached is None:
             logging.warning("LLM failed to generate recipes, returning empty result")
             # Return empty categorized response but don't raise error
-            return RecipeSearchResponse(
+            return api_response(RecipeSearchResponse(
                 low={"with_onion_garlic": [], "without_onion_garlic": []},
                 medium={"with_onion_garlic": [], "without_onion_garlic": []},
                 high={"with_onion_garlic": [], "without_onion_garlic": []}
-            )
+            ))
         
-        logging.info(f"Generated {len(recipes)} recipes successfully")
-        
-        # Categorize and return recipes
-        result = categorize_recipes(recipes)
-        return result
+        return cached_json_response(
+            http_request, cached_variant(cached, fieldset, select_search_fields), "private, no-cache"
+        )
         
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -879,16 +3476,56 @@ async def search_recipes(request: RecipeSearchRequest):
         logging.error(f"Unexpected error in recipe search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate recipes: {str(e)}")
 
-# Include the router in the main app
-app.include_router(api_router)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@api_router.post("/recipes/search/batch")
+async def batch_search_recipes(
+    request: BatchSearchRequest,
+    http_request: Request,
+    fieldset: Optional[tuple] = Depends(recipe_fieldset)
+):
+    """Search several cuisines for one ingredient list, generating the uncached ones concurrently"""
+    ingredient_list = parse_ingredient_list(request.ingredients)
+    cuisines = list(dict.fromkeys((cuisine or "any").strip().lower() for cuisine in request.cuisines))
+    if not cuisines or len(cuisines) > SEARCH_BATCH_MAX_CUISINES:
+        raise HTTPException(status_code=422, detail=f"Please provide 1 to {SEARCH_BATCH_MAX_CUISINES} cuisines")
+    # Costs what the equivalent single searches would
+    await enforce_rate_limit(search_rate_limiter, http_request, cost=len(cuisines))
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    generations: Dict[asyncio.Task, str] = {}
+    for cuisine in cuisines:
+        cache_key = search_cache_key(ingredient_list, cuisine)
+        cached = find_search_entry(cache_key)
+        await log_search(cache_key, cached is not None)
+        if cached is not None:
+            entries[cuisine] = cached
+        else:
+            task = spawn_background_task(generate_search_entry(request.ingredients, cuisine, cache_key))
+            generations[task] = cuisine
+
+    if generations:
+        logging.info(f"Generating recipes for ingredients: {request.ingredients} in {len(generations)} cuisines")
+        # Generations still running at the deadline finish in the background and fill the cache
+        done, _ = await asyncio.wait(generations, timeout=SEARCH_BATCH_DEADLINE_SECONDS)
+        for task in done:
+            # A generation cancelled at shutdown has no exception to read; count it as failed
+            if task.cancelled():
+                logging.error(f"Batch search for {generations[task]} was cancelled")
+            elif task.exception() is not None:
+                logging.error(f"Batch search for {generations[task]} failed: {str(task.exception())}")
+            elif task.result() is not None:
+                entries[generations[task]] = task.result()
+
+    # Splice the cached serialized bodies rather than re-encoding every result
+    results = b",".join(
+        json.dumps(cuisine).encode() + b":" + cached_variant(entries[cuisine], fieldset, select_search_fields)["body"]
+        for cuisine in cuisines if cuisine in entries
+    )
+    failed = [cuisine for cuisine in cuisines if cuisine not in entries]
+    return Response(
+        content=b'{"results":{' + results + b'},"failed":' + json.dumps(failed).encode() + b"}",
+        media_type="application/json",
+        headers={"Cache-Control": "private, no-cache"}
+    )
 
 # Configure logging
 logging.basicConfig(
@@ -897,6 +3534,176 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
+# Database maintenance
+background_tasks: set = set()
+
+def spawn_background_task(coroutine) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes"""
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+# (collection, keys, options) for every index the API relies on
+INDEX_SPECS = [
+    # Registration relies on the unique email index to reject duplicates
+    ("users", "email", {"unique": True}),
+    ("users", "id", {"unique": True}),
+    # TTL indexes let MongoDB reap expired rows on its own
+    ("password_resets", "expires_at", {"expireAfterSeconds": 0}),
+    ("password_resets", "token", {}),
+    ("status_checks", "timestamp", {"expireAfterSeconds": int(STATUS_CHECK_RETENTION_DELTA.total_seconds())}),
+    ("search_log", "searched_at", {"expireAfterSeconds": int(SEARCH_LOG_RETENTION_DELTA.total_seconds())}),
+    ("leases", "expires_at", {"expireAfterSeconds": 0}),
+    # Keyset pagination indexes for library listings
+    ("saved_recipes", [("user_id", 1), ("saved_at", -1), ("id", -1)], {}),
+    ("custom_recipes", [("user_id", 1), ("created_at", -1), ("id", -1)], {}),
+    # Recipe payloads are stored once, keyed by content hash
+    ("recipes", "hash", {"unique": True}),
+    # Each worker's similar recipe index catches up on recipes generated since its last sync
+    ("recipes", [("generated", 1), ("generated_at", 1)], {}),
+    # Generated payloads no favorite refers to expire; referenced ones have no expires_at
+    ("recipes", "expires_at", {"expireAfterSeconds": 0}),
+    # Imports skip custom recipes the user already has with the same content
+    ("custom_recipes", [("user_id", 1), ("recipe_hash", 1)], {}),
+    # Duplicate favorites are rejected by the server rather than checked first
+    ("saved_recipes", [("user_id", 1), ("recipe_hash", 1)], {
+        "unique": True, "partialFilterExpression": {"recipe_hash": {"$exists": True}}
+    }),
+    # Clients address favorites by recipe id, so one id must name one recipe per user
+    ("saved_recipes", [("user_id", 1), ("recipe_id", 1)], {
+        "unique": True, "partialFilterExpression": {"recipe_id": {"$exists": True}},
+        "name": "user_id_1_recipe_id_1_unique"
+    }),
+    # Share links are looked up by token alone
+    ("saved_recipes", "share_token", {"unique": True}),
+    ("custom_recipes", "share_token", {"unique": True}),
+    # Revocations only matter until the tokens they revoke would have expired
+    ("token_revocations", "user_id", {"unique": True}),
+    ("token_revocations", "revoked_at", {}),
+    ("token_revocations", "expires_at", {"expireAfterSeconds": 0}),
+    # One version counter per user library, read by every listing
+    ("library_versions", "user_id", {"unique": True}),
+    # Shared rate limit buckets; an idle bucket is full again well within an hour
+    ("rate_limits", "key", {"unique": True}),
+    ("rate_limits", "updated_at", {"expireAfterSeconds": 3600}),
+    # Background account purges
+    ("account_purges", "id", {"unique": True}),
+    ("account_purges", "status", {}),
+    ("account_purges", "completed_at", {"expireAfterSeconds": int(ACCOUNT_PURGE_RETENTION_DELTA.total_seconds())}),
+]
+
+# (collection, index name) for indexes superseded by INDEX_SPECS
+OBSOLETE_INDEXES = [
+    # Replaced by the (user_id, recipe_hash) index when payloads moved to the recipe store
+    ("saved_recipes", "user_id_1_recipe_data.id_1"),
+    # Replaced by its unique counterpart once recipe ids had to be unique per user
+    ("saved_recipes", "user_id_1_recipe_id_1"),
+    # The similar recipe sync now follows generated_at, and custom recipes are no longer indexed
+    ("recipes", "created_at_1"),
+    ("custom_recipes", "created_at_1"),
+]
+
+async def ensure_indexes():
+    """Create the indexes the API relies on"""
+    existing = {}
+    for collection_name, index_name in OBSOLETE_INDEXES:
+        if collection_name not in existing:
+            existing[collection_name] = await db[collection_name].index_information()
+        if index_name in existing[collection_name]:
+            await db[collection_name].drop_index(index_name)
+    for collection_name, keys, options in INDEX_SPECS:
+        # One failing index (e.g. legacy duplicates) must not block the others
+        try:
+            await db[collection_name].create_index(keys, **options)
+        except Exception as e:
+            logger.error(f"Failed to create index {keys} on {collection_name}: {str(e)}")
+
+async def compact_collections():
+    """Delete rows the TTL indexes will never expire"""
+    # TTL indexes skip rows whose indexed field is missing or not a date
+    resets = await db.password_resets.delete_many({
+        "$or": [
+            {"used": True},
+            {"expires_at": {"$not": {"$type": "date"}}}
+        ]
+    })
+    checks = await db.status_checks.delete_many({"timestamp": {"$not": {"$type": "date"}}})
+    if shared_cache is not None:
+        shared_cache.purge_expired()
+    if resets.deleted_count or checks.deleted_count:
+        logger.info(
+            f"Compacted {resets.deleted_count} password resets and {checks.deleted_count} status checks"
+        )
+
+async def run_periodic_compaction():
+    """Run collection compaction forever at a fixed interval"""
+    while True:
+        try:
+            await compact_collections()
+        except Exception as e:
+            logger.error(f"Collection compaction failed: {str(e)}")
+        await asyncio.sleep(COMPACTION_INTERVAL_SECONDS)
+
+async def startup_db_client():
+    init_db()
+    open_shared_cache()
+    if CACHE_SNAPSHOT_PATH:
+        try:
+            logger.info(f"Loaded {load_cache_snapshot(CACHE_SNAPSHOT_PATH)} cache entries from {CACHE_SNAPSHOT_PATH}")
+        except Exception as e:
+            logger.error(f"Failed to load cache snapshot: {str(e)}")
+        # Least recently used first, so the index keeps the hottest keys if it overflows
+        index_search_keys(key for key, _, _ in reversed(search_cache.local.live_entries()))
+    await ensure_indexes()
+    spawn_background_task(run_periodic_compaction())
+    spawn_background_task(resume_account_purges())
+    spawn_background_task(write_buffer.run())
+    spawn_background_task(run_token_revocation_sync())
+    spawn_background_task(run_search_prewarming())
+    spawn_background_task(run_similar_recipe_sync())
+
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    global password_hash_executor
+    for task in list(background_tasks):
+        task.cancel()
+    # Batches whose flusher was just cancelled may still be mid-write
+    await write_buffer.drain()
+    if CACHE_SNAPSHOT_PATH:
+        try:
+            logger.info(f"Saved {save_cache_snapshot(CACHE_SNAPSHOT_PATH)} cache entries to {CACHE_SNAPSHOT_PATH}")
+        except Exception as e:
+            logger.error(f"Failed to save cache snapshot: {str(e)}")
+    if password_hash_executor is not None:
+        password_hash_executor.shutdown(wait=False)
+        password_hash_executor = None
+    close_shared_cache()
+    close_db()
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    await startup_db_client()
+    try:
+        yield
+    finally:
+        await shutdown_db_client()
+
+def create_app() -> FastAPI:
+    """Build the API; database and worker resources are tied to the app's lifespan"""
+    application = FastAPI(
+        title="Recipe Finder API",
+        description="Find recipes based on ingredients with AI-powered generation",
+        lifespan=lifespan
+    )
+    application.include_router(api_router)
+    application.add_middleware(CompressionMiddleware)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return application
+
+app = create_app()
\ No newline at end of file
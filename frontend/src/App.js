@@ -11,6 +11,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '.
 import { Clock, ChefHat, Zap, Timer, X, Users, Eye, Mic, MicOff, Filter, Trash2, Heart, BookOpen, User, LogOut, Settings } from 'lucide-react';
 import axios from 'axios';
 import { AuthProvider, useAuth } from './contexts/AuthContext';
+import { fetchAllRecipes } from './lib/pagination';
 import LoginModal from './components/Auth/LoginModal';
 import DeleteAccountModal from './components/Auth/DeleteAccountModal';
 import YourRecipesPage from './components/YourRecipes/YourRecipesPage';
@@ -118,11 +119,13 @@ const RecipeFinderApp = () => {
       const loadSavedRecipes = async () => {
         try {
           console.log('Loading saved recipes...');
-          const response = await axios.get(`${BACKEND_URL}/api/recipes/favorites`, {
-            headers: getAuthHeaders()
+          // Only ids are needed, so every page stays small
+          const savedRecipes = await fetchAllRecipes(`${BACKEND_URL}/api/recipes/favorites`, {
+            headers: getAuthHeaders(),
+            params: { fields: 'id' }
           });
-          console.log('Saved recipes response:', response.data);
-          const savedIds = new Set(response.data.recipes.map(recipe => recipe.id));
+          console.log('Saved recipes loaded:', savedRecipes.length);
+          const savedIds = new Set(savedRecipes.map(recipe => recipe.id));
           console.log('Saved recipe IDs:', savedIds);
           setSavedRecipeIds(savedIds);
         } catch (error) {
@@ -9,6 +9,7 @@ import { Heart, Utensils, Plus, Share2, Trash2, Clock, Users, Eye } from 'lucide
 import { useAuth } from '../../contexts/AuthContext';
 import axios from 'axios';
 import CreateCustomRecipeModal from './CreateCustomRecipeModal';
+import { fetchAllRecipes } from '../../lib/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
@@ -30,17 +31,17 @@ const YourRecipesPage = ({ isOpen, onClose }) => {
   const fetchRecipes = async () => {
     setLoading(true);
     try {
-      const [favoritesResponse, customResponse] = await Promise.all([
-        axios.get(`${BACKEND_URL}/api/recipes/favorites`, {
+      const [favorites, custom] = await Promise.all([
+        fetchAllRecipes(`${BACKEND_URL}/api/recipes/favorites`, {
           headers: getAuthHeaders()
         }),
-        axios.get(`${BACKEND_URL}/api/recipes/custom`, {
+        fetchAllRecipes(`${BACKEND_URL}/api/recipes/custom`, {
           headers: getAuthHeaders()
         })
       ]);
 
-      setFavoriteRecipes(favoritesResponse.data.recipes || []);
-      setCustomRecipes(customResponse.data.recipes || []);
+      setFavoriteRecipes(favorites);
+      setCustomRecipes(custom);
     } catch (error) {
       console.error('Error fetching recipes:', error);
     } finally {
@@ -0,0 +1,19 @@
+import axios from 'axios';
+
+// Largest page the listing endpoints accept
+const PAGE_SIZE = 500;
+
+// Fetch every recipe from a cursor-paginated listing endpoint
+export async function fetchAllRecipes(url, config = {}) {
+  const recipes = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, {
+      ...config,
+      params: { ...config.params, limit: PAGE_SIZE, ...(cursor ? { cursor } : {}) }
+    });
+    recipes.push(...(response.data.recipes || []));
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return recipes;
+}
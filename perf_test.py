@@ -0,0 +1,796 @@
+import requests
+import sys
+import json
+import os
+import time
+import uuid
+import statistics
+import asyncio
+import random
+import itertools
+import subprocess
+import tempfile
+from multiprocessing import Pool
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Cold import of backend/server.py must stay under this on autoscaled workers
+STARTUP_IMPORT_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS', '1000'))
+
+# Load environment variables
+load_dotenv('/app/frontend/.env')
+load_dotenv('/app/backend/.env')
+
+def import_backend():
+    """Import backend/server.py in-process for micro-benchmarks"""
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'perf_test')
+    sys.path.insert(0, str(Path(__file__).parent / 'backend'))
+    import server
+    return server
+
+def time_per_call(function, iterations):
+    """Average microseconds per call of an async function"""
+    async def run():
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await function()
+        return (time.perf_counter() - started) / iterations * 1_000_000
+    return asyncio.run(run())
+
+def sample_recipes(count):
+    """Generated-recipe payloads shaped like real LLM output"""
+    return [{
+        "id": 1000 + i, "title": f"Recipe {i}", "image": "placeholder",
+        "readyInMinutes": 10 + i * 3, "servings": 4,
+        "nutrition": {"calories": 350.0, "protein": 20.0, "carbs": 35.0, "fat": 15.0, "fiber": 6.0},
+        "hasOnionGarlic": i % 2 == 0,
+        "ingredients": ["chicken breast", "rice", "olive oil", "salt", "pepper", "garlic"],
+        "instructions": [f"Step {step}: cook the ingredients carefully for a few minutes." for step in range(7)]
+    } for i in range(count)]
+
+INGREDIENT_VOCABULARY = [
+    "chicken", "rice", "peas", "beef", "pork", "tofu", "garlic", "onion", "tomato", "basil", "cumin", "lentils",
+    "spinach", "potato", "carrot", "ginger", "soy sauce", "coconut milk", "lime", "cilantro", "pasta", "cheese",
+    "egg", "mushroom", "bell pepper", "corn", "black beans", "salmon", "shrimp", "yogurt", "chickpeas", "zucchini",
+    "eggplant", "cauliflower", "broccoli", "kale", "quinoa", "oats", "almonds", "peanuts", "cashews", "honey",
+    "lemon", "parsley", "mint", "thyme", "rosemary", "oregano", "paprika", "turmeric", "chili", "cinnamon",
+    "butter", "cream", "milk", "flour", "bread", "noodles", "cabbage", "celery", "leek", "shallot", "squash",
+    "sweet potato", "avocado", "apple", "mango", "pineapple", "cod", "tuna", "turkey", "lamb", "duck", "bacon",
+    "sausage", "ham", "feta", "mozzarella", "parmesan", "ricotta", "olives", "capers", "anchovies", "sesame",
+    "miso", "kimchi", "scallion", "bok choy", "bean sprouts", "peanut butter", "walnuts", "raisins", "dates",
+    "barley", "couscous", "polenta", "tortillas", "salsa"
+]
+
+def ingredient_names(tail=1000, seed=5):
+    """Common ingredients followed by a long tail of rarer made-up ones"""
+    rng = random.Random(seed)
+    syllables = ["ba", "ko", "ri", "ma", "ne", "lo", "su", "ta", "pi", "de", "go", "fu", "ze", "chi", "ran", "mel", "tor", "vin"]
+    rare = set()
+    while len(rare) < tail:
+        rare.add("".join(rng.choice(syllables) for _ in range(3)))
+    return INGREDIENT_VOCABULARY + sorted(rare)
+
+def synthetic_ingredient_sets(count, seed=5):
+    """Canonical ingredient tuples of 3-7 ingredients, drawn Zipf-like so common ingredients recur"""
+    names = ingredient_names()
+    cumulative_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(names) + 1)))
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        size = rng.randint(3, 7)
+        chosen = set()
+        while len(chosen) < size:
+            chosen.update(rng.choices(names, cum_weights=cumulative_weights, k=size - len(chosen)))
+        sets.append(tuple(sorted(chosen)))
+    return sets
+
+def synthetic_recipe_ingredients(count, seed=3):
+    """Ingredient lists shaped like generated recipes: 4-8 ingredients including a few pantry staples"""
+    names = ingredient_names()
+    cumulative_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(names) + 1)))
+    staples = ["salt", "pepper", "olive oil", "water", "sugar"]
+    rng = random.Random(seed)
+    recipes = []
+    for _ in range(count):
+        staple_count = rng.randint(1, 3)
+        size = rng.randint(4, 8) - staple_count
+        chosen = set()
+        while len(chosen) < size:
+            chosen.update(rng.choices(names, cum_weights=cumulative_weights, k=size - len(chosen)))
+        recipes.append(sorted(chosen) + rng.sample(staples, staple_count))
+    return recipes
+
+def simulate_cache_worker(args):
+    """One worker process serving a skewed key stream from its own LRU, optionally backed by the shared tier"""
+    shared_path, request_count, key_space, local_size, seed = args
+    server = import_backend()
+    rng = random.Random(seed)
+    local = server.LRUCache(local_size)
+    shared = server.SQLiteCacheBackend(shared_path) if shared_path else None
+    value = b"x" * 16 * 1024  # about one cached search response
+    hits = shared_reads = 0
+    shared_read_seconds = 0.0
+
+    for _ in range(request_count):
+        # Log-uniform popularity: a few hot searches and a long tail
+        key = str(int(key_space ** rng.random()))
+        if local.get(key) is not None:
+            hits += 1
+            continue
+        if shared is not None:
+            started = time.perf_counter()
+            stored = shared.get("benchmark", key)
+            shared_read_seconds += time.perf_counter() - started
+            shared_reads += 1
+            if stored is not None:
+                hits += 1
+                local.set(key, stored[0])
+                continue
+        # A miss stands for regenerating the response with the LLM
+        local.set(key, value)
+        if shared is not None:
+            shared.set("benchmark", key, value, 3600)
+    return hits, shared_reads, shared_read_seconds
+
+class SimulatedClock:
+    """Stands in for the time module inside server, so cache TTLs follow simulated time"""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def monotonic(self):
+        return time.monotonic() + self.offset
+
+    def time(self):
+        return time.time() + self.offset
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+class SimulatedSearchLog:
+    """Groups the retained keys the way popular_search_keys' aggregation does"""
+
+    def __init__(self):
+        self.keys = []
+
+    def aggregate(self, pipeline):
+        counts = {}
+        for key in self.keys:
+            counts[key] = counts.get(key, 0) + 1
+        rows = [
+            {"_id": {"ingredients": list(ingredients), "cuisine": cuisine}, "count": count}
+            for (ingredients, cuisine), count in sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        ]
+        return SimulatedCursor(rows)
+
+class SimulatedCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length):
+        return self.rows[:length]
+
+class SimulatedLeases:
+    """A single warmer, so every lease is granted"""
+
+    async def update_one(self, query, update, upsert=False):
+        return None
+
+class PrewarmDatabase:
+    """The collections prewarm_search_cache reads and writes"""
+
+    def __init__(self):
+        self.search_log = SimulatedSearchLog()
+        self.leases = SimulatedLeases()
+
+class RecipeFinderPerformanceTester:
+    def __init__(self, runs=5):
+        # Use the frontend environment variable for backend URL
+        frontend_backend_url = os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001')
+        self.base_url = frontend_backend_url
+        self.runs = runs
+        self.results = {}
+        print(f"🔗 Benchmarking backend at: {self.base_url}")
+
+    def mongo_commands(self):
+        """Total MongoDB commands the backend has issued so far"""
+        # The backend must run with the same METRICS_TOKEN for /api/metrics to exist
+        headers = {"Authorization": f"Bearer {os.environ.get('METRICS_TOKEN', '')}"}
+        response = requests.get(f"{self.base_url}/api/metrics", headers=headers, timeout=10)
+        response.raise_for_status()
+        return response.json()["mongo_commands"]
+
+    def measure(self, name, method, endpoint, expected_status=200, make_request=None):
+        """Time a route and count the MongoDB round trips it makes
+
+        make_request(run) returns (json body, headers) for each run.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        latencies = []
+        round_trips = []
+        print(f"\n⏱️  Measuring {name}...")
+
+        for run in range(self.runs):
+            data, headers = make_request(run) if make_request else (None, {})
+            before = self.mongo_commands()
+            started = time.perf_counter()
+            response = requests.request(method, url, json=data, headers=headers, timeout=60)
+            latencies.append((time.perf_counter() - started) * 1000)
+            round_trips.append(self.mongo_commands() - before)
+
+            if response.status_code != expected_status:
+                print(f"❌ Expected {expected_status}, got {response.status_code}: {response.text[:200]}")
+                return None
+
+        # Medians keep background flushes and compaction from skewing the counts
+        result = {
+            "latency_ms": round(statistics.median(latencies), 2),
+            "round_trips": statistics.median(round_trips)
+        }
+        self.results[name] = result
+        print(f"✅ {result['latency_ms']} ms median, {result['round_trips']} Mongo round trips")
+        return result
+
+    def register_user(self):
+        email = f"perf_{uuid.uuid4().hex[:12]}@example.com"
+        response = requests.post(f"{self.base_url}/api/auth/register", json={
+            "email": email, "password": "perf-password", "name": "Perf Tester"
+        }, timeout=30)
+        return email, response.json()["access_token"]
+
+    def latest_reset_token(self, email):
+        """Reset tokens are only emailed, so read them straight from MongoDB"""
+        from pymongo import MongoClient
+        mongo = MongoClient(os.environ['MONGO_URL'])
+        database = mongo[os.environ['DB_NAME']]
+        user = database.users.find_one({"email": email})
+        record = database.password_resets.find_one({"user_id": user["id"], "used": False}, sort=[("created_at", -1)])
+        mongo.close()
+        return record["token"]
+
+    def benchmark_auth_routes(self):
+        """Round trips and latency for the account routes"""
+        self.measure("register", "POST", "api/auth/register", make_request=lambda run: ({
+            "email": f"perf_{uuid.uuid4().hex[:12]}@example.com",
+            "password": "perf-password",
+            "name": "Perf Tester"
+        }, {}))
+
+        email, _ = self.register_user()
+        self.measure("login", "POST", "api/auth/login", make_request=lambda run: ({
+            "email": email, "password": "perf-password"
+        }, {}))
+        self.measure("forgot_password", "POST", "api/auth/forgot-password", make_request=lambda run: ({
+            "email": email
+        }, {}))
+
+        if 'MONGO_URL' not in os.environ:
+            print("⚠️  MONGO_URL not set - skipping reset_password")
+            return
+
+        def reset_request(run):
+            requests.post(f"{self.base_url}/api/auth/forgot-password", json={"email": email}, timeout=30)
+            return {"reset_token": self.latest_reset_token(email), "new_password": "perf-password"}, {}
+
+        self.measure("reset_password", "POST", "api/auth/reset-password", make_request=reset_request)
+
+    def benchmark_conditional_listing(self, library_size=500):
+        """Full favorites fetch versus a revalidation answered from the library version"""
+        _, token = self.register_user()
+        auth = {"Authorization": f"Bearer {token}"}
+        requests.post(f"{self.base_url}/api/recipes/favorites/bulk-save", json={
+            "recipes": [dict(recipe, title=f"{recipe['title']} {i}") for i, recipe in enumerate(sample_recipes(library_size))]
+        }, headers=auth, timeout=60)
+        etag = requests.get(f"{self.base_url}/api/recipes/favorites", headers=auth, timeout=60).headers.get("ETag")
+
+        self.measure("favorites_full", "GET", "api/recipes/favorites", make_request=lambda run: (None, auth))
+        self.measure("favorites_not_modified", "GET", "api/recipes/favorites", expected_status=304,
+                     make_request=lambda run: (None, {**auth, "If-None-Match": etag}))
+
+    def benchmark_auth_overhead(self, iterations=20000):
+        """Per-request cost of get_current_user with and without the verified-token cache"""
+        from fastapi.security import HTTPAuthorizationCredentials
+        server = import_backend()
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=server.create_access_token(str(uuid.uuid4()))
+        )
+
+        async def uncached():
+            server.token_cache.clear()
+            await server.get_current_user(credentials)
+
+        async def cached():
+            await server.get_current_user(credentials)
+
+        uncached_us = time_per_call(uncached, iterations)
+        cached_us = time_per_call(cached, iterations)
+        print(f"🔐 get_current_user: {uncached_us:.1f} µs with jwt.decode, {cached_us:.1f} µs from the token cache "
+              f"({uncached_us / cached_us:.0f}x faster)")
+
+    def benchmark_login_concurrency(self, concurrency=200):
+        """Login throughput and event-loop lag for a burst of concurrent password checks"""
+        server = import_backend()
+        stored_hash = server.hash_password("perf-password")
+
+        async def inline():
+            server.verify_password("perf-password", stored_hash)
+
+        async def offloaded():
+            await server.verify_password_async("perf-password", stored_hash)
+
+        async def burst(verify):
+            lags = []
+            done = asyncio.Event()
+
+            async def ticker():
+                # A healthy loop wakes this every 5 ms; anything beyond is lag
+                while not done.is_set():
+                    started = time.perf_counter()
+                    await asyncio.sleep(0.005)
+                    lags.append(time.perf_counter() - started - 0.005)
+
+            tick = asyncio.create_task(ticker())
+            await asyncio.sleep(0)
+            started = time.perf_counter()
+            await asyncio.gather(*[verify() for _ in range(concurrency)])
+            elapsed = time.perf_counter() - started
+            done.set()
+            await tick
+            return concurrency / elapsed, max(lags) * 1000
+
+        for name, verify in (("inline", inline), ("hashing pool", offloaded)):
+            throughput, max_lag_ms = asyncio.run(burst(verify))
+            print(f"🔑 {concurrency} concurrent logins ({name}): {throughput:.0f} logins/s, "
+                  f"max event-loop lag {max_lag_ms:.0f} ms")
+
+    def benchmark_serialization(self, iterations=200):
+        """Serialization cost of a search response and a 1000-item favorites page"""
+        from fastapi.responses import JSONResponse
+        from fastapi.routing import serialize_response
+        server = import_backend()
+
+        raw_recipes = sample_recipes(30)
+        search_result = server.categorize_recipes(server.RECIPE_LIST_ADAPTER.validate_python(raw_recipes))
+        favorites_page = {"recipes": [dict(raw_recipes[i % 30], id=i) for i in range(1000)], "next_cursor": None}
+
+        async def default_search():
+            # What the search route does on a cache miss: serialize once into a cache entry
+            server.FAST_JSON_RESPONSES = False
+            server.build_cache_entry(search_result.dict())
+
+        async def fast_search():
+            server.FAST_JSON_RESPONSES = True
+            server.build_cache_entry(search_result.dict())
+
+        async def default_favorites():
+            JSONResponse(await serialize_response(field=None, response_content=favorites_page))
+
+        async def fast_favorites():
+            server.FastJSONResponse(favorites_page)
+
+        fast_json_responses = server.FAST_JSON_RESPONSES
+        try:
+            timings = [
+                (name, time_per_call(default, iterations), time_per_call(fast, iterations))
+                for name, default, fast in (
+                    ("search response", default_search, fast_search),
+                    ("1000 favorites", default_favorites, fast_favorites)
+                )
+            ]
+        finally:
+            server.FAST_JSON_RESPONSES = fast_json_responses
+        for name, default_us, fast_us in timings:
+            print(f"🧾 {name}: {default_us / 1000:.2f} ms default, {fast_us / 1000:.2f} ms fast path "
+                  f"({default_us / fast_us:.1f}x faster)")
+
+    def benchmark_compression(self, iterations=50):
+        """Payload size and CPU per encoding, compressed per request versus served precompressed"""
+        server = import_backend()
+        search_body = json.dumps(server.categorize_recipes(
+            server.RECIPE_LIST_ADAPTER.validate_python(sample_recipes(30))
+        ).dict()).encode()
+        favorites_body = json.dumps({"recipes": sample_recipes(1000), "next_cursor": None}).encode()
+
+        for name, body in (("search response", search_body), ("1000 favorites", favorites_body)):
+            print(f"📦 {name}: {len(body) / 1024:.1f} KB uncompressed")
+            for encoding in server.CONTENT_ENCODERS:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    compressed = server.compress_body(body, encoding)
+                per_request_ms = (time.perf_counter() - started) / iterations * 1000
+
+                started = time.perf_counter()
+                precompressed = server.compress_body(body, encoding, precompressed=True)
+                once_ms = (time.perf_counter() - started) * 1000
+                print(f"   {encoding:<5} {len(compressed) / 1024:6.1f} KB at {per_request_ms:.2f} ms/request; "
+                      f"cached {len(precompressed) / 1024:6.1f} KB, {once_ms:.1f} ms once then 0 ms per hit")
+
+    def benchmark_fieldsets(self, iterations=200):
+        """Payload bytes and serialization time for each ?fields= preset"""
+        server = import_backend()
+        search_payload = server.categorize_recipes(
+            server.RECIPE_LIST_ADAPTER.validate_python(sample_recipes(30))
+        ).dict()
+        favorites_page = sample_recipes(server.DEFAULT_PAGE_SIZE)
+
+        payloads = (
+            ("search response", lambda fieldset: server.select_search_fields(search_payload, fieldset)),
+            (f"{server.DEFAULT_PAGE_SIZE} favorites", lambda fieldset: {
+                "recipes": [server.select_recipe_fields(recipe, fieldset) for recipe in favorites_page]
+            })
+        )
+        for name, select in payloads:
+            for preset, fieldset in server.RECIPE_FIELD_PRESETS.items():
+                async def serialize():
+                    return server.build_cache_entry(select(fieldset))["body"]
+
+                per_call_ms = time_per_call(serialize, iterations) / 1000
+                body = server.build_cache_entry(select(fieldset))["body"]
+                print(f"🗂️  {name} fields={preset}: {len(body) / 1024:.1f} KB "
+                      f"({len(server.compress_body(body, 'gzip')) / 1024:.1f} KB gzip), {per_call_ms:.2f} ms to serialize")
+
+    def benchmark_startup(self):
+        """Import time of backend/server.py via -X importtime, checked against STARTUP_IMPORT_BUDGET_MS"""
+        totals = []
+        for _ in range(self.runs):
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", "import server"],
+                cwd=Path(__file__).parent / "backend", capture_output=True, text=True
+            )
+            # Lines look like "import time:  self [us] | cumulative | <indent>package"
+            direct_imports = {}
+            for line in result.stderr.splitlines():
+                if not line.startswith("import time:") or "cumulative" in line:
+                    continue
+                _, cumulative, name = line[len("import time:"):].split("|")
+                if name.strip() == "server":
+                    totals.append(int(cumulative) / 1000)
+                elif len(name) - len(name.lstrip()) == 3:
+                    direct_imports[name.strip()] = int(cumulative) / 1000
+            if result.returncode != 0:
+                print(f"❌ import server failed: {result.stderr.strip().splitlines()[-1]}")
+                return False
+
+        total_ms = statistics.median(totals)
+        heaviest = sorted(direct_imports.items(), key=lambda item: -item[1])[:5]
+        print("   Heaviest imports: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in heaviest))
+        within_budget = total_ms <= STARTUP_IMPORT_BUDGET_MS
+        print(f"{'✅' if within_budget else '❌'} import server: {total_ms:.0f} ms median "
+              f"(budget {STARTUP_IMPORT_BUDGET_MS:.0f} ms)")
+        self.results["startup_import"] = {"latency_ms": round(total_ms, 2), "round_trips": 0}
+        return within_budget
+
+    def benchmark_shared_cache(self, workers=4, requests_per_worker=5000, key_space=5000, local_size=200):
+        """Cross-worker hit rate with per-worker LRUs alone versus backed by the SQLite shared tier"""
+        with tempfile.TemporaryDirectory() as directory:
+            for name, shared_path in (
+                ("per-worker LRU only", None),
+                ("with shared tier", os.path.join(directory, "cache.sqlite3"))
+            ):
+                jobs = [(shared_path, requests_per_worker, key_space, local_size, seed) for seed in range(workers)]
+                with Pool(workers) as pool:
+                    results = pool.map(simulate_cache_worker, jobs)
+                hits = sum(result[0] for result in results)
+                shared_reads = sum(result[1] for result in results)
+                line = f"🗄️  {workers} workers, {name}: {hits / (workers * requests_per_worker):.1%} hit rate"
+                if shared_reads:
+                    read_us = sum(result[2] for result in results) / shared_reads * 1_000_000
+                    line += f", {read_us:.0f} µs per shared read"
+                print(line)
+
+    def benchmark_cache_snapshot(self, entries=1000):
+        """Size and time to save and restore a warm search cache across a restart"""
+        server = import_backend()
+        payload = server.categorize_recipes(server.RECIPE_LIST_ADAPTER.validate_python(sample_recipes(30))).dict()
+        for i in range(entries):
+            server.search_cache.local.set(((f"ingredient {i}", "rice"), "any"), {"payload": payload, "variants": {}})
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.snapshot")
+            started = time.perf_counter()
+            saved = server.save_cache_snapshot(path)
+            save_ms = (time.perf_counter() - started) * 1000
+
+            server.search_cache.local.clear()
+            started = time.perf_counter()
+            loaded = server.load_cache_snapshot(path)
+            load_ms = (time.perf_counter() - started) * 1000
+            print(f"💾 {saved} entries: {os.path.getsize(path) / 1024:.0f} KB snapshot, "
+                  f"saved in {save_ms:.0f} ms, {loaded} restored in {load_ms:.0f} ms "
+                  f"(budget {server.CACHE_SNAPSHOT_LOAD_BUDGET_SECONDS * 1000:.0f} ms)")
+        server.search_cache.local.clear()
+
+    def benchmark_prewarming(self, days=3, combos=3000, searches_per_day=20000):
+        """Search cache hit rate over simulated days of diurnal traffic, with and without pre-warming"""
+        from datetime import datetime, timedelta
+        server = import_backend()
+        recipes = server.RECIPE_LIST_ADAPTER.validate_python(sample_recipes(30))
+        # Relative traffic per UTC hour: quiet nights, lunch and dinner peaks
+        hourly_weight = [1, 1, 1, 1, 1, 2, 4, 6, 6, 6, 8, 12, 12, 8, 6, 6, 8, 14, 16, 12, 8, 4, 2, 1]
+        searches_per_weight = searches_per_day / sum(hourly_weight)
+        ticks_per_hour = max(3600 // server.SEARCH_PREWARM_INTERVAL_SECONDS, 1)
+        start = datetime(2024, 1, 1)
+        clock = SimulatedClock()
+        database = PrewarmDatabase()
+
+        async def simulated_generation(ingredients, cuisine):
+            return recipes
+
+        async def discard_recipes(recipes, generated=False):
+            return {}
+
+        originals = (server.time, server.db, server.generate_recipes_with_llm, server.store_recipes, server.shared_cache)
+        server.time, server.db = clock, database
+        server.generate_recipes_with_llm, server.store_recipes = simulated_generation, discard_recipes
+        server.shared_cache = None
+
+        async def simulate(prewarm):
+            rng = random.Random(7)
+            search_log = []  # (hour, key)
+            hits = lookups = peak_hits = peak_lookups = 0
+            for hour in range(days * 24):
+                now = start + timedelta(hours=hour)
+                for tick in range(ticks_per_hour):
+                    clock.offset = (hour * ticks_per_hour + tick) * 3600 / ticks_per_hour
+                    # The loop in run_search_prewarming, against the search log as it stands
+                    if prewarm and server.in_prewarm_window(now):
+                        retained = hour - 24 * server.SEARCH_LOG_RETENTION_DELTA.days
+                        database.search_log.keys = [key for logged_at, key in search_log if logged_at > retained]
+                        await server.prewarm_search_cache()
+
+                    for _ in range(int(hourly_weight[now.hour] * searches_per_weight / ticks_per_hour)):
+                        key = ((f"ingredient {int(combos ** rng.random())}", "rice"), "any")
+                        hit = server.search_cache.get(key) is not None
+                        if not hit:
+                            server.search_cache.set(key, {"payload": {}, "variants": {}})
+                        search_log.append((hour, key))
+                        if hour >= 24:  # the first day only fills the log
+                            lookups += 1
+                            hits += hit
+                            if hourly_weight[now.hour] >= 12:
+                                peak_lookups += 1
+                                peak_hits += hit
+            print(f"🔥 {'with' if prewarm else 'without'} pre-warming: {hits / lookups:.1%} hit rate, "
+                  f"{peak_hits / peak_lookups:.1%} at peak hours"
+                  + (f", {server.prewarm_stats['tokens_spent']:,} tokens spent" if prewarm else ""))
+
+        try:
+            for prewarm in (False, True):
+                server.search_cache.local.clear()
+                server.prewarm_stats.update(runs=0, regenerated=0, tokens_spent=0)
+                asyncio.run(simulate(prewarm))
+        finally:
+            server.time, server.db, server.generate_recipes_with_llm, server.store_recipes, server.shared_cache = originals
+            server.search_cache.local.clear()
+
+    def benchmark_batch_search(self, cuisines=("italian", "thai", "mexican", "indian"), latency_range=(0.2, 0.6)):
+        """Wall time for one ingredient list across several cuisines: one search per cuisine versus one batch"""
+        server = import_backend()
+        recipes = server.RECIPE_LIST_ADAPTER.validate_python(sample_recipes(30))
+        rng = random.Random(11)
+
+        async def simulated_generation(ingredients, cuisine):
+            # Stand-in for the LLM call, whose latency dominates a search
+            await asyncio.sleep(rng.uniform(*latency_range))
+            return recipes
+
+        async def discard_recipes(recipes, generated=False):
+            return {}
+
+        originals = (server.generate_recipes_with_llm, server.store_recipes)
+        # Generated recipes would go to the recipe store, which needs a database
+        server.generate_recipes_with_llm, server.store_recipes = simulated_generation, discard_recipes
+        ingredients = "chicken, rice, garlic"
+
+        async def one_per_cuisine():
+            server.search_cache.local.clear()
+            for cuisine in cuisines:
+                await server.generate_search_entry(ingredients, cuisine, server.search_cache_key(ingredients.split(","), cuisine))
+
+        async def batch():
+            # The generation fan-out of /api/recipes/search/batch
+            server.search_cache.local.clear()
+            generations = [
+                asyncio.create_task(server.generate_search_entry(ingredients, cuisine, server.search_cache_key(ingredients.split(","), cuisine)))
+                for cuisine in cuisines
+            ]
+            await asyncio.wait(generations, timeout=server.SEARCH_BATCH_DEADLINE_SECONDS)
+
+        try:
+            sequential_ms = time_per_call(one_per_cuisine, self.runs) / 1000
+            batch_ms = time_per_call(batch, self.runs) / 1000
+        finally:
+            server.generate_recipes_with_llm, server.store_recipes = originals
+            server.search_cache.local.clear()
+        print(f"🍱 {len(cuisines)} cuisines: {sequential_ms:.0f} ms one search at a time, "
+              f"{batch_ms:.0f} ms batched ({sequential_ms / batch_ms:.1f}x)")
+
+    def benchmark_semantic_cache(self, entries=None, queries=1000):
+        """Semantic search cache lookups against a full search cache: latency and how often a similar search serves"""
+        server = import_backend()
+        entries = entries or server.SEARCH_CACHE_SIZE
+        ingredient_sets = synthetic_ingredient_sets(entries)
+        cached = {"payload": {}, "variants": {}}
+        originals = (server.search_cache, server.search_index, server.shared_cache, dict(server.semantic_search_stats))
+        server.search_cache = server.TieredCache("search", server.LRUCache(
+            entries, ttl=server.SEARCH_CACHE_TTL_SECONDS, on_evict=server.unindex_search_key
+        ))
+        server.search_index, server.shared_cache = None, None
+
+        try:
+            started = time.perf_counter()
+            for ingredients in ingredient_sets:
+                server.search_cache.set((ingredients, "any"), cached)
+            server.index_search_keys([(ingredients, "any") for ingredients in ingredient_sets])
+            build_seconds = time.perf_counter() - started
+            stats = server.get_search_index().stats()
+            print(f"🧭 {stats['entries']:,} cached searches indexed in {build_seconds:.2f}s, "
+                  f"{stats['bytes_per_entry']} bytes per entry ({stats['memory_bytes'] / 2**20:.1f} MB)")
+
+            rng = random.Random(9)
+            cases = {
+                # One ingredient more is served from the cached search; one fewer must not be
+                "extra ingredient": [ingredients + ("parsley",) for ingredients in rng.sample(ingredient_sets, queries)],
+                "missing ingredient": [ingredients[1:] for ingredients in rng.sample(ingredient_sets, queries)],
+                "unrelated": [tuple(rng.sample(ingredient_names(), 5)) for _ in range(queries)]
+            }
+            for case, query_sets in cases.items():
+                latencies = []
+                served = 0
+                for ingredients in query_sets:
+                    started = time.perf_counter()
+                    served += server.find_search_entry((ingredients, "any")) is not None
+                    latencies.append((time.perf_counter() - started) * 1000)
+                latencies.sort()
+                print(f"🧭 {case}: p50 {latencies[len(latencies) // 2]:.3f} ms, "
+                      f"p99 {latencies[int(len(latencies) * 0.99)]:.3f} ms, "
+                      f"{served / len(query_sets):.1%} served from a similar search")
+        finally:
+            server.search_cache, server.search_index, server.shared_cache, stats = originals
+            server.semantic_search_stats.update(stats)
+
+    def benchmark_similar_recipes(self, recipes=1_000_000, queries=200, recall_queries=50, limit=10):
+        """Similar recipe lookups on a synthetic corpus: latency per filter and recall against exact top-k by Jaccard"""
+        server = import_backend()
+        corpus = synthetic_recipe_ingredients(recipes)
+        features = [server.ingredient_features(ingredients) for ingredients in corpus]
+        partitions = [server.similar_recipe_partition(server.has_onion_garlic(ingredients)) for ingredients in corpus]
+        index = server.MinHashLSH(num_perm=server.SIMILAR_RECIPES_NUM_PERM, bands=server.SIMILAR_RECIPES_BANDS)
+        started = time.perf_counter()
+        for partition in set(partitions):
+            ids = [i for i, recipe_partition in enumerate(partitions) if recipe_partition == partition]
+            index.add_many(ids, [features[i] for i in ids], partition)
+        stats = index.stats()
+        print(f"🍲 {stats['entries']:,} recipes indexed in {time.perf_counter() - started:.1f}s, "
+              f"{stats['bytes_per_entry']} bytes per entry ({stats['memory_bytes'] / 2**20:.0f} MB)")
+
+        def similar(recipe, without_onion_garlic):
+            # The partitions find_similar_recipes searches
+            searched = [server.similar_recipe_partition(False)]
+            if not without_onion_garlic:
+                searched.append(server.similar_recipe_partition(True))
+            matches = [
+                match for partition in searched
+                for match in index.query(features[recipe], partition, threshold=server.SIMILAR_RECIPES_MIN_SIMILARITY,
+                                         limit=limit, accept=lambda key: key != recipe)
+            ]
+            return sorted(matches, key=lambda match: match[1], reverse=True)[:limit]
+
+        rng = random.Random(4)
+        for without_onion_garlic in (False, True):
+            latencies = []
+            for recipe in rng.sample(range(recipes), queries):
+                started = time.perf_counter()
+                similar(recipe, without_onion_garlic)
+                latencies.append((time.perf_counter() - started) * 1000)
+            latencies.sort()
+            print(f"🍲 top {limit}{' without onion/garlic' if without_onion_garlic else ''}: "
+                  f"p50 {latencies[len(latencies) // 2]:.3f} ms, p99 {latencies[int(len(latencies) * 0.99)]:.3f} ms")
+
+        # Recall: share of the exact top-k (ties at the k-th similarity included) that the index returns
+        recalls = []
+        for recipe in rng.sample(range(recipes), recall_queries):
+            query = features[recipe]
+            exact = sorted((
+                (len(query & other) / len(query | other), i) for i, other in enumerate(features)
+                if i != recipe and query & other
+            ), reverse=True)
+            exact = [(similarity, i) for similarity, i in exact if similarity >= server.SIMILAR_RECIPES_MIN_SIMILARITY]
+            if not exact:
+                continue
+            kth_similarity = exact[min(limit, len(exact)) - 1][0]
+            good = {i for similarity, i in exact if similarity >= kth_similarity}
+            found = sum(1 for key, _ in similar(recipe, False) if key in good)
+            recalls.append(found / min(limit, len(exact)))
+        print(f"🍲 recall@{limit} against exact Jaccard: {statistics.mean(recalls):.1%} over {len(recalls)} recipes")
+
+        # A user's custom recipes are scored exactly per request, up to SIMILAR_RECIPES_CUSTOM_SCAN of them
+        library = corpus[:server.SIMILAR_RECIPES_CUSTOM_SCAN]
+        latencies = []
+        for recipe in rng.sample(range(recipes), 20):
+            started = time.perf_counter()
+            for ingredients in library:
+                other = server.ingredient_features(ingredients)
+                len(features[recipe] & other) / len(features[recipe] | other)
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"🍲 exact scoring of {len(library):,} custom recipes: {statistics.median(latencies):.2f} ms median "
+              f"(excluding the Mongo read)")
+
+    def report(self, baseline=None):
+        print("\n" + "=" * 60)
+        print(f"{'Route':<28}{'Latency (ms)':>14}{'Round trips':>14}")
+        for name, result in self.results.items():
+            line = f"{name:<28}{result['latency_ms']:>14}{result['round_trips']:>14}"
+            if baseline and name in baseline:
+                before = baseline[name]
+                line += f"   (was {before['latency_ms']} ms, {before['round_trips']} trips)"
+            print(line)
+
+def main():
+    args = sys.argv[1:]
+    tester = RecipeFinderPerformanceTester()
+
+    print("🚀 Starting Recipe Finder Performance Benchmarks")
+    print("=" * 60)
+
+    # First, so the budget is enforced even when later sections fail or take minutes
+    print("\n⏱️  Benchmarking Cold Start...")
+    startup_within_budget = tester.benchmark_startup()
+    # --startup-only runs just the import budget check, with no backend needed
+    if "--startup-only" in args:
+        return 0 if startup_within_budget else 1
+
+    print("\n1️⃣ Benchmarking Account Routes...")
+    tester.benchmark_auth_routes()
+    tester.benchmark_conditional_listing()
+
+    print("\n2️⃣ Benchmarking Authentication Overhead...")
+    tester.benchmark_auth_overhead()
+
+    print("\n3️⃣ Benchmarking Concurrent Logins...")
+    tester.benchmark_login_concurrency()
+
+    print("\n4️⃣ Benchmarking Response Serialization...")
+    tester.benchmark_serialization()
+
+    print("\n5️⃣ Benchmarking Response Compression...")
+    tester.benchmark_compression()
+
+    print("\n6️⃣ Benchmarking Sparse Fieldsets...")
+    tester.benchmark_fieldsets()
+
+    print("\n7️⃣ Benchmarking Shared Cache Tier...")
+    tester.benchmark_shared_cache()
+
+    print("\n8️⃣ Benchmarking Cache Snapshots...")
+    tester.benchmark_cache_snapshot()
+
+    print("\n9️⃣ Benchmarking Search Pre-warming...")
+    tester.benchmark_prewarming()
+
+    print("\n🔟 Benchmarking Batch Search...")
+    tester.benchmark_batch_search()
+
+    print("\n1️⃣1️⃣ Benchmarking Semantic Search Cache...")
+    tester.benchmark_semantic_cache()
+
+    print("\n1️⃣2️⃣ Benchmarking Similar Recipes...")
+    tester.benchmark_similar_recipes()
+
+    # --compare FILE prints results next to an earlier --save FILE run
+    baseline = None
+    if "--compare" in args:
+        with open(args[args.index("--compare") + 1]) as f:
+            baseline = json.load(f)
+    tester.report(baseline)
+
+    if "--save" in args:
+        with open(args[args.index("--save") + 1], "w") as f:
+            json.dump(tester.results, f, indent=2)
+
+    # A startup regression fails the run
+    return 0 if startup_within_budget else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+from tests.fakes import FakeDatabase, unique_indexes  # noqa: E402
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """A fresh in-memory database with the server's unique indexes"""
+    fake = FakeDatabase(unique_indexes(server.INDEX_SPECS))
+    monkeypatch.setattr(server, "db", fake)
+    return fake
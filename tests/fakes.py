@@ -0,0 +1,327 @@
+"""In-memory stand-ins for the handful of Motor calls the server makes"""
+
+import copy
+from types import SimpleNamespace
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+def get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None, False
+        value = value[part]
+    return value, True
+
+
+def matches_condition(value, present, condition):
+    if not isinstance(condition, dict) or not any(key.startswith("$") for key in condition):
+        return present and value == condition
+    for operator, operand in condition.items():
+        if operator == "$exists":
+            if present != operand:
+                return False
+        elif operator == "$ne":
+            if present and value == operand:
+                return False
+        elif operator == "$in":
+            if not present or value not in operand:
+                return False
+        elif operator in ("$lt", "$lte", "$gt", "$gte"):
+            if not present or value is None:
+                return False
+            if operator == "$lt" and not value < operand:
+                return False
+            if operator == "$lte" and not value <= operand:
+                return False
+            if operator == "$gt" and not value > operand:
+                return False
+            if operator == "$gte" and not value >= operand:
+                return False
+        else:
+            raise NotImplementedError(operator)
+    return True
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, branch) for branch in condition):
+                return False
+        elif not matches_condition(*get_path(document, key), condition):
+            return False
+    return True
+
+
+def project(document, projection):
+    document = copy.deepcopy(document)
+    included = [key for key, flag in (projection or {}).items() if flag and key != "_id"]
+    if not included:
+        return document
+    result = {}
+    for path in included:
+        value, present = get_path(document, path)
+        if not present:
+            continue
+        target = result
+        *parents, leaf = path.split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return result
+
+
+def set_path(document, path, value):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[leaf] = value
+
+
+def apply_update(document, update, inserting):
+    for path, value in update.get("$set", {}).items():
+        set_path(document, path, copy.deepcopy(value))
+    if inserting:
+        for path, value in update.get("$setOnInsert", {}).items():
+            set_path(document, path, copy.deepcopy(value))
+    for path in update.get("$unset", {}):
+        document.pop(path, None)
+    for path, amount in update.get("$inc", {}).items():
+        set_path(document, path, (get_path(document, path)[0] or 0) + amount)
+
+
+class FakeCursor:
+    def __init__(self, documents, projection):
+        self.documents = documents
+        self.projection = projection
+
+    def sort(self, keys, direction=None):
+        if isinstance(keys, str):
+            keys = [(keys, direction or 1)]
+        for field, order in reversed(keys):
+            self.documents.sort(key=lambda document: get_path(document, field)[0], reverse=order < 0)
+        return self
+
+    def skip(self, count):
+        self.documents = self.documents[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self.documents = self.documents[:count]
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return [project(document, self.projection) for document in self.documents[:length]]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield project(document, self.projection)
+
+
+def evaluate(document, expression):
+    """The few aggregation expressions the server uses: "$path", $arrayElemAt and literals"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        head, _, rest = expression[1:].partition(".")
+        value = document.get(head)
+        if isinstance(value, list) and rest:
+            return [item[rest] for item in value if rest in item]
+        return value
+    if isinstance(expression, dict) and "$arrayElemAt" in expression:
+        array, index = expression["$arrayElemAt"]
+        values = evaluate(document, array) or []
+        return values[index] if -len(values) <= index < len(values) else None
+    return expression
+
+
+class FakeCollection:
+    """A collection holding plain dicts, with unique indexes given as field tuples"""
+
+    def __init__(self, unique=(), database=None):
+        self.documents = []
+        self.unique = [("_id",)] + [tuple(fields) for fields in unique]
+        self.database = database
+
+    def _conflict(self, candidate, ignore=None):
+        for fields in self.unique:
+            values = [get_path(candidate, field) for field in fields]
+            if not all(present for _, present in values):
+                continue
+            for document in self.documents:
+                if document is not ignore and all(get_path(document, field) == value for field, value in zip(fields, values)):
+                    return {field: 1 for field in fields}
+        return None
+
+    def _insert(self, document):
+        key_pattern = self._conflict(document)
+        if key_pattern:
+            raise DuplicateKeyError("E11000 duplicate key", 11000, {"code": 11000, "keyPattern": key_pattern})
+        self.documents.append(copy.deepcopy(document))
+
+    def _update(self, query, update, upsert):
+        for document in self.documents:
+            if matches(document, query):
+                updated = copy.deepcopy(document)
+                apply_update(updated, update, inserting=False)
+                key_pattern = self._conflict(updated, ignore=document)
+                if key_pattern:
+                    raise DuplicateKeyError("E11000 duplicate key", 11000, {"code": 11000, "keyPattern": key_pattern})
+                document.clear()
+                document.update(updated)
+                return SimpleNamespace(matched_count=1, upserted_id=None)
+        if not upsert:
+            return SimpleNamespace(matched_count=0, upserted_id=None)
+        document = {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+        apply_update(document, update, inserting=True)
+        self._insert(document)
+        return SimpleNamespace(matched_count=0, upserted_id=len(self.documents))
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([document for document in self.documents if matches(document, query or {})], projection)
+
+    def aggregate(self, pipeline):
+        documents = copy.deepcopy(self.documents)
+        for stage in pipeline:
+            (operator, spec), = stage.items()
+            if operator == "$match":
+                documents = [document for document in documents if matches(document, spec)]
+            elif operator == "$limit":
+                documents = documents[:spec]
+            elif operator == "$lookup":
+                foreign = self.database[spec["from"]].documents
+                for document in documents:
+                    local, present = get_path(document, spec["localField"])
+                    document[spec["as"]] = [
+                        copy.deepcopy(other) for other in foreign
+                        if present and get_path(other, spec["foreignField"]) == (local, True)
+                    ]
+            elif operator == "$addFields":
+                for document in documents:
+                    for name, expression in spec.items():
+                        value = evaluate(document, expression)
+                        if value is not None:
+                            document[name] = value
+            elif operator == "$group":
+                groups = {}
+                for document in documents:
+                    group_id = {name: evaluate(document, expression) for name, expression in spec["_id"].items()}
+                    group = groups.setdefault(repr(group_id), {"_id": group_id})
+                    for name, accumulator in spec.items():
+                        if name != "_id":
+                            group[name] = group.get(name, 0) + evaluate(document, accumulator["$sum"])
+                documents = list(groups.values())
+            elif operator == "$sort":
+                FakeCursor(documents, None).sort(list(spec.items()))
+            elif operator == "$project":
+                for document in documents:
+                    for name in [name for name, flag in spec.items() if not flag]:
+                        document.pop(name, None)
+            else:
+                raise NotImplementedError(operator)
+        return FakeCursor(documents, None)
+
+    async def find_one(self, query=None, projection=None):
+        for document in self.documents:
+            if matches(document, query or {}):
+                return project(document, projection)
+        return None
+
+    async def count_documents(self, query):
+        return sum(1 for document in self.documents if matches(document, query))
+
+    async def insert_one(self, document):
+        self._insert(document)
+
+    async def insert_many(self, documents, ordered=True):
+        errors, inserted = [], []
+        for index, document in enumerate(documents):
+            try:
+                self._insert(document)
+                inserted.append(index)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, **e.details})
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted)
+
+    async def update_one(self, query, update, upsert=False):
+        return self._update(query, update, upsert)
+
+    async def bulk_write(self, operations, ordered=True):
+        errors, upserted = [], {}
+        for index, operation in enumerate(operations):
+            try:
+                if isinstance(operation, InsertOne):
+                    self._insert(operation._doc)
+                elif isinstance(operation, UpdateOne):
+                    result = self._update(operation._filter, operation._doc, operation._upsert)
+                    if result.upserted_id is not None:
+                        upserted[index] = result.upserted_id
+                else:
+                    raise NotImplementedError(type(operation).__name__)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, **e.details})
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "upserted": [{"index": index, "_id": _id} for index, _id in upserted.items()]
+            })
+        return SimpleNamespace(upserted_ids=upserted)
+
+    async def delete_many(self, query):
+        kept = [document for document in self.documents if not matches(document, query)]
+        deleted = len(self.documents) - len(kept)
+        self.documents = kept
+        return SimpleNamespace(deleted_count=deleted)
+
+    async def delete_one(self, query):
+        for document in self.documents:
+            if matches(document, query):
+                self.documents.remove(document)
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def find_one_and_delete(self, query, projection=None):
+        for document in self.documents:
+            if matches(document, query):
+                self.documents.remove(document)
+                return project(document, projection)
+        return None
+
+
+class FakeDatabase:
+    """Collections are created on first use, with the unique indexes the server declares"""
+
+    def __init__(self, unique_indexes):
+        self.unique_indexes = unique_indexes
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self.unique_indexes.get(name, ()), self)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+def unique_indexes(index_specs):
+    """Unique field tuples per collection from the server's INDEX_SPECS"""
+    indexes = {}
+    for collection_name, keys, options in index_specs:
+        if options.get("unique"):
+            fields = (keys,) if isinstance(keys, str) else tuple(field for field, _ in keys)
+            indexes.setdefault(collection_name, []).append(fields)
+    return indexes
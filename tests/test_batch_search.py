@@ -0,0 +1,38 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+
+import server
+
+
+def request():
+    return Request({"type": "http", "method": "POST", "path": "/", "query_string": b"", "headers": [], "client": ("1.2.3.4", 1)})
+
+
+def test_batch_search_reports_cancelled_and_failed_generations(monkeypatch):
+    monkeypatch.setattr(server, "search_cache", server.TieredCache("search", server.LRUCache(10, ttl=3600)))
+    monkeypatch.setattr(server, "shared_cache", None)
+    monkeypatch.setattr(server, "SEARCH_SIMILARITY_THRESHOLD", 1.0)
+
+    async def log_search(cache_key, cache_hit):
+        pass
+
+    async def generate(ingredients, cuisine, cache_key):
+        if cuisine == "thai":
+            raise asyncio.CancelledError()
+        if cuisine == "mexican":
+            raise RuntimeError("LLM unavailable")
+        return {"payload": server.categorize_recipes([]).dict(), "variants": {}}
+
+    monkeypatch.setattr(server, "log_search", log_search)
+    monkeypatch.setattr(server, "generate_search_entry", generate)
+
+    response = asyncio.run(server.batch_search_recipes(
+        server.BatchSearchRequest(ingredients="chicken, rice", cuisines=["italian", "thai", "mexican"]),
+        request(), fieldset=None
+    ))
+
+    body = json.loads(response.body)
+    assert list(body["results"]) == ["italian"]
+    assert body["failed"] == ["thai", "mexican"]
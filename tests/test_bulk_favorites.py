@@ -0,0 +1,79 @@
+import asyncio
+
+import server
+
+
+def recipe(recipe_id, title):
+    return {
+        "id": recipe_id, "title": title, "image": "", "readyInMinutes": 20, "servings": 2,
+        "nutrition": {"calories": 400, "protein": 20, "carbs": 40, "fat": 10, "fiber": 5},
+        "hasOnionGarlic": False, "ingredients": [title.lower()], "instructions": ["Cook"]
+    }
+
+
+def content_id(recipe_data):
+    return server.recipe_content_id(server.recipe_content_hash(recipe_data))
+
+
+def bulk_save(user_id, recipes):
+    request = server.BulkSaveRecipesRequest(recipes=recipes)
+    return asyncio.run(server.bulk_save_favorite_recipes(request, current_user_id=user_id))["results"]
+
+
+def bulk_remove(user_id, recipe_ids):
+    request = server.BulkRemoveRecipesRequest(recipe_ids=recipe_ids)
+    return asyncio.run(server.bulk_remove_favorite_recipes(request, current_user_id=user_id))["results"]
+
+
+def library_version(database, user_id):
+    record = asyncio.run(database.library_versions.find_one({"user_id": user_id}))
+    return record["version"] if record else 0
+
+
+def test_bulk_save_reports_each_recipe(database):
+    bulk_save("user-1", [recipe(1, "Rice")])
+
+    results = bulk_save("user-1", [recipe(1, "Rice"), recipe(2, "Beans"), recipe(3, "Kale"), recipe(2, "Beans")])
+
+    assert [(result["recipe_id"], result["status"]) for result in results] == [
+        (content_id(recipe(1, "Rice")), "duplicate"),
+        (content_id(recipe(2, "Beans")), "saved"),
+        (content_id(recipe(3, "Kale")), "saved"),
+        (content_id(recipe(2, "Beans")), "duplicate")
+    ]
+    assert all(("id" in result) == (result["status"] == "saved") for result in results)
+    assert asyncio.run(database.saved_recipes.count_documents({"user_id": "user-1"})) == 3
+    # One payload per recipe, shared by every favorite that refers to it
+    assert asyncio.run(database.recipes.count_documents({})) == 3
+
+
+def test_bulk_save_of_only_duplicates_leaves_the_library_version(database):
+    bulk_save("user-1", [recipe(1, "Rice")])
+    version = library_version(database, "user-1")
+
+    assert [result["status"] for result in bulk_save("user-1", [recipe(1, "Rice")])] == ["duplicate"]
+    assert library_version(database, "user-1") == version
+
+
+def test_bulk_remove_reports_each_recipe_and_keeps_other_users(database):
+    bulk_save("user-1", [recipe(1, "Rice"), recipe(2, "Beans")])
+    bulk_save("user-2", [recipe(1, "Rice")])
+    version = library_version(database, "user-1")
+
+    rice = content_id(recipe(1, "Rice"))
+
+    results = bulk_remove("user-1", [rice, 7])
+
+    assert [(result["recipe_id"], result["status"]) for result in results] == [(rice, "removed"), (7, "not_found")]
+    assert library_version(database, "user-1") == version + 1
+    assert asyncio.run(database.saved_recipes.count_documents({"user_id": "user-1"})) == 1
+    assert asyncio.run(database.saved_recipes.count_documents({"user_id": "user-2"})) == 1
+
+
+def test_bulk_remove_finds_legacy_embedded_favorites(database):
+    database.saved_recipes.documents.append(
+        {"id": "legacy", "user_id": "user-1", "recipe_data": recipe(9, "Old"), "share_token": "t"}
+    )
+
+    assert bulk_remove("user-1", [9])[0]["status"] == "removed"
+    assert asyncio.run(database.saved_recipes.count_documents({})) == 0
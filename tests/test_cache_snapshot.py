@@ -0,0 +1,116 @@
+import json
+import time
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    """Fresh search and nutrition caches behind the snapshot registry"""
+    search = server.LRUCache(10, ttl=3600)
+    nutrition = server.LRUCache(10, ttl=3600)
+    monkeypatch.setattr(server, "SNAPSHOT_CACHES", {
+        "search": (search, lambda entry: entry["payload"], lambda payload: {"payload": payload, "variants": {}}),
+        "nutrition": (nutrition, lambda value: value, lambda value: value)
+    })
+    return search, nutrition
+
+
+def reset(caches):
+    for cache in caches:
+        cache.clear()
+
+
+def test_snapshot_round_trips_live_entries_in_lru_order(caches, tmp_path):
+    search, nutrition = caches
+    search.set((("chicken", "rice"), "any"), {"payload": {"low": {}}, "variants": {None: "serialized"}})
+    search.set((("beans",), "mexican"), {"payload": {"high": {}}, "variants": {}})
+    nutrition.set((("rice",), 2), {"calories": 300})
+    path = str(tmp_path / "snapshot")
+
+    assert server.save_cache_snapshot(path) == 3
+    reset(caches)
+    assert server.load_cache_snapshot(path) == 3
+
+    # Keys come back as tuples, payloads without the per-worker serialized variants
+    assert search.get((("chicken", "rice"), "any")) == {"payload": {"low": {}}, "variants": {}}
+    assert nutrition.get((("rice",), 2)) == {"calories": 300}
+    assert [key for key, _, _ in search.live_entries()][0] == (("chicken", "rice"), "any")
+
+
+def test_time_since_the_save_counts_against_the_ttl(caches, tmp_path, monkeypatch):
+    search, _ = caches
+    search.set("short", {"payload": 1, "variants": {}}, ttl=30)
+    search.set("long", {"payload": 2, "variants": {}}, ttl=3600)
+    path = str(tmp_path / "snapshot")
+    server.save_cache_snapshot(path)
+    reset(caches)
+
+    saved_time = time.time
+    monkeypatch.setattr(server.time, "time", lambda: saved_time() + 60)
+    assert server.load_cache_snapshot(path) == 1
+
+    assert search.get("short") is None
+    assert search.remaining_ttl("long") == pytest.approx(3540, abs=5)
+
+
+def write_and_damage(caches, path, damage):
+    caches[0].set("key", {"payload": 1, "variants": {}})
+    server.save_cache_snapshot(path)
+    reset(caches)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(damage(data))
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:-10],
+    lambda data: data[:-1] + bytes([data[-1] ^ 0xFF]),
+    lambda data: b"something else " + data,
+    lambda data: data.replace(b'"version": 1', b'"version": 0', 1),
+    lambda data: b"",
+])
+def test_corrupt_or_old_snapshots_are_skipped(caches, tmp_path, damage):
+    path = str(tmp_path / "snapshot")
+    write_and_damage(caches, path, damage)
+
+    assert server.load_cache_snapshot(path) == 0
+    assert len(caches[0]) == 0
+
+
+def test_missing_snapshot_loads_nothing(caches, tmp_path):
+    assert server.load_cache_snapshot(str(tmp_path / "never-written")) == 0
+
+
+def test_unknown_caches_in_a_snapshot_are_ignored(caches, tmp_path, monkeypatch):
+    caches[1].set("rice", {"calories": 1})
+    path = str(tmp_path / "snapshot")
+    server.save_cache_snapshot(path)
+    reset(caches)
+    monkeypatch.delitem(server.SNAPSHOT_CACHES, "nutrition")
+
+    assert server.load_cache_snapshot(path) == 0
+
+
+def test_a_spent_budget_stops_loading(caches, tmp_path):
+    for index in range(5):
+        caches[0].set(f"key-{index}", {"payload": index, "variants": {}})
+    path = str(tmp_path / "snapshot")
+    server.save_cache_snapshot(path)
+    reset(caches)
+
+    assert server.load_cache_snapshot(path, budget_seconds=-1) == 0
+    assert server.load_cache_snapshot(path, budget_seconds=10) == 5
+
+
+def test_snapshot_header_describes_the_body(caches, tmp_path):
+    path = str(tmp_path / "snapshot")
+    server.save_cache_snapshot(path)
+    with open(path, "rb") as f:
+        magic, _, header = f.readline().partition(b" ")
+        body = f.read()
+    assert magic == server.SNAPSHOT_MAGIC
+    assert json.loads(header)["length"] == len(body)
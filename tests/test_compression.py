@@ -0,0 +1,100 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import server
+
+LARGE = {"recipes": [{"title": f"Recipe {index}", "ingredients": ["rice", "peas"]} for index in range(100)]}
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br, zstd", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("*", "br"),
+    ("*;q=0, gzip", "gzip"),
+    ("gzip;q=nonsense", None),
+])
+def test_encoding_negotiation(accept_encoding, expected, monkeypatch):
+    monkeypatch.setattr(server, "CONTENT_ENCODERS", {
+        name: server.CONTENT_ENCODERS[name] for name in ("br", "zstd", "gzip") if name in server.CONTENT_ENCODERS
+    })
+    server.choose_encoding.cache_clear()
+    if expected == "br" and "br" not in server.CONTENT_ENCODERS:
+        pytest.skip("brotli is not installed")
+    assert server.choose_encoding(accept_encoding) == expected
+    server.choose_encoding.cache_clear()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/large")
+    def large():
+        return JSONResponse(LARGE, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/precompressed")
+    def precompressed():
+        return Response(gzip.compress(json.dumps(LARGE).encode()), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    @app.get("/streamed")
+    def streamed():
+        return StreamingResponse(iter([json.dumps(LARGE).encode()] * 2), media_type="application/json")
+
+    @app.get("/binary")
+    def binary():
+        return Response(b"\x00" * 4096, media_type="application/octet-stream")
+
+    app.add_middleware(server.CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_large_json_is_compressed_with_a_weak_etag(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == 'W/"abc"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+    # The test client inflates gzip on its own
+    assert response.json() == LARGE
+
+
+def test_clients_without_accept_encoding_get_identity(client):
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"abc"'
+
+
+@pytest.mark.parametrize("path", ["/small", "/streamed", "/binary"])
+def test_small_streamed_and_binary_bodies_pass_through(client, path):
+    assert "Content-Encoding" not in client.get(path, headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_precompressed_bodies_are_not_compressed_twice(client):
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json() == LARGE
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_cache_entries_follow_the_json_setting(fast, monkeypatch):
+    monkeypatch.setattr(server, "FAST_JSON_RESPONSES", fast)
+    payload = {"low": {"with_onion_garlic": [{"id": 1, "title": "Rice"}]}}
+
+    entry = server.build_cache_entry(payload)
+
+    assert json.loads(entry["body"]) == payload
+    assert entry["body"] == (server.fast_json_dumps(payload) if fast else json.dumps(payload).encode())
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+from fastapi.security import HTTPAuthorizationCredentials
+
+import server
+
+
+@pytest.fixture
+def account(database, monkeypatch):
+    monkeypatch.setattr(server, "transactions_supported", False)
+    monkeypatch.setattr(server, "token_revocations", {})
+    monkeypatch.setattr(server, "shared_cache", None)
+    server.token_cache.clear()
+    server.user_loader.invalidate("user-1")
+    database.users.documents.append({
+        "id": "user-1", "email": "ada@example.com", "name": "Ada", "password_hash": server.hash_password("secret")
+    })
+    database.saved_recipes.documents.append({"id": "s1", "user_id": "user-1", "share_token": "fav"})
+    yield database
+    server.token_cache.clear()
+
+
+async def authenticate(token):
+    return await server.get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+
+async def delete(token, password="secret"):
+    user_id = await authenticate(token)
+    return await server.delete_account(server.DeleteAccountRequest(password=password), Response(), current_user_id=user_id)
+
+
+def test_deleted_account_is_gone_and_logged_out(account):
+    token = server.create_access_token("user-1")
+
+    async def scenario():
+        await delete(token)
+        with pytest.raises(HTTPException) as rejected:
+            await authenticate(token)
+        assert rejected.value.status_code == 401
+
+    asyncio.run(scenario())
+    assert account.users.documents == [] and account.saved_recipes.documents == []
+
+
+def test_failed_delete_keeps_the_account_and_its_sessions(account, monkeypatch):
+    token = server.create_access_token("user-1")
+
+    async def broken(query):
+        raise RuntimeError("primary stepped down")
+    monkeypatch.setattr(account.saved_recipes, "delete_many", broken)
+
+    async def scenario():
+        with pytest.raises(HTTPException) as failed:
+            await delete(token)
+        assert failed.value.status_code == 500
+        assert await authenticate(token) == "user-1"
+
+    asyncio.run(scenario())
+    assert [user["id"] for user in account.users.documents] == ["user-1"]
+    assert "user-1" not in server.token_revocations
+
+
+def test_wrong_password_changes_nothing(account):
+    token = server.create_access_token("user-1")
+
+    async def scenario():
+        with pytest.raises(HTTPException) as rejected:
+            await delete(token, password="guess")
+        assert rejected.value.status_code == 401
+        assert await authenticate(token) == "user-1"
+
+    asyncio.run(scenario())
+    assert len(account.users.documents) == 1
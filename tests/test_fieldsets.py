@@ -0,0 +1,48 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.mark.parametrize("fields, view, expected", [
+    (None, None, None),
+    (None, "summary", server.RECIPE_FIELD_PRESETS["card"]),
+    ("full", None, None),
+    ("card", "full", server.RECIPE_FIELD_PRESETS["card"]),
+    # Canonical order, and the id always comes along
+    ("instructions, title", None, ("id", "title", "instructions")),
+    ("title,,title", None, ("id", "title")),
+])
+def test_fieldset_resolution(fields, view, expected):
+    assert server.recipe_fieldset(fields, view) == expected
+
+
+@pytest.mark.parametrize("fields", ["calories", "title,secret", "user_id"])
+def test_unknown_fields_are_a_422(fields):
+    with pytest.raises(HTTPException) as rejected:
+        server.recipe_fieldset(fields, None)
+    assert rejected.value.status_code == 422
+    assert "Unknown recipe fields" in rejected.value.detail
+
+
+def test_unknown_fields_are_rejected_before_the_route_runs():
+    client = TestClient(server.app)
+    response = client.get("/api/recipes/share/custom/some-token?fields=title,password_hash")
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Unknown recipe fields: password_hash"
+
+
+def test_invalid_view_is_a_422():
+    assert TestClient(server.app).get("/api/recipes/share/custom/some-token?view=compact").status_code == 422
+
+
+def test_projection_and_selection_agree():
+    fieldset = server.recipe_fieldset("title,servings", None)
+    recipe = {"id": 1, "title": "Rice", "servings": 2, "ingredients": ["rice"]}
+
+    assert server.fieldset_projection(fieldset, ("recipe_hash",), "recipe_data.") == {
+        "_id": 0, "recipe_hash": 1, "recipe_data.id": 1, "recipe_data.title": 1, "recipe_data.servings": 1
+    }
+    assert server.select_recipe_fields(recipe, fieldset) == {"id": 1, "title": "Rice", "servings": 2}
+    assert server.select_recipe_fields(recipe, None) is recipe
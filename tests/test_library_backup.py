@@ -0,0 +1,115 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def recipe(recipe_id, title, ingredients):
+    return {
+        "id": recipe_id, "title": title, "image": "", "readyInMinutes": 20, "servings": 2,
+        "nutrition": {"calories": 400, "protein": 20, "carbs": 40, "fat": 10, "fiber": 5},
+        "hasOnionGarlic": False, "ingredients": ingredients, "instructions": ["Cook"]
+    }
+
+
+class FakeRequest:
+    """Feeds a request body to the import endpoint in fixed-size chunks"""
+
+    def __init__(self, body, chunk_size=7):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+async def export(user_id):
+    return b"".join([chunk async for chunk in server.stream_library_export(user_id)])
+
+
+def import_library(user_id, body):
+    return asyncio.run(server.import_recipe_library(FakeRequest(body), current_user_id=user_id))
+
+
+@pytest.fixture
+def library(database):
+    async def fill():
+        favorites = [recipe(1, "Rice bowl", ["rice", "egg"]), recipe(2, "Noodles", ["noodles", "tofu"])]
+        await server.store_recipes(favorites)
+        for recipe_data in favorites:
+            await database.saved_recipes.insert_one(server.build_saved_recipe("user-1", recipe_data).dict())
+        custom = server.CustomRecipe(
+            user_id="user-1", title="Soup", ingredients=["leek", "potato"], instructions=["Simmer"], servings=4,
+            nutrition=server.RecipeNutrition(calories=200, protein=5, carbs=30, fat=4, fiber=6), readyInMinutes=40
+        )
+        await database.custom_recipes.insert_one({**custom.dict(), "recipe_hash": server.custom_recipe_hash(custom.dict())})
+    asyncio.run(fill())
+    return database
+
+
+def test_export_is_gzip_ndjson_of_favorites_and_custom_recipes(library):
+    records = [json.loads(line) for line in gzip.decompress(asyncio.run(export("user-1"))).splitlines()]
+
+    assert sorted(record["data"]["recipe_data"]["title"] for record in records if record["type"] == "favorite") == ["Noodles", "Rice bowl"]
+    assert [record["data"]["title"] for record in records if record["type"] == "custom"] == ["Soup"]
+
+
+def test_import_round_trips_into_another_library(library):
+    body = asyncio.run(export("user-1"))
+
+    result = import_library("user-2", body)
+
+    assert (result["imported"], result["duplicates"], result["invalid"]) == (3, 0, 0)
+    favorites = asyncio.run(library.saved_recipes.find({"user_id": "user-2"}).to_list(None))
+    originals = [recipe(1, "Rice bowl", ["rice", "egg"]), recipe(2, "Noodles", ["noodles", "tofu"])]
+    assert sorted(asyncio.run(server.resolve_saved_recipes(favorites)), key=lambda r: r["title"]) == sorted(
+        ({**recipe_data, "id": server.recipe_content_id(server.recipe_content_hash(recipe_data))} for recipe_data in originals),
+        key=lambda r: r["title"]
+    )
+    custom = asyncio.run(library.custom_recipes.find_one({"user_id": "user-2"}))
+    original = asyncio.run(library.custom_recipes.find_one({"user_id": "user-1"}))
+    # Fresh identifiers, same content
+    assert custom["title"] == "Soup" and custom["id"] != original["id"] and custom["share_token"] != original["share_token"]
+
+
+def test_reimport_counts_everything_as_duplicates(library):
+    body = asyncio.run(export("user-1"))
+
+    result = import_library("user-1", body)
+
+    assert (result["imported"], result["duplicates"]) == (0, 3)
+    assert asyncio.run(library.custom_recipes.count_documents({"user_id": "user-1"})) == 1
+
+
+def test_plain_ndjson_is_accepted_and_bad_lines_are_counted(database):
+    lines = [
+        json.dumps({"type": "favorite", "data": {"recipe_data": recipe(5, "Salad", ["lettuce"])}}),
+        "{not json",
+        json.dumps({"type": "favorite", "data": {"recipe_data": "not a recipe"}}),
+        json.dumps({"type": "custom", "data": {"title": "Missing fields"}}),
+        json.dumps({"type": "unknown", "data": {}}),
+        ""
+    ]
+
+    result = import_library("user-1", "\n".join(lines).encode())
+
+    assert (result["imported"], result["duplicates"], result["invalid"]) == (1, 0, 4)
+
+
+def test_corrupt_gzip_is_a_400(database):
+    body = gzip.compress(b'{"type": "favorite"}\n' * 100)
+    with pytest.raises(HTTPException) as rejected:
+        import_library("user-1", body[:20] + b"\x00" * 20 + body[40:])
+    assert rejected.value.status_code == 400
+
+
+def test_oversized_line_is_a_413_even_when_compressed(database, monkeypatch):
+    monkeypatch.setattr(server, "LIBRARY_IMPORT_MAX_LINE_BYTES", 1024)
+    with pytest.raises(HTTPException) as rejected:
+        import_library("user-1", gzip.compress(b"x" * 1024 * 1024))
+    assert rejected.value.status_code == 413
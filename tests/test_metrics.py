@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager, so the lifespan (database, workers) never starts
+    return TestClient(server.app)
+
+
+def test_metrics_do_not_exist_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", None)
+    assert client.get("/api/metrics").status_code == 404
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "Bearer "])
+def test_metrics_reject_callers_without_the_token(client, monkeypatch, authorization):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "operator-secret")
+    headers = {"Authorization": authorization} if authorization else {}
+    assert client.get("/api/metrics", headers=headers).status_code == 401
+
+
+def test_metrics_are_served_to_the_operator(client, monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "operator-secret")
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer operator-secret"})
+    assert response.status_code == 200
+    assert "mongo_commands" in response.json()
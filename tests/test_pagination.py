@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def test_cursor_round_trips_its_keyset_position():
+    saved_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert server.decode_cursor(server.encode_cursor(saved_at, "abc")) == (saved_at, "abc")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30=", "eyJ0IjogIm5vdCBhIGRhdGUiLCAiaWQiOiAxfQ=="])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as rejected:
+        server.decode_cursor(cursor)
+    assert rejected.value.status_code == 400
+
+
+def add_favorites(database, user_id, count, start):
+    # Pairs share a timestamp so pages have to break ties on id
+    for index in range(count):
+        database.saved_recipes.documents.append(
+            {"id": f"{user_id}-{index:02d}", "user_id": user_id, "saved_at": start + timedelta(seconds=index // 2)}
+        )
+
+
+def read_all_pages(database, user_id, limit):
+    pages, cursor = [], None
+    while True:
+        documents, cursor = asyncio.run(server.paginate_user_documents(
+            database.saved_recipes, user_id, "saved_at", limit, cursor, {"_id": 0}
+        ))
+        pages.append([document["id"] for document in documents])
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_every_document_once_newest_first(database):
+    add_favorites(database, "user-1", 7, datetime(2024, 1, 1))
+    add_favorites(database, "user-2", 3, datetime(2024, 1, 1))
+
+    pages = read_all_pages(database, "user-1", 3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [recipe_id for page in pages for recipe_id in page] == [f"user-1-{index:02d}" for index in reversed(range(7))]
+
+
+def test_exact_page_boundary_has_no_trailing_empty_page(database):
+    add_favorites(database, "user-1", 6, datetime(2024, 1, 1))
+    assert [len(page) for page in read_all_pages(database, "user-1", 3)] == [3, 3]
+
+
+def test_new_documents_do_not_shift_later_pages(database):
+    add_favorites(database, "user-1", 6, datetime(2024, 1, 1))
+    first, cursor = asyncio.run(server.paginate_user_documents(
+        database.saved_recipes, "user-1", "saved_at", 3, None, {"_id": 0}
+    ))
+    database.saved_recipes.documents.append({"id": "newest", "user_id": "user-1", "saved_at": datetime(2025, 1, 1)})
+
+    second, _ = asyncio.run(server.paginate_user_documents(
+        database.saved_recipes, "user-1", "saved_at", 3, cursor, {"_id": 0}
+    ))
+
+    assert [document["id"] for document in first + second] == [f"user-1-{index:02d}" for index in reversed(range(6))]
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize("hours, hour, expected", [
+    ("0-6", 0, True),
+    ("0-6", 5, True),
+    ("0-6", 6, False),
+    ("2-4", 4, False),
+    ("22-4", 23, True),
+    ("22-4", 3, True),
+    ("22-4", 4, False),
+    ("22-4", 21, False),
+    ("3", 3, True),
+    ("3", 4, False),
+])
+def test_prewarm_window_excludes_its_end_hour(monkeypatch, hours, hour, expected):
+    monkeypatch.setattr(server, "SEARCH_PREWARM_HOURS", hours)
+    assert server.in_prewarm_window(datetime(2024, 1, 1, hour, 30)) is expected
+
+
+@pytest.fixture
+def prewarm(database, monkeypatch):
+    """An empty search cache, and an LLM that records which searches it generated"""
+    monkeypatch.setattr(server, "search_cache", server.TieredCache("search", server.LRUCache(10, ttl=3600)))
+    monkeypatch.setattr(server, "shared_cache", None)
+    monkeypatch.setattr(server, "search_index", None)
+    generated = []
+
+    async def generate(ingredients, cuisine):
+        generated.append((ingredients, cuisine))
+        return server.RECIPE_LIST_ADAPTER.validate_python([{
+            "id": 1, "title": f"{cuisine} {ingredients}", "image": "placeholder", "readyInMinutes": 20, "servings": 2,
+            "nutrition": {"calories": 300.0, "protein": 20.0, "carbs": 30.0, "fat": 10.0, "fiber": 5.0},
+            "hasOnionGarlic": False, "ingredients": ingredients.split(", "), "instructions": ["Cook."]
+        }])
+
+    async def store(recipes, generated=False):
+        return {}
+
+    monkeypatch.setattr(server, "generate_recipes_with_llm", generate)
+    monkeypatch.setattr(server, "store_recipes", store)
+    return generated
+
+
+def log_searches(database, counts):
+    for (ingredients, cuisine), count in counts.items():
+        for _ in range(count):
+            database.search_log.documents.append({"ingredients": list(ingredients), "cuisine": cuisine})
+
+
+def run_prewarm():
+    async def run():
+        regenerated = await server.prewarm_search_cache()
+        await asyncio.gather(*server.background_tasks)
+        return regenerated
+    return asyncio.run(run())
+
+
+def test_prewarm_regenerates_popular_searches_missing_or_expiring(database, prewarm):
+    fresh, expiring, missing = (("beef", "rice"), "any"), (("tofu", "rice"), "thai"), (("beans", "corn"), "mexican")
+    log_searches(database, {fresh: 3, expiring: 2, missing: 1})
+    server.search_cache.set(fresh, {"payload": {}, "variants": {}})
+    server.search_cache.set(expiring, {"payload": {}, "variants": {}}, ttl=server.SEARCH_PREWARM_INTERVAL_SECONDS)
+
+    assert run_prewarm() == 2
+
+    assert prewarm == [("tofu, rice", "thai"), ("beans, corn", "mexican")]
+    assert server.search_cache.get(missing)["prewarmed"] is True
+    assert server.search_cache.remaining_ttl(expiring) == pytest.approx(server.SEARCH_PREWARM_TTL_SECONDS, abs=5)
+
+
+def test_prewarm_stops_at_its_token_budget(database, prewarm, monkeypatch):
+    log_searches(database, {((f"ingredient {i}", "rice"), "any"): 10 - i for i in range(5)})
+    monkeypatch.setattr(server, "SEARCH_PREWARM_TOKEN_BUDGET", 1)
+
+    # The budget is checked before each search, so the first one always runs
+    assert run_prewarm() == 1
+    assert prewarm == [("ingredient 0, rice", "any")]
+
+
+def test_prewarm_stops_when_another_worker_holds_the_lease(database, prewarm):
+    log_searches(database, {(("beef", "rice"), "any"): 1})
+    database.leases.documents.append({
+        "_id": server.prewarm_lease_name(), "holder": "elsewhere:1", "expires_at": datetime.utcnow() + timedelta(minutes=5)
+    })
+
+    assert run_prewarm() == 0
+    assert prewarm == []
+
+
+def test_prewarm_takes_over_a_lapsed_lease(database, prewarm):
+    log_searches(database, {(("beef", "rice"), "any"): 1})
+    database.leases.documents.append({
+        "_id": server.prewarm_lease_name(), "holder": "elsewhere:1", "expires_at": datetime.utcnow() - timedelta(seconds=1)
+    })
+
+    assert run_prewarm() == 1
+    lease = database.leases.documents[0]
+    assert lease["holder"] != "elsewhere:1"
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+
+
+def request(client_host="10.0.0.1", **headers):
+    return Request({
+        "type": "http", "method": "POST", "path": "/", "query_string": b"", "client": (client_host, 1234),
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+def admitted(limiter, incoming, cost=1):
+    try:
+        asyncio.run(server.enforce_rate_limit(limiter, incoming, cost))
+        return True
+    except HTTPException as e:
+        if e.status_code != 429:
+            raise
+        assert int(e.headers["Retry-After"]) >= 1
+        return False
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(server, "RATE_LIMITING", True)
+    monkeypatch.setattr(server, "TRUST_PROXY_HEADERS", False)
+    return server.TokenBucketLimiter("search", capacity=3, per_minute=1)
+
+
+def test_rate_limiting_is_off_unless_enabled(monkeypatch):
+    monkeypatch.setattr(server, "RATE_LIMITING", False)
+    limiter = server.TokenBucketLimiter("search", capacity=1, per_minute=1)
+    assert all(admitted(limiter, request()) for _ in range(10))
+
+
+def test_a_burst_is_admitted_then_rejected(limiter):
+    assert [admitted(limiter, request()) for _ in range(5)] == [True, True, True, False, False]
+    # Another client has a bucket of its own
+    assert admitted(limiter, request("10.0.0.2"))
+
+
+def test_forwarded_for_is_ignored_unless_trusted(limiter, monkeypatch):
+    for index in range(3):
+        assert admitted(limiter, request(x_forwarded_for=f"203.0.113.{index}"))
+    assert not admitted(limiter, request(x_forwarded_for="203.0.113.9"))
+
+    monkeypatch.setattr(server, "TRUST_PROXY_HEADERS", True)
+    assert admitted(limiter, request(x_forwarded_for="203.0.113.9, 10.0.0.1"))
+
+
+def test_a_request_costing_more_than_the_burst_is_a_422(limiter):
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(server.enforce_rate_limit(limiter, request(), cost=4))
+    assert rejected.value.status_code == 422
+    # Nothing was spent on it
+    assert admitted(limiter, request(), cost=3)
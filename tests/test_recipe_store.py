@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def recipe(recipe_id=1001, **changes):
+    return {
+        "id": recipe_id, "title": "Garlic Rice", "image": "placeholder", "readyInMinutes": 20, "servings": 2,
+        "nutrition": {"calories": 400.0, "protein": 20.0, "carbs": 40.0, "fat": 10.0, "fiber": 5.0},
+        "hasOnionGarlic": True, "ingredients": ["rice", "garlic"], "instructions": ["Cook", "Serve"], **changes
+    }
+
+
+def save(user_id, recipe_data):
+    request = server.SaveRecipeRequest(recipe_data=recipe_data)
+    return asyncio.run(server.save_favorite_recipe(request, current_user_id=user_id))
+
+
+def favorites(user_id):
+    saved = asyncio.run(server.db.saved_recipes.find({"user_id": user_id}).to_list(None))
+    return asyncio.run(server.resolve_saved_recipes(saved))
+
+
+@pytest.mark.parametrize("change", [
+    {"servings": 4},
+    {"readyInMinutes": 50},
+    {"image": "https://example.com/rice.jpg"},
+    {"hasOnionGarlic": False},
+    {"nutrition": {"calories": 900.0, "protein": 20.0, "carbs": 40.0, "fat": 10.0, "fiber": 5.0}},
+    {"instructions": ["Serve", "Cook"]},
+])
+def test_any_field_but_the_id_changes_the_hash(change):
+    assert server.recipe_content_hash(recipe(**change)) != server.recipe_content_hash(recipe())
+
+
+def test_id_case_spacing_ingredient_order_and_number_types_do_not_change_the_hash():
+    variant = recipe(
+        recipe_id=7, title="  garlic   RICE ", ingredients=["Garlic", "rice"],
+        nutrition={"calories": 400, "protein": 20, "carbs": 40, "fat": 10, "fiber": 5}
+    )
+    assert server.recipe_content_hash(variant) == server.recipe_content_hash(recipe())
+
+
+def test_users_keep_their_own_payloads_for_lookalike_recipes(database):
+    save("user-1", recipe())
+    save("user-2", recipe(servings=6, image="mine.jpg"))
+
+    assert favorites("user-1")[0]["servings"] == 2
+    assert favorites("user-2")[0]["servings"] == 6
+    assert favorites("user-2")[0]["image"] == "mine.jpg"
+
+
+def test_recipes_sharing_an_llm_id_both_save_under_content_ids(database):
+    first = save("user-1", recipe(1001))
+    second = save("user-1", recipe(1001, title="Fried Rice"))
+
+    assert first["recipe_id"] != second["recipe_id"]
+    assert sorted(favorite["id"] for favorite in favorites("user-1")) == sorted([first["recipe_id"], second["recipe_id"]])
+    assert first["recipe_id"] == server.recipe_content_id(server.recipe_content_hash(recipe()))
+
+
+def test_the_same_recipe_under_another_id_is_already_saved(database):
+    save("user-1", recipe(1001))
+    with pytest.raises(HTTPException) as rejected:
+        save("user-1", recipe(1005))
+    assert rejected.value.detail == "Recipe already saved"
+
+
+def test_generated_ids_match_the_ids_favorites_are_saved_under(database):
+    generated = server.Recipe(**recipe())
+    generated.id = server.recipe_content_id(server.recipe_content_hash(generated.dict()))
+
+    # The client sends back what it was given, after a JSON round trip turned 400.0 into 400
+    sent = {**generated.dict(), "nutrition": {"calories": 400, "protein": 20, "carbs": 40, "fat": 10, "fiber": 5}}
+
+    assert save("user-1", sent)["recipe_id"] == generated.id
+
+
+def store_generated(*recipes):
+    asyncio.run(server.store_recipes(list(recipes), generated=True))
+
+
+def test_a_generation_leaves_a_client_copy_of_the_same_recipe_alone(database, monkeypatch):
+    monkeypatch.setattr(server, "similar_recipe_index", server.MinHashLSH())
+    save("user-1", recipe(title="  garlic   RICE "))
+
+    store_generated(recipe())
+
+    stored, = database.recipes.documents
+    assert stored["recipe_data"]["title"] == "  garlic   RICE "
+    assert "generated" not in stored and "expires_at" not in stored
+    # Client payloads are never recommended to other users
+    assert len(server.similar_recipe_index) == 0
+
+
+def test_new_generated_recipes_are_marked_expiring_and_indexed_once(database, monkeypatch):
+    monkeypatch.setattr(server, "similar_recipe_index", server.MinHashLSH())
+    store_generated(recipe())
+    stored, = database.recipes.documents
+    assert stored["generated"] is True and stored["expires_at"] > stored["created_at"]
+    assert len(server.similar_recipe_index) == 1
+
+    server.similar_recipe_index.remove(("recipe", stored["hash"]))
+    store_generated(recipe(), recipe(title="Fried Rice"))
+
+    # The first was stored already, so only the new recipe joins the index
+    assert len(database.recipes.documents) == 2
+    assert [key for key, _ in server.similar_recipe_index.query({"rice", "garlic"}, "recipe", limit=5)] == [
+        ("recipe", server.recipe_content_hash(recipe(title="Fried Rice")))
+    ]
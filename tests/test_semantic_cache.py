@@ -0,0 +1,86 @@
+import pytest
+
+import server
+
+
+def test_minhash_finds_similar_sets_within_a_partition():
+    index = server.MinHashLSH()
+    index.add("pasta", {"tomato", "basil", "garlic", "pasta", "parmesan"}, partition="italian")
+    index.add("curry", {"chickpea", "coconut", "curry", "rice", "spinach"}, partition="indian")
+
+    assert [key for key, _ in index.query({"tomato", "basil", "garlic", "pasta"}, "italian", threshold=0.5)] == ["pasta"]
+    assert index.query({"tomato", "basil", "garlic", "pasta"}, "indian", threshold=0.5) == []
+    assert index.query({"beef", "potato", "carrot"}, "italian", threshold=0.5) == []
+
+
+def test_minhash_remove_and_eviction_drop_keys():
+    index = server.MinHashLSH(max_entries=2)
+    index.add("a", {"tomato", "basil", "pasta"})
+    index.add("b", {"tomato", "basil", "penne"})
+    assert index.remove("b") is True
+    assert index.remove("b") is False
+    assert index.query({"tomato", "basil", "penne"}, threshold=0.9) == []
+
+    index.add("c", {"tomato", "basil", "rigatoni"})
+    index.add("d", {"tomato", "basil", "fusilli"})
+
+    # The oldest key goes once the index is over max_entries
+    assert "a" not in index and len(index) == 2
+    assert index.query({"tomato", "basil", "pasta"}, threshold=0.9) == []
+
+
+def test_lru_cache_reports_evicted_and_expired_keys(monkeypatch):
+    evicted = []
+    cache = server.LRUCache(2, ttl=60, on_evict=evicted.append)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.pop("b")
+    assert evicted == ["a"]
+
+    now = server.time.monotonic()
+    monkeypatch.setattr(server.time, "monotonic", lambda: now + 120)
+    assert cache.get("c") is None
+    assert evicted == ["a", "c"]
+
+
+@pytest.fixture
+def semantic(monkeypatch):
+    """A small search cache whose evictions unindex, as the server's does"""
+    monkeypatch.setattr(server, "search_cache", server.TieredCache("search", server.LRUCache(
+        3, ttl=3600, on_evict=server.unindex_search_key
+    )))
+    monkeypatch.setattr(server, "shared_cache", None)
+    monkeypatch.setattr(server, "search_index", None)
+    monkeypatch.setattr(server, "SEARCH_SIMILARITY_THRESHOLD", 0.6)
+
+
+def cache(ingredients, cuisine="italian"):
+    key = (tuple(ingredients), cuisine)
+    entry = {"payload": {"for": list(ingredients)}, "variants": {}}
+    server.search_cache.set(key, entry)
+    server.index_search_keys([key])
+    return entry
+
+
+def test_a_request_is_served_a_cached_subset_of_its_ingredients(semantic):
+    entry = cache(["tomato", "basil", "pasta", "parmesan"])
+
+    assert server.find_search_entry((("tomato", "basil", "pasta", "parmesan", "olives"), "italian")) is entry
+    assert server.find_search_entry((("tomato", "basil", "pasta", "parmesan", "olives"), "thai")) is None
+
+
+def test_a_request_is_never_served_a_cached_superset(semantic):
+    cache(["tomato", "basil", "pasta", "parmesan", "olives"])
+
+    # Recipes for the cached search would need olives the user does not have
+    assert server.find_search_entry((("tomato", "basil", "pasta", "parmesan"), "italian")) is None
+
+
+def test_evicted_searches_leave_the_index(semantic):
+    cache(["tomato", "basil", "pasta", "parmesan"])
+    for i in range(3):
+        cache([f"ingredient {i}", "rice"], cuisine="thai")
+
+    assert len(server.get_search_index()) == 3
+    assert (("tomato", "basil", "pasta", "parmesan"), "italian") not in server.get_search_index()
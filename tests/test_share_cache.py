@@ -0,0 +1,130 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+
+
+def request(**headers):
+    return Request({
+        "type": "http", "method": "GET", "path": "/", "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+def share_custom(token, **headers):
+    return asyncio.run(server.get_shared_custom_recipe(token, request(**headers), fieldset=None))
+
+
+def share_favorite(token, fieldset=None, **headers):
+    return asyncio.run(server.get_shared_favorite_recipe(token, request(**headers), fieldset=fieldset))
+
+
+@pytest.fixture
+def shared(database, monkeypatch):
+    monkeypatch.setattr(server, "shared_cache", None)
+    server.share_cache.local.clear()
+    server.user_profile_cache.clear()
+    server.user_loader.invalidate("user-1")
+    recipe_data = {
+        "id": 1, "title": "Rice", "image": "", "readyInMinutes": 20, "servings": 2,
+        "nutrition": {"calories": 400, "protein": 20, "carbs": 40, "fat": 10, "fiber": 5},
+        # Long enough to be worth compressing
+        "hasOnionGarlic": False, "ingredients": ["rice"], "instructions": ["Rinse the rice well. " * 80]
+    }
+    saved = server.build_saved_recipe("user-1", recipe_data)
+    asyncio.run(server.store_recipes([recipe_data]))
+    database.saved_recipes.documents.append({**saved.dict(), "share_token": "fav"})
+    database.custom_recipes.documents.append({"id": "c1", "user_id": "user-1", "title": "Soup", "share_token": "cus"})
+    database.users.documents.append({"id": "user-1", "email": "ada@example.com", "name": "Ada", "created_at": None})
+    yield database
+    server.share_cache.local.clear()
+
+
+def test_first_request_fetches_owner_and_payload(shared):
+    response = share_favorite("fav")
+    payload = json.loads(response.body)
+
+    assert response.status_code == 200
+    assert payload["shared_by"] == "Ada" and payload["recipe_type"] == "favorite"
+    assert payload["recipe"]["title"] == "Rice"
+    assert response.headers["Cache-Control"].startswith("public")
+
+
+def test_owner_name_comes_from_the_profile_cache(shared):
+    server.cache_user_profile({"id": "user-1", "email": "ada@example.com", "name": "Ada L.", "created_at": None})
+    shared.users.documents.clear()
+
+    assert json.loads(share_custom("cus").body)["shared_by"] == "Ada L."
+
+
+def test_deleted_owner_is_attributed_to_an_unknown_user(shared):
+    shared.users.documents.clear()
+    assert json.loads(share_favorite("fav").body)["shared_by"] == "Unknown User"
+
+
+def test_unknown_token_is_a_404(shared):
+    with pytest.raises(HTTPException) as missing:
+        share_custom("nope")
+    assert missing.value.status_code == 404
+
+
+def test_repeat_requests_are_served_from_the_cache(shared):
+    first = share_custom("cus")
+    shared.custom_recipes.documents.clear()
+
+    again = share_custom("cus")
+
+    assert again.body == first.body and again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_matching_etag_gets_a_304_without_a_body(shared):
+    etag = share_favorite("fav").headers["ETag"]
+
+    response = share_favorite("fav", if_none_match=etag)
+
+    assert response.status_code == 304 and response.body == b""
+
+
+def test_compressed_responses_are_reused_and_revalidate_with_weak_etags(shared):
+    plain = share_favorite("fav")
+    compressed = share_favorite("fav", accept_encoding="gzip")
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.body) == plain.body
+    assert compressed.headers["ETag"] == "W/" + plain.headers["ETag"]
+    assert share_favorite("fav", accept_encoding="gzip").body is compressed.body
+    assert share_favorite("fav", accept_encoding="gzip", if_none_match=compressed.headers["ETag"]).status_code == 304
+
+
+def test_each_fieldset_has_its_own_etag(shared):
+    full = share_favorite("fav")
+    card = share_favorite("fav", fieldset=server.RECIPE_FIELD_PRESETS["card"])
+
+    assert card.headers["ETag"] != full.headers["ETag"]
+    assert "instructions" not in json.loads(card.body)["recipe"]
+
+
+def test_deleting_a_custom_recipe_invalidates_its_share(shared):
+    share_custom("cus")
+    asyncio.run(server.delete_custom_recipe("c1", current_user_id="user-1"))
+
+    with pytest.raises(HTTPException) as gone:
+        share_custom("cus")
+    assert gone.value.status_code == 404
+
+
+def test_removing_favorites_invalidates_their_shares(shared):
+    share_favorite("fav")
+    recipe_id = shared.saved_recipes.documents[0]["recipe_id"]
+    asyncio.run(server.bulk_remove_favorite_recipes(
+        server.BulkRemoveRecipesRequest(recipe_ids=[recipe_id]), current_user_id="user-1"
+    ))
+
+    with pytest.raises(HTTPException) as gone:
+        share_favorite("fav")
+    assert gone.value.status_code == 404
@@ -0,0 +1,57 @@
+import sqlite3
+import time
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def backend(tmp_path):
+    cache = server.SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), busy_timeout_ms=20)
+    yield cache
+    cache.close()
+
+
+def test_backends_must_implement_every_operation():
+    class Partial(server.CacheBackend):
+        def get(self, namespace, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_entries_round_trip_and_expire(backend):
+    backend.set("search", "a", b"payload", ttl=60)
+    backend.set("search", "b", b"stale", ttl=-1)
+
+    value, expires_at = backend.get("search", "a")
+    assert value == b"payload" and expires_at == pytest.approx(time.time() + 60, abs=5)
+    assert backend.get("search", "b") is None
+    assert backend.get("share", "a") is None
+    assert backend.purge_expired() == 1
+
+
+def test_tags_delete_every_entry_of_one_owner(backend):
+    backend.set("share", "one", b"1", ttl=60, tag="user-1")
+    backend.set("share", "two", b"2", ttl=60, tag="user-1")
+    backend.set("share", "three", b"3", ttl=60, tag="user-2")
+
+    backend.delete_tag("share", "user-1")
+
+    assert [backend.get("share", key) is None for key in ("one", "two", "three")] == [True, True, False]
+
+
+def test_a_locked_cache_skips_writes_instead_of_waiting(backend):
+    other_worker = sqlite3.connect(backend.path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        backend.set("search", "a", b"payload", ttl=60)
+        assert time.perf_counter() - started < 1
+        assert backend.busy == 1
+    finally:
+        other_worker.execute("ROLLBACK")
+        other_worker.close()
+    assert backend.get("search", "a") is None
@@ -0,0 +1,124 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+
+class FakeRevocations:
+    """Just enough of the token_revocations collection for revoke and sync"""
+
+    def __init__(self):
+        self.documents = {}
+
+    async def update_one(self, query, update, upsert=False):
+        self.documents[query["user_id"]] = {**query, **update["$set"]}
+
+    async def find(self, query, projection=None):
+        for document in list(self.documents.values()):
+            if document["revoked_at"] > query["revoked_at"]["$gt"]:
+                yield document
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.token_revocations = FakeRevocations()
+
+
+@pytest.fixture(params=["America/Los_Angeles", "Asia/Tokyo", "UTC"])
+def local_timezone(request, monkeypatch):
+    monkeypatch.setenv("TZ", request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "token_revocations", {})
+    monkeypatch.setattr(server, "token_revocations_synced_at", 0.0)
+    server.token_cache.clear()
+    yield database
+    server.token_cache.clear()
+
+
+def authenticate(token):
+    return asyncio.run(server.get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)))
+
+
+def test_revocation_rejects_earlier_tokens_and_accepts_new_ones(local_timezone, fake_db):
+    stolen = server.create_access_token("user-1")
+    assert authenticate(stolen) == "user-1"
+
+    # Same second as the stolen token, so whole-second precision would let it through
+    asyncio.run(server.revoke_user_tokens("user-1"))
+    fresh = server.create_access_token("user-1")
+
+    with pytest.raises(HTTPException) as rejected:
+        authenticate(stolen)
+    assert rejected.value.status_code == 401
+    assert authenticate(fresh) == "user-1"
+
+
+def test_revocation_reaches_other_workers(local_timezone, fake_db):
+    stolen = server.create_access_token("user-1")
+    asyncio.run(server.revoke_user_tokens("user-1"))
+    fresh = server.create_access_token("user-1")
+
+    # Another worker only learns about the revocation through the sync
+    server.token_revocations.clear()
+    asyncio.run(server.sync_token_revocations())
+
+    with pytest.raises(HTTPException):
+        authenticate(stolen)
+    assert authenticate(fresh) == "user-1"
+
+
+def test_revocation_of_one_user_leaves_others_alone(local_timezone, fake_db):
+    other = server.create_access_token("user-2")
+    asyncio.run(server.revoke_user_tokens("user-1"))
+    assert authenticate(other) == "user-2"
+
+
+def test_sync_picks_up_revocations_written_after_it_ran(local_timezone, fake_db):
+    stolen = server.create_access_token("user-1")
+    # Stamped just before a sync runs but only written once the sync has finished
+    revoked_at = time.time()
+    asyncio.run(server.sync_token_revocations())
+    fake_db.token_revocations.documents["user-1"] = {"user_id": "user-1", "revoked_at": revoked_at}
+
+    asyncio.run(server.sync_token_revocations())
+
+    with pytest.raises(HTTPException):
+        authenticate(stolen)
+
+
+def test_revocations_are_dropped_once_every_token_they_cover_has_expired(local_timezone, fake_db):
+    lifetime = server.JWT_EXPIRATION_DELTA.total_seconds()
+    server.record_token_revocation("user-old", time.time() - lifetime - 60)
+    server.record_token_revocation("user-recent", time.time() - lifetime + 60)
+
+    asyncio.run(server.revoke_user_tokens("user-1"))
+
+    assert set(server.token_revocations) == {"user-recent", "user-1"}
+
+
+def test_a_later_revocation_moves_the_user_to_the_back(local_timezone, fake_db):
+    server.record_token_revocation("user-1", time.time() - 10)
+    server.record_token_revocation("user-2", time.time() - 5)
+    server.record_token_revocation("user-1", time.time())
+
+    assert list(server.token_revocations) == ["user-2", "user-1"]
+    # An older copy arriving from the sync never moves a revocation back in time
+    server.record_token_revocation("user-2", 0)
+    assert server.token_revocations["user-2"] > 0